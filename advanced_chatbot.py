@@ -1,20 +1,26 @@
 import streamlit as st
-from datetime import datetime
-import time
+import pandas as pd
+from datetime import datetime, timedelta
 
 # 리팩토링된 모듈 import
 from config import settings
 from database import (
     init_postgresql_vectorstore, init_pgvector, get_schools_list, get_school_stats,
-    get_file_metadata, add_rss_feed, get_rss_feeds, delete_rss_feed,
-    delete_document_from_db, get_school_code_by_id, find_relevant_department
+    list_documents, add_rss_feed, list_rss_feeds, delete_rss_feed,
+    delete_document_from_db, get_school_code_by_id, find_relevant_department,
+    save_files_metadata, get_slow_queries, get_hot_queries, invalidate_document_reads, invalidate_rss_reads
 )
 from aws_utils import (
-    init_aws_clients, upload_to_s3, delete_file_from_s3
+    init_aws_clients, upload_files_to_s3, delete_file_from_s3
 )
 from chatbot_logic import (
-    search_documents, generate_ai_response, get_relevance_indicator
+    search_documents_coalesced, generate_ai_response_coalesced, get_relevance_indicator,
+    is_error_response
 )
+from answer_cache import init_answer_cache
+from ingest_queue import enqueue_jobs, enqueue_job, retry_job, pdf_idempotency_key, rss_idempotency_key
+from metrics import metrics, trace
+from query_log import init_query_log_writer
 
 # --- UI 렌더링 함수 ---
 
@@ -62,6 +68,355 @@ def display_search_results(search_results):
             preview = doc.page_content[:300] + "..." if len(doc.page_content) > 300 else doc.page_content
             st.text(preview)
 
+STAGE_LABELS = {
+    "search.total": "검색 전체",
+    "search.query_embedding": "질의 임베딩",
+    "search.vector": "벡터 검색",
+    "search.keyword": "키워드(ILIKE) 검색",
+    "department_lookup": "부서 검색",
+    "answer.total": "답변 생성 전체",
+    "answer.context_build": "컨텍스트 조립",
+    "answer.llm": "Sonnet 호출",
+    "answer.first_token": "첫 토큰까지 (스트리밍)",
+    "answer.stream_total": "스트리밍 답변 전체",
+    "ingest.pdf.total": "PDF 수집 전체",
+    "ingest.pdf.download": "PDF 다운로드",
+    "ingest.pdf.split": "PDF 분할",
+    "ingest.rss.total": "RSS 수집 전체",
+    "ingest.rss.fetch": "RSS 가져오기",
+    "ingest.embed": "청크 임베딩",
+    "ingest.db_insert": "청크 DB 저장",
+    "ingest.near_dup_lookup": "유사 중복 조회",
+    "bedrock.InvokeModel": "Bedrock 호출 (재시도 포함)",
+    "bedrock.InvokeModelWithResponseStream": "Bedrock 스트리밍 응답 시작"
+}
+
+COUNTER_LABELS = {
+    "bedrock.throttled": "Bedrock 스로틀링 응답",
+    "bedrock.retries": "Bedrock 재시도",
+    "bedrock.errors": "Bedrock 호출 실패"
+}
+
+def render_performance_stats():
+    """메모리에 집계된 단계별 지연 시간, 캐시 적중률, 수집 처리량을 표시합니다."""
+    started_at = datetime.fromtimestamp(metrics.started_at).strftime('%Y-%m-%d %H:%M:%S')
+    st.caption(f"집계 시작: {started_at} (서버 프로세스 기준, 모든 사용자 합산)")
+
+    stages = metrics.stage_summary()
+    st.subheader("⏱️ 단계별 지연 시간")
+    if stages:
+        df = pd.DataFrame(stages)
+        df.insert(1, "label", df["stage"].map(STAGE_LABELS).fillna(df["stage"]))
+        st.dataframe(
+            df.rename(columns={"label": "단계", "count": "호출 수", "p50_ms": "p50 (ms)",
+                               "p95_ms": "p95 (ms)", "mean_ms": "평균 (ms)", "max_ms": "최대 (ms)"})
+              .drop(columns=["stage"]).round(1),
+            hide_index=True, use_container_width=True
+        )
+    else:
+        st.info("아직 기록된 요청이 없습니다.")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("🎯 캐시 적중률")
+        caches = metrics.cache_summary()
+        if caches:
+            df = pd.DataFrame(caches)
+            df["hit_rate"] = (df["hit_rate"] * 100).round(1)
+            st.dataframe(df.rename(columns={"cache": "캐시", "hits": "적중", "misses": "미스", "hit_rate": "적중률 (%)"}),
+                         hide_index=True, use_container_width=True)
+        else:
+            st.info("캐시 기록이 없습니다.")
+    with col2:
+        st.subheader("📥 수집 처리량")
+        ingest = metrics.ingest_summary()
+        if ingest:
+            df = pd.DataFrame(ingest).round(2)
+            st.dataframe(df.rename(columns={"source": "유형", "runs": "실행 수", "chunks": "청크 수",
+                                            "seconds": "소요 (초)", "chunks_per_s": "청크/초"}),
+                         hide_index=True, use_container_width=True)
+        else:
+            st.info("수집 기록이 없습니다.")
+
+    counters = metrics.counter_summary()
+    if counters:
+        st.subheader("🚦 호출 카운터")
+        df = pd.DataFrame(counters)
+        df.insert(1, "label", df["counter"].map(COUNTER_LABELS).fillna(df["counter"]))
+        st.dataframe(df.rename(columns={"label": "항목", "count": "횟수"}).drop(columns=["counter"]),
+                     hide_index=True, use_container_width=True)
+
+    if st.button("🔄 통계 초기화", key="reset_metrics"):
+        metrics.reset()
+        st.rerun(scope="fragment")
+
+def render_query_analysis(engine, school_id):
+    """질의 로그를 바탕으로 느린 질의와 자주 들어온 질의를 표시합니다."""
+    st.subheader("🔎 질의 분석")
+    days = st.selectbox("분석 기간", [1, 7, 30], index=1, format_func=lambda d: f"최근 {d}일",
+                        key=f"query_analysis_days_{school_id}")
+    columns = {"example_query": "질의", "query_count": "횟수", "avg_ms": "평균 (ms)", "p95_ms": "p95 (ms)",
+               "avg_results": "평균 결과 수", "zero_result_count": "결과 없음", "cache_hit_count": "캐시 적중",
+               "last_seen": "마지막 질의"}
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.write("**🐢 느린 질의 (p95 기준)**")
+        slow = get_slow_queries(engine, school_id, days=days)
+        if not slow.empty:
+            st.dataframe(slow.drop(columns=["normalized_query"]).rename(columns=columns),
+                         hide_index=True, use_container_width=True)
+        else:
+            st.info("기록된 질의가 없습니다.")
+    with col2:
+        st.write("**🔥 자주 들어온 질의**")
+        hot = get_hot_queries(engine, school_id, days=days)
+        if not hot.empty:
+            st.dataframe(hot.drop(columns=["normalized_query"]).rename(columns=columns),
+                         hide_index=True, use_container_width=True)
+        else:
+            st.info("기록된 질의가 없습니다.")
+
+LIST_PAGE_SIZE = 20
+
+DOCUMENT_STATUS_LABELS = {None: "전체", "processed": "✅ 처리완료", "unprocessed": "⏳ 미처리",
+                          "in_progress": "⚙️ 처리 중/대기", "failed": "❌ 실패"}
+RSS_STATUS_LABELS = {None: "전체", "active": "✅ 활성", "paused": "⏸️ 중지"}
+
+def render_listing_filters(prefix, status_labels, name_label):
+    """이름/상태/기간 필터 위젯을 그리고 필터 dict를 반환합니다 (조회는 DB에서 수행)."""
+    cols = st.columns([0.4, 0.25, 0.35])
+    name = cols[0].text_input(name_label, key=f"{prefix}_name").strip() or None
+    status = cols[1].selectbox("상태", list(status_labels), format_func=status_labels.get, key=f"{prefix}_status")
+    date_from = date_to = None
+    if cols[2].checkbox("기간 지정", key=f"{prefix}_use_dates"):
+        today = datetime.now().date()
+        dates = cols[2].date_input("등록 기간", value=(today - timedelta(days=30), today), key=f"{prefix}_dates")
+        if len(dates) == 2:
+            date_from, date_to = dates
+    return {"name": name, "status": status, "date_from": date_from, "date_to": date_to}
+
+def get_page_cursor(state_key, filters):
+    """현재 페이지의 키셋 커서. 필터가 바뀌면 첫 페이지로 돌아갑니다."""
+    state = st.session_state.get(state_key)
+    if not state or state["filters"] != filters:
+        state = {"filters": filters, "cursors": [None]}
+        st.session_state[state_key] = state
+    return state["cursors"][-1]
+
+def render_pager(state_key, next_cursor):
+    state = st.session_state[state_key]
+    cols = st.columns([0.2, 0.6, 0.2])
+    if cols[0].button("◀ 이전", key=f"{state_key}_prev", disabled=len(state["cursors"]) == 1):
+        state["cursors"].pop()
+        st.rerun(scope="fragment")
+    cols[1].caption(f"{len(state['cursors'])} 페이지")
+    if cols[2].button("다음 ▶", key=f"{state_key}_next", disabled=next_cursor is None):
+        state["cursors"].append(next_cursor)
+        st.rerun(scope="fragment")
+
+RSS_JOB_LABELS = {"queued": "🕒 수집 대기", "running": "⚙️ 수집 중", "failed": "❌ 수집 실패"}
+
+def render_job_status(container, engine, row, answer_cache, school_id):
+    """수집 작업 상태(대기/처리 중/재시도 대기/실패)를 표시합니다. 작업이 진행 중이면 True를 반환합니다."""
+    status = row.get('job_status')
+    if status == 'running':
+        done, total = int(row['job_progress_done'] or 0), row['job_progress_total']
+        if pd.isna(total) or not total:
+            container.text('⚙️ 처리 중')
+        else:
+            container.progress(min(done / total, 1.0), text=f"⚙️ {done}/{int(total)}")
+        return True
+    if status == 'queued':
+        attempts = int(row['job_attempts'] or 0)
+        container.text(f"🔁 재시도 대기 ({attempts}회 실패)" if attempts else '🕒 대기 중')
+        return True
+    if status == 'failed':
+        container.text('❌ 처리 실패')
+        if container.button("재시도", key=f"retry_job_{row['job_id']}", help=row['job_error']):
+            retry_job(engine, int(row['job_id']))
+            answer_cache.invalidate_school(school_id)
+            invalidate_document_reads()
+            st.rerun(scope="fragment")
+        return False
+    container.text('✅ 처리완료' if row['processed'] or status == 'succeeded' else '⏳ 미처리')
+    return False
+
+# --- 탭 (프래그먼트 단위로 독립 재실행) ---
+
+@st.fragment
+def render_chat_tab(engine, vectorstore, bedrock_client, embeddings, school_id, selected_school,
+                    query_log_writer, answer_cache):
+    """챗봇 탭. 질의 입력은 이 프래그먼트만 다시 실행하므로 다른 탭의 목록 조회가 일어나지 않습니다."""
+    st.header(f"💬 {selected_school} 학사 정보 챗봇")
+    search_query = st.text_input("궁금한 내용을 입력하세요:", placeholder="예: 장학금 신청 방법", key=f"query_{school_id}")
+
+    if search_query:
+        with st.spinner("문서 검색 및 AI 답변 생성 중..."), trace() as request_trace:
+            cached = answer_cache.get(school_id, search_query)
+            if cached:
+                results = cached["sources"]
+            else:
+                results = search_documents_coalesced(engine, vectorstore, search_query, school_id, embeddings)
+            
+            if results:
+                display_search_results(results)
+                st.write("---")
+                if cached:
+                    ai_response = cached["answer"]
+                else:
+                    ai_response = generate_ai_response_coalesced(bedrock_client, search_query, school_id, results)
+                    if not is_error_response(ai_response):
+                        answer_cache.put(school_id, search_query, ai_response, results)
+                st.subheader("🤖 AI 응답")
+                if cached:
+                    st.caption("⚡ 저장된 답변을 표시합니다.")
+                st.markdown(ai_response)
+            else:
+                department = find_relevant_department(engine, search_query, school_id)
+                if department:
+                    st.info("📞 담당 부서 안내")
+                    contact_info = f"**{department['name']}** ({department.get('staff_name', '담당자')})\n- 전화번호: {department.get('staff_phone') or department.get('main_phone', '정보 없음')}\n- 이메일: {department.get('staff_email', '정보 없음')}"
+                    st.markdown(f"관련 문서를 찾지 못했습니다. **'{search_query}'** 관련 업무는 아래 부서로 문의하시면 정확한 답변을 받으실 수 있습니다.\n\n{contact_info}")
+                else:
+                    st.warning("관련 문서를 찾을 수 없습니다. 학교 대표 부서나 홈페이지를 통해 문의해주세요.")
+
+        # 다른 위젯 조작으로 인한 재실행은 같은 질의를 다시 기록하지 않습니다.
+        if st.session_state.get("last_logged_query") != (school_id, search_query):
+            st.session_state.last_logged_query = (school_id, search_query)
+            query_log_writer.log(
+                school_id, search_query, len(results), request_trace.elapsed_ms,
+                stage_timings=request_trace.stages,
+                cache_hit=any(request_trace.cache.values()),
+                department_fallback=not results
+            )
+
+@st.fragment
+def render_pdf_tab(engine, s3_client, school_id, answer_cache):
+    """PDF 업로드 및 목록 탭."""
+    st.header("📄 PDF 파일 업로드 및 관리")
+    uploader_version = st.session_state.get(f"uploader_version_{school_id}", 0)
+    uploaded_files = st.file_uploader(
+        "PDF 파일을 선택하세요 (여러 개 선택 가능)", type=['pdf'], accept_multiple_files=True,
+        key=f"uploader_{school_id}_{uploader_version}"
+    )
+    
+    if uploaded_files:
+        school_code = get_school_code_by_id(engine, school_id)
+        date_prefix = datetime.now().strftime('%Y%m%d')
+        files = [(f, f"documents/{school_code}/{date_prefix}_{f.name}") for f in uploaded_files]
+        if st.button(f"업로드 ({len(files)}개)", key=f"upload_btn_{school_id}_{uploader_version}"):
+            progress_bars = [st.progress(0.0, text=f.name) for f, _ in files]
+
+            def on_progress(index, sent_bytes, total_bytes):
+                ratio = min(sent_bytes / total_bytes, 1.0) if total_bytes else 0.0
+                progress_bars[index].progress(ratio, text=f"{files[index][0].name} ({ratio:.0%})")
+
+            results = upload_files_to_s3(files, s3_client, on_progress=on_progress)
+            uploaded = [(f.name, key) for (f, key), (_, ok, _) in zip(files, results) if ok]
+            failed = [(f.name, error) for (f, _), (_, ok, error) in zip(files, results) if not ok]
+
+            if uploaded:
+                save_files_metadata(engine, uploaded, "pdf", school_id)
+                jobs = []
+                for (f, key), (_, ok, _) in zip(files, results):
+                    if ok:
+                        source_url = f"s3://{settings.S3_BUCKET_NAME}/{key}"
+                        jobs.append({"school_id": school_id, "kind": "pdf", "target": source_url,
+                                     "idempotency_key": pdf_idempotency_key(source_url, f.getvalue())})
+                enqueue_jobs(engine, jobs)
+                answer_cache.invalidate_school(school_id)
+                invalidate_document_reads()
+                st.success(f"✅ {len(uploaded)}개 파일 업로드 완료! 처리 대기열에 등록되었습니다.")
+            for name, error in failed:
+                st.error(f"S3 업로드 실패: {name} ({error})")
+            if not failed:
+                st.session_state[f"uploader_version_{school_id}"] = uploader_version + 1
+                # 상단 학교 통계도 갱신되도록 앱 전체를 다시 실행합니다.
+                st.rerun()
+
+    st.divider()
+    st.subheader("📂 업로드된 파일 목록")
+    doc_filters = render_listing_filters(f"doc_filter_{school_id}", DOCUMENT_STATUS_LABELS, "파일명 검색")
+    doc_page_key = f"doc_pages_{school_id}"
+    file_page, next_cursor = list_documents(
+        engine, school_id, cursor=get_page_cursor(doc_page_key, doc_filters), page_size=LIST_PAGE_SIZE, **doc_filters
+    )
+    if not file_page.empty:
+        jobs_active = False
+        for row in file_page.to_dict("records"):
+            cols = st.columns([0.5, 0.2, 0.2, 0.1])
+            cols[0].text(row['filename'])
+            jobs_active = render_job_status(cols[1], engine, row, answer_cache, school_id) or jobs_active
+            cols[2].text(f"{int(row['chunks_count'])} 청크")
+            if cols[3].button("삭제", key=f"del_pdf_{row['id']}", type="primary"):
+                s3_key_to_delete = row['s3_key'].replace(f"s3://{settings.S3_BUCKET_NAME}/", "")
+                delete_file_from_s3(s3_client, s3_key_to_delete)
+                delete_document_from_db(engine, row['id'])
+                answer_cache.invalidate_school(school_id)
+                st.success(f"'{row['filename']}' 삭제 완료")
+                st.rerun()
+        render_pager(doc_page_key, next_cursor)
+        if jobs_active and st.button("🔄 처리 상태 새로고침", key=f"refresh_jobs_{school_id}"):
+            invalidate_document_reads()
+            st.rerun(scope="fragment")
+    elif any(doc_filters.values()):
+        st.info("조건에 맞는 PDF 파일이 없습니다.")
+    else:
+        st.info("업로드된 PDF 파일이 없습니다.")
+
+@st.fragment
+def render_rss_tab(engine, school_id, answer_cache):
+    """RSS 피드 추가 및 목록 탭."""
+    st.header("🔗 RSS 피드 추가 및 관리")
+    rss_url = st.text_input("추가할 RSS 피드 URL을 입력하세요:", key=f"rss_url_{school_id}")
+    if st.button("➕ RSS 추가", disabled=not rss_url):
+        if add_rss_feed(engine, school_id, rss_url):
+            enqueue_job(engine, school_id, "rss", rss_url, rss_idempotency_key(school_id, rss_url), priority=1)
+            answer_cache.invalidate_school(school_id)
+            invalidate_rss_reads()
+            st.success("RSS 피드 추가 완료! 수집 대기열에 등록되었습니다.")
+            st.rerun()
+        else:
+            st.warning("이미 등록된 피드이거나 추가에 실패했습니다.")
+
+    st.divider()
+    st.subheader("📡 등록된 RSS 피드 목록")
+    rss_filters = render_listing_filters(f"rss_filter_{school_id}", RSS_STATUS_LABELS, "제목/URL 검색")
+    rss_page_key = f"rss_pages_{school_id}"
+    rss_page, next_cursor = list_rss_feeds(
+        engine, school_id, cursor=get_page_cursor(rss_page_key, rss_filters), page_size=LIST_PAGE_SIZE, **rss_filters
+    )
+    if not rss_page.empty:
+        for row in rss_page.to_dict("records"):
+            cols = st.columns([0.5, 0.2, 0.2, 0.1])
+            cols[0].text(row['title'] or row['rss_url'])
+            cols[1].text(f"상태: {'✅' if row['status']=='active' else '⏸️'} {RSS_JOB_LABELS.get(row['job_status'], '')}")
+            if cols[2].button("🔄 수집", key=f"ingest_rss_{row['id']}"):
+                enqueue_job(engine, school_id, "rss", row['rss_url'], rss_idempotency_key(school_id, row['rss_url']), priority=1)
+                answer_cache.invalidate_school(school_id)
+                invalidate_rss_reads()
+                st.rerun(scope="fragment")
+            if cols[3].button("삭제", key=f"del_rss_{row['id']}", type="primary"):
+                delete_rss_feed(engine, row['id'])
+                answer_cache.invalidate_school(school_id)
+                st.success(f"'{row['title']}' 피드 삭제 완료")
+                st.rerun()
+        render_pager(rss_page_key, next_cursor)
+    elif any(rss_filters.values()):
+        st.info("조건에 맞는 RSS 피드가 없습니다.")
+    else:
+        st.info("등록된 RSS 피드가 없습니다.")
+
+@st.fragment
+def render_stats_tab(engine, school_id):
+    """성능 통계 및 질의 분석 탭."""
+    st.header("📊 파일 통계")
+    render_performance_stats()
+    st.divider()
+    render_query_analysis(engine, school_id)
+
+
 # --- 메인 애플리케이션 ---
 
 def main():
@@ -90,100 +445,19 @@ def main():
     st.divider()
 
     vectorstore = init_pgvector(embeddings, engine)
+    query_log_writer = init_query_log_writer(engine)
+    answer_cache = init_answer_cache(engine)
     
     tab1, tab2, tab3, tab4 = st.tabs(["💬 챗봇", "📄 PDF 관리", "🔗 RSS 피드 관리", "📊 파일 통계"])
-
-    # 탭 1: 챗봇
     with tab1:
-        st.header(f"💬 {selected_school} 학사 정보 챗봇")
-        search_query = st.text_input("궁금한 내용을 입력하세요:", placeholder="예: 장학금 신청 방법", key=f"query_{school_id}")
-
-        if search_query:
-            with st.spinner("문서 검색 및 AI 답변 생성 중..."):
-                results = search_documents(engine, vectorstore, search_query, school_id, embeddings)
-                
-                if results:
-                    display_search_results(results)
-                    st.write("---")
-                    ai_response = generate_ai_response(bedrock_client, search_query, results)
-                    st.subheader("🤖 AI 응답")
-                    st.markdown(ai_response)
-                else:
-                    department = find_relevant_department(engine, search_query, school_id)
-                    if department:
-                        st.info("📞 담당 부서 안내")
-                        contact_info = f"**{department['name']}** ({department.get('staff_name', '담당자')})\n- 전화번호: {department.get('staff_phone') or department.get('main_phone', '정보 없음')}\n- 이메일: {department.get('staff_email', '정보 없음')}"
-                        st.markdown(f"관련 문서를 찾지 못했습니다. **'{search_query}'** 관련 업무는 아래 부서로 문의하시면 정확한 답변을 받으실 수 있습니다.\n\n{contact_info}")
-                    else:
-                        st.warning("관련 문서를 찾을 수 없습니다. 학교 대표 부서나 홈페이지를 통해 문의해주세요.")
-
-    # 탭 2: PDF 관리
+        render_chat_tab(engine, vectorstore, bedrock_client, embeddings, school_id, selected_school,
+                        query_log_writer, answer_cache)
     with tab2:
-        st.header("📄 PDF 파일 업로드 및 관리")
-        uploaded_file = st.file_uploader("PDF 파일을 선택하세요", type=['pdf'], key=f"uploader_{school_id}")
-        
-        if uploaded_file:
-            school_code = get_school_code_by_id(engine, school_id)
-            s3_key = f"documents/{school_code}/{datetime.now().strftime('%Y%m%d')}_{uploaded_file.name}"
-            if st.button("업로드", key=f"upload_btn_{uploaded_file.name}"):
-                if upload_to_s3(uploaded_file, s3_client, s3_key):
-                    from database import save_file_metadata
-                    save_file_metadata(engine, uploaded_file.name, s3_key, "pdf", school_id)
-                    st.success(f"✅ '{uploaded_file.name}' 업로드 완료! Lambda에 의해 자동 처리됩니다.")
-                    time.sleep(1)
-                    st.rerun()
-                else:
-                    st.error("S3 업로드 실패")
-
-        st.divider()
-        st.subheader("📂 업로드된 파일 목록")
-        file_metadata = get_file_metadata(engine, school_id)
-        if not file_metadata.empty:
-            for idx, row in file_metadata.iterrows():
-                cols = st.columns([0.5, 0.2, 0.2, 0.1])
-                cols[0].text(row['filename'])
-                cols[1].text('✅ 처리완료' if row['processed'] else '⏳ 미처리')
-                cols[2].text(f"{int(row['chunks_count'])} 청크")
-                if cols[3].button("삭제", key=f"del_pdf_{row['id']}", type="primary"):
-                    s3_key_to_delete = row['s3_key'].replace(f"s3://{settings.S3_BUCKET_NAME}/", "")
-                    delete_file_from_s3(s3_client, s3_key_to_delete)
-                    delete_document_from_db(engine, row['id'])
-                    st.success(f"'{row['filename']}' 삭제 완료")
-                    st.rerun()
-        else:
-            st.info("업로드된 PDF 파일이 없습니다.")
-
-    # 탭 3: RSS 피드 관리
+        render_pdf_tab(engine, s3_client, school_id, answer_cache)
     with tab3:
-        st.header("🔗 RSS 피드 추가 및 관리")
-        rss_url = st.text_input("추가할 RSS 피드 URL을 입력하세요:", key=f"rss_url_{school_id}")
-        if st.button("➕ RSS 추가", disabled=not rss_url):
-            if add_rss_feed(engine, school_id, rss_url):
-                st.success("RSS 피드 추가 완료!")
-                st.rerun()
-            else:
-                st.warning("이미 등록된 피드이거나 추가에 실패했습니다.")
-
-        st.divider()
-        st.subheader("📡 등록된 RSS 피드 목록")
-        rss_feeds = get_rss_feeds(engine, school_id)
-        if not rss_feeds.empty:
-            for idx, row in rss_feeds.iterrows():
-                cols = st.columns([0.6, 0.3, 0.1])
-                cols[0].text(row['title'] or row['rss_url'])
-                cols[1].text(f"상태: {'✅' if row['status']=='active' else '⏸️'}")
-                if cols[2].button("삭제", key=f"del_rss_{row['id']}", type="primary"):
-                    delete_rss_feed(engine, row['id'])
-                    st.success(f"'{row['title']}' 피드 삭제 완료")
-                    st.rerun()
-        else:
-            st.info("등록된 RSS 피드가 없습니다.")
-            
-    # 탭 4: 파일 통계 (구현 예정)
+        render_rss_tab(engine, school_id, answer_cache)
     with tab4:
-        st.header("📊 파일 통계")
-        st.info("이 기능은 현재 개발 중입니다.")
-        # 여기에 통계 관련 UI 및 로직 추가 예정
+        render_stats_tab(engine, school_id)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,171 @@
+import json
+import threading
+import time
+from collections import Counter, OrderedDict
+
+import streamlit as st
+from langchain.schema import Document
+from sqlalchemy import text
+
+from config import settings
+from chatbot_logic import normalize_query
+from metrics import metrics
+
+UPSERT_ANSWER_SQL = text("""
+    INSERT INTO answer_cache (school_id, normalized_query, query, answer, sources, prewarmed, created_at, expires_at)
+    VALUES (:school_id, :normalized_query, :query, :answer, CAST(:sources AS JSONB), :prewarmed,
+            NOW(), NOW() + make_interval(secs => :ttl))
+    ON CONFLICT (school_id, normalized_query) DO UPDATE SET
+        query = EXCLUDED.query, answer = EXCLUDED.answer, sources = EXCLUDED.sources,
+        prewarmed = EXCLUDED.prewarmed, created_at = EXCLUDED.created_at, expires_at = EXCLUDED.expires_at
+""")
+
+# 적중 횟수는 메모리에 모았다가 이 간격(초)마다 한 번의 UPDATE로 반영합니다.
+HIT_FLUSH_INTERVAL = 30
+
+FLUSH_HITS_SQL = text("""
+    UPDATE answer_cache ac SET hit_count = ac.hit_count + h.hits
+    FROM unnest(CAST(:school_ids AS INTEGER[]), CAST(:normalized_queries AS TEXT[]), CAST(:hits AS INTEGER[]))
+         AS h(school_id, normalized_query, hits)
+    WHERE ac.school_id = h.school_id AND ac.normalized_query = h.normalized_query
+""")
+
+def serialize_sources(search_results):
+    return [{"content": doc.page_content, "metadata": doc.metadata} for doc in search_results]
+
+def deserialize_sources(sources):
+    return [Document(page_content=s["content"], metadata=s["metadata"]) for s in sources or []]
+
+class AnswerCache:
+    """학교·정규화 질의별 답변 캐시.
+
+    answer_cache 테이블에 저장하므로 배치 실행기로 미리 채운 항목을 앱/API 프로세스가
+    함께 사용하며, 프로세스마다 짧은 TTL의 메모리 캐시를 앞에 둡니다. 조회는 읽기 전용이며,
+    적중 횟수(hit_count)는 HIT_FLUSH_INTERVAL마다 묶어서 기록합니다.
+    """
+
+    def __init__(self, engine, ttl_seconds=None, local_ttl_seconds=60, local_size=512):
+        self.engine = engine
+        self.ttl_seconds = ttl_seconds or settings.ANSWER_CACHE_TTL_SECONDS
+        self.local_ttl_seconds = local_ttl_seconds
+        self.local_size = local_size
+        self._local = OrderedDict()
+        self._hits = Counter()
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _local_get(self, key):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return entry[1]
+
+    def _local_put(self, key, value):
+        with self._lock:
+            self._local[key] = (time.monotonic() + self.local_ttl_seconds, value)
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+    def _record_hit(self, key):
+        with self._lock:
+            self._hits[key] += 1
+            if time.monotonic() - self._last_flush < HIT_FLUSH_INTERVAL:
+                return
+            hits, self._hits = self._hits, Counter()
+            self._last_flush = time.monotonic()
+        self.flush_hits(hits)
+
+    def flush_hits(self, hits=None):
+        """모아 둔 적중 횟수를 한 번의 UPDATE로 반영합니다."""
+        if hits is None:
+            with self._lock:
+                hits, self._hits = self._hits, Counter()
+                self._last_flush = time.monotonic()
+        if not hits:
+            return
+        keys = sorted(hits)
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(FLUSH_HITS_SQL, {
+                    "school_ids": [k[0] for k in keys],
+                    "normalized_queries": [k[1] for k in keys],
+                    "hits": [hits[k] for k in keys]
+                })
+        except Exception as e:
+            st.warning(f"답변 캐시 적중 횟수 기록 실패: {str(e)}")
+
+    def get(self, school_id, query):
+        """캐시된 {"answer", "sources"(Document 목록), "prewarmed"}를 반환하고, 없으면 None을 반환합니다."""
+        key = (school_id, normalize_query(query))
+        value = self._local_get(key)
+        if value is None:
+            try:
+                with self.engine.connect() as conn:
+                    row = conn.execute(text("""
+                        SELECT answer, sources, prewarmed FROM answer_cache
+                        WHERE school_id = :school_id AND normalized_query = :normalized_query AND expires_at > NOW()
+                    """), {"school_id": key[0], "normalized_query": key[1]}).fetchone()
+            except Exception as e:
+                st.warning(f"답변 캐시 조회 실패: {str(e)}")
+                row = None
+            if row:
+                value = {"answer": row[0], "sources": row[1], "prewarmed": row[2]}
+                self._local_put(key, value)
+
+        metrics.record_cache("answer", value is not None)
+        if value is None:
+            return None
+        self._record_hit(key)
+        return {"answer": value["answer"], "sources": deserialize_sources(value["sources"]),
+                "prewarmed": value["prewarmed"]}
+
+    def put(self, school_id, query, answer, search_results, ttl_seconds=None, prewarmed=False):
+        self.put_many([(school_id, query, answer, search_results)], ttl_seconds, prewarmed)
+
+    def put_many(self, entries, ttl_seconds=None, prewarmed=False):
+        """(school_id, query, answer, search_results) 목록을 한 트랜잭션으로 저장합니다."""
+        rows = []
+        for school_id, query, answer, search_results in entries:
+            rows.append({
+                "school_id": school_id,
+                "normalized_query": normalize_query(query),
+                "query": query,
+                "answer": answer,
+                "sources": json.dumps(serialize_sources(search_results), ensure_ascii=False, default=str),
+                "prewarmed": prewarmed,
+                "ttl": ttl_seconds or self.ttl_seconds
+            })
+        if not rows:
+            return 0
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(UPSERT_ANSWER_SQL, rows)
+        except Exception as e:
+            st.warning(f"답변 캐시 저장 실패: {str(e)}")
+            return 0
+        with self._lock:
+            for row in rows:
+                self._local.pop((row["school_id"], row["normalized_query"]), None)
+        return len(rows)
+
+    def invalidate_school(self, school_id):
+        """문서가 바뀐 학교의 캐시 항목을 모두 삭제합니다."""
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(text("DELETE FROM answer_cache WHERE school_id = :school_id"), {"school_id": school_id})
+        except Exception as e:
+            st.warning(f"답변 캐시 삭제 실패: {str(e)}")
+        with self._lock:
+            for key in [k for k in self._local if k[0] == school_id]:
+                del self._local[key]
+
+@st.cache_resource
+def init_answer_cache(_engine):
+    """프로세스 전역 답변 캐시를 생성합니다."""
+    return AnswerCache(_engine)
@@ -0,0 +1,257 @@
+"""
+ClassMATE 헤드리스 검색/답변 API 서버.
+
+Streamlit UI와 같은 chatbot_logic/database 함수를 asyncio 기반 HTTP API로 제공합니다.
+블로킹 함수는 전용 스레드 풀에서 실행하고, 검색과 답변 생성은 각각 동시 처리 한도를 둡니다.
+
+실행:
+    python api_server.py --host 0.0.0.0 --port 8000
+"""
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, Field
+from starlette.concurrency import iterate_in_threadpool
+
+from config import settings
+from database import init_postgresql_vectorstore, init_pgvector, fetch_schools_list, find_relevant_department
+from aws_utils import init_aws_clients
+from chatbot_logic import hybrid_search_coalesced, generate_answer_coalesced, stream_answer_coalesced
+from answer_cache import init_answer_cache
+from metrics import trace
+from query_log import init_query_log_writer
+
+# --- 요청 모델 ---
+
+class QueryRequest(BaseModel):
+    school_id: int
+    query: str = Field(min_length=1, max_length=1000)
+
+class AnswerRequest(QueryRequest):
+    stream: bool = True
+
+# --- 동시 처리 제한 ---
+
+class ConcurrencyLimiter:
+    """동시 실행 수를 제한하고, 대기 시간이 초과되면 503으로 응답하게 합니다."""
+
+    def __init__(self, limit, timeout):
+        self._semaphore = asyncio.Semaphore(limit)
+        self._timeout = timeout
+
+    async def acquire(self):
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self._timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=503, detail="요청이 많아 처리할 수 없습니다. 잠시 후 다시 시도해주세요.")
+
+    def release(self):
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+# --- 애플리케이션 상태 ---
+
+@asynccontextmanager
+async def lifespan(app):
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=settings.API_WORKER_THREADS,
+                                                 thread_name_prefix="api-worker"))
+
+    engine = init_postgresql_vectorstore()
+    bedrock_client, embeddings, _ = init_aws_clients()
+    if not engine or not bedrock_client:
+        raise RuntimeError("시스템 초기화에 실패했습니다. 설정을 확인해주세요.")
+
+    app.state.engine = engine
+    app.state.bedrock_client = bedrock_client
+    app.state.embeddings = embeddings
+    app.state.vectorstore = init_pgvector(embeddings, engine)
+    app.state.query_log = init_query_log_writer(engine)
+    app.state.answer_cache = init_answer_cache(engine)
+    app.state.search_limiter = ConcurrencyLimiter(settings.API_MAX_CONCURRENT_SEARCHES, settings.API_QUEUE_TIMEOUT)
+    app.state.answer_limiter = ConcurrencyLimiter(settings.API_MAX_CONCURRENT_ANSWERS, settings.API_QUEUE_TIMEOUT)
+    yield
+    app.state.query_log.close()
+    app.state.answer_cache.flush_hits()
+
+app = FastAPI(title="ClassMATE API", lifespan=lifespan)
+
+# --- 헬퍼 ---
+
+def serialize_document(doc):
+    return {"content": doc.page_content, "metadata": doc.metadata}
+
+def format_sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+def answer_error(error):
+    # Bedrock 호출 실패(스로틀링 재시도 소진, 타임아웃 등)는 업스트림 오류로 응답합니다.
+    return HTTPException(status_code=502, detail=f"AI 응답 생성 실패: {error}")
+
+async def run_search(request):
+    state = app.state
+    async with state.search_limiter.slot():
+        try:
+            return await asyncio.to_thread(
+                hybrid_search_coalesced, state.engine, state.vectorstore, request.query, request.school_id, state.embeddings
+            )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"문서 검색 실패: {e}")
+
+async def run_department_lookup(request):
+    return await asyncio.to_thread(find_relevant_department, app.state.engine, request.query, request.school_id)
+
+def log_query(request, request_trace, result_count):
+    app.state.query_log.log(
+        request.school_id, request.query, result_count, request_trace.elapsed_ms,
+        stage_timings=request_trace.stages,
+        cache_hit=any(request_trace.cache.values()),
+        department_fallback=result_count == 0
+    )
+
+# --- 엔드포인트 ---
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+@app.get("/schools")
+async def schools():
+    return await asyncio.to_thread(fetch_schools_list, app.state.engine)
+
+@app.post("/search")
+async def search(request: QueryRequest):
+    with trace() as request_trace:
+        results = await run_search(request)
+    log_query(request, request_trace, len(results))
+    return {"results": [serialize_document(doc) for doc in results], "timings_ms": request_trace.stages}
+
+@app.post("/department")
+async def department(request: QueryRequest):
+    return {"department": await run_department_lookup(request)}
+
+@app.post("/answer")
+async def answer(request: AnswerRequest):
+    with trace() as request_trace:
+        cached = await asyncio.to_thread(app.state.answer_cache.get, request.school_id, request.query)
+        if cached:
+            log_query(request, request_trace, len(cached["sources"]))
+            sources = [serialize_document(doc) for doc in cached["sources"]]
+            if request.stream:
+                async def cached_stream():
+                    yield format_sse("sources", {"sources": sources})
+                    yield format_sse("token", {"text": cached["answer"]})
+                    yield format_sse("done", {"cached": True, "timings_ms": request_trace.stages})
+                return StreamingResponse(cached_stream(), media_type="text/event-stream")
+            return {"answer": cached["answer"], "sources": sources, "cached": True,
+                    "timings_ms": request_trace.stages}
+
+        results = await run_search(request)
+
+    if not results:
+        department_info = await run_department_lookup(request)
+        log_query(request, request_trace, 0)
+        if request.stream:
+            async def fallback_stream():
+                yield format_sse("department", {"department": department_info})
+                yield format_sse("done", {"timings_ms": request_trace.stages})
+            return StreamingResponse(fallback_stream(), media_type="text/event-stream")
+        return {"answer": None, "sources": [], "department": department_info}
+
+    limiter = app.state.answer_limiter
+    if not request.stream:
+        with trace() as answer_trace:
+            async with limiter.slot():
+                try:
+                    answer_text = await asyncio.to_thread(
+                        generate_answer_coalesced, app.state.bedrock_client, request.query,
+                        request.school_id, results
+                    )
+                except Exception as e:
+                    raise answer_error(e)
+        request_trace.stages.update(answer_trace.stages)
+        await asyncio.to_thread(app.state.answer_cache.put, request.school_id, request.query, answer_text, results)
+        log_query(request, request_trace, len(results))
+        return {"answer": answer_text, "sources": [serialize_document(doc) for doc in results],
+                "timings_ms": request_trace.stages}
+
+    # 스트리밍: 답변 슬롯을 미리 확보해 혼잡 시 스트림 시작 전에 503으로 응답합니다.
+    # 첫 조각까지 받은 뒤 응답을 시작하므로, 모델 호출 자체가 실패하면 502로 응답합니다.
+    await limiter.acquire()
+    # 답변은 trace 블록이 끝난 뒤 (합쳐진 스트림은 다른 스레드에서) 생성되므로, 이 요청이 받은
+    # 첫 조각·전체 스트림 시간을 여기서 직접 request_trace에 기록합니다.
+    stream_started = time.perf_counter()
+
+    def record_stream_stage(stage):
+        request_trace.stages.setdefault(stage, (time.perf_counter() - stream_started) * 1000)
+
+    chunks = stream_answer_coalesced(app.state.bedrock_client, request.query, request.school_id, results)
+    try:
+        first_piece = await asyncio.to_thread(next, chunks, None)
+    except Exception as e:
+        limiter.release()
+        record_stream_stage("answer.stream_total")
+        log_query(request, request_trace, len(results))
+        raise answer_error(e)
+    record_stream_stage("answer.first_token")
+
+    finished = False
+
+    async def finish_stream():
+        # 본문 생성기의 finally와 응답 후 BackgroundTask 양쪽에서 불리며, 한 번만 실행됩니다.
+        # 본문을 보내기 전에 연결이 끊기면 생성기가 시작되지 않아 finally가 실행되지 않기 때문입니다.
+        nonlocal finished
+        if finished:
+            return
+        finished = True
+        limiter.release()
+        # 오류·연결 끊김으로 끝난 경우에도 스트림 시간을 남기며, elapsed_ms는 여기서 읽으므로 답변 생성까지 포함합니다.
+        record_stream_stage("answer.stream_total")
+        log_query(request, request_trace, len(results))
+
+    async def answer_stream():
+        try:
+            yield format_sse("sources", {"sources": [serialize_document(doc) for doc in results]})
+            pieces = []
+            if first_piece is not None:
+                pieces.append(first_piece)
+                yield format_sse("token", {"text": first_piece})
+            try:
+                async for piece in iterate_in_threadpool(chunks):
+                    pieces.append(piece)
+                    yield format_sse("token", {"text": piece})
+            except Exception as e:
+                # 응답 상태 코드를 이미 보냈으므로 스트림 안에서 오류를 알리고, 답변은 캐시하지 않습니다.
+                yield format_sse("error", {"detail": f"AI 응답 생성 실패: {e}"})
+                return
+            record_stream_stage("answer.stream_total")
+            await asyncio.to_thread(app.state.answer_cache.put, request.school_id, request.query,
+                                    "".join(pieces), results)
+            yield format_sse("done", {"timings_ms": request_trace.stages})
+        finally:
+            await finish_stream()
+
+    return StreamingResponse(answer_stream(), media_type="text/event-stream",
+                             background=BackgroundTask(finish_stream))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ClassMATE 헤드리스 API 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port)
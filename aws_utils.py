@@ -2,44 +2,37 @@ import boto3
 import streamlit as st
 import tempfile
 import os
+import threading
+import time
 import feedparser
-from langchain_aws import BedrockEmbeddings
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from boto3.s3.transfer import TransferConfig
 from langchain_community.document_loaders import PyPDFLoader
 from langchain.text_splitter import CharacterTextSplitter
 from sqlalchemy import text
 
+from bedrock import get_bedrock_client, get_embeddings
 from config import settings
-
-# BedrockEmbeddings 클래스를 동적으로 import
-try:
-    from langchain_aws import BedrockEmbeddings
-except ImportError:
-    try:
-        from langchain_community.embeddings import BedrockEmbeddings
-    except ImportError:
-        BedrockEmbeddings = None
+from metrics import metrics, timed
+from near_dedup import ChunkDeduplicator
 
 # --- AWS 클라이언트 초기화 ---
 
 @st.cache_resource
 def init_aws_clients():
-    """EC2 IAM 역할을 사용하여 AWS 클라이언트들을 초기화합니다."""
+    """EC2 IAM 역할을 사용하여 AWS 클라이언트들을 초기화합니다.
+
+    Bedrock 클라이언트와 임베딩은 bedrock.py의 프로세스 공용 인스턴스입니다.
+    """
     try:
-        bedrock_runtime_client = boto3.client("bedrock-runtime", region_name=settings.AWS_REGION)
+        bedrock_runtime_client = get_bedrock_client()
         s3_client = boto3.client("s3", region_name=settings.AWS_REGION)
         
         embeddings = None
-        if BedrockEmbeddings:
-            try:
-                embeddings = BedrockEmbeddings(
-                    client=bedrock_runtime_client,
-                    region_name=settings.AWS_REGION,
-                    model_id="cohere.embed-v4:0" # cohere.embed-multilingual-v3.0
-                )
-            except Exception as e:
-                st.warning(f"임베딩 모델 초기화 실패: {str(e)}")
-        else:
-            st.warning("BedrockEmbeddings를 사용할 수 없어 임베딩 기능이 비활성화됩니다.")
+        try:
+            embeddings = get_embeddings()
+        except Exception as e:
+            st.warning(f"임베딩 모델 초기화 실패: {str(e)}")
         
         return bedrock_runtime_client, embeddings, s3_client
     except Exception as e:
@@ -48,15 +41,84 @@ def init_aws_clients():
 
 # --- S3 관련 함수 ---
 
-def upload_to_s3(file, s3_client, key):
+MB = 1024 * 1024
+
+def get_transfer_config():
+    """멀티파트 업로드용 S3 전송 설정을 생성합니다."""
+    return TransferConfig(
+        multipart_threshold=settings.S3_MULTIPART_THRESHOLD_MB * MB,
+        multipart_chunksize=settings.S3_MULTIPART_CHUNKSIZE_MB * MB,
+        max_concurrency=settings.S3_MAX_CONCURRENCY,
+        use_threads=True
+    )
+
+def upload_to_s3(file, s3_client, key, callback=None):
     """파일을 S3에 업로드합니다."""
     try:
-        s3_client.upload_fileobj(file, settings.S3_BUCKET_NAME, key)
+        file.seek(0)
+        s3_client.upload_fileobj(file, settings.S3_BUCKET_NAME, key,
+                                 Config=get_transfer_config(), Callback=callback)
         return True
     except Exception as e:
         st.error(f"S3 업로드 실패: {str(e)}")
         return False
 
+# 앱에서 올린 파일은 수집 작업 큐가 처리하므로, S3 트리거 Lambda가 건너뛰도록 객체 메타데이터로 표시합니다.
+# (lambda_pdf_processor_production.py의 QUEUE_INGEST_METADATA와 같아야 합니다)
+QUEUE_INGEST_METADATA = {"classmate-ingest": "queue"}
+
+def upload_files_to_s3(files, s3_client, on_progress=None):
+    """여러 파일을 S3에 동시에 업로드합니다.
+
+    files는 (파일 객체, S3 키) 튜플의 리스트이며, on_progress(index, 전송 바이트, 전체 바이트)는
+    업로드가 진행되는 동안 호출 스레드에서 주기적으로 호출됩니다.
+    반환값은 파일 순서대로 (S3 키, 성공 여부, 오류 메시지) 튜플의 리스트입니다.
+    업로드한 객체에는 QUEUE_INGEST_METADATA가 붙어 Lambda가 처리하지 않습니다.
+    """
+    transfer_config = get_transfer_config()
+    lock = threading.Lock()
+    sent = [0] * len(files)
+    totals = [getattr(file, 'size', None) or 0 for file, _ in files]
+
+    def make_callback(index):
+        def callback(bytes_amount):
+            with lock:
+                sent[index] += bytes_amount
+        return callback
+
+    def upload_one(index):
+        # 작업 스레드에서는 st.* 호출이 불가능하므로 예외는 호출 스레드로 전달합니다.
+        file, key = files[index]
+        file.seek(0)
+        s3_client.upload_fileobj(file, settings.S3_BUCKET_NAME, key,
+                                 ExtraArgs={"Metadata": QUEUE_INGEST_METADATA},
+                                 Config=transfer_config, Callback=make_callback(index))
+
+    def report_progress():
+        if on_progress:
+            with lock:
+                snapshot = list(sent)
+            for index, sent_bytes in enumerate(snapshot):
+                on_progress(index, sent_bytes, totals[index])
+
+    results = [None] * len(files)
+    with ThreadPoolExecutor(max_workers=max(1, settings.S3_UPLOAD_WORKERS)) as executor:
+        futures = {executor.submit(upload_one, i): i for i in range(len(files))}
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = futures[future]
+                error = future.exception()
+                if error is None:
+                    # 0바이트 파일도 완료로 표시되도록 전송량을 전체 크기로 맞춥니다.
+                    with lock:
+                        sent[index] = max(sent[index], totals[index])
+                results[index] = (files[index][1], error is None, str(error) if error else None)
+            report_progress()
+
+    return results
+
 def delete_file_from_s3(s3_client, s3_key):
     """S3에서 파일을 삭제합니다."""
     try:
@@ -68,18 +130,62 @@ def delete_file_from_s3(s3_client, s3_key):
 
 # --- 데이터 처리 함수 ---
 
+def store_chunk(conn, dedup, school_id, document_id, chunk_text, embeddings=None):
+    """청크 하나를 저장합니다. 유사 중복이면 모드에 따라 건너뛰거나 원본에 연결합니다.
+
+    'inserted' | 'linked' | 'skipped' 중 하나를 반환합니다.
+    """
+    signature, bands, duplicate_id = dedup.check(chunk_text)
+    params = {"school_id": school_id, "document_id": document_id, "chunk_text": chunk_text,
+              "minhash": signature.tolist(), "bands": bands}
+    if duplicate_id is not None and dedup.mode == "skip":
+        return "skipped"
+    if duplicate_id is not None:
+        # 임베딩 호출 없이 원본 청크의 임베딩을 복사합니다.
+        with timed("ingest.db_insert"):
+            conn.execute(text("""
+                INSERT INTO document_chunks (school_id, document_id, chunk_text, embedding, minhash, lsh_bands, duplicate_of)
+                SELECT :school_id, :document_id, :chunk_text, c.embedding,
+                       CAST(:minhash AS BIGINT[]), CAST(:bands AS BIGINT[]), c.id
+                FROM document_chunks c
+                WHERE c.school_id = :school_id AND c.id = :duplicate_of
+            """), {**params, "duplicate_of": duplicate_id})
+        return "linked"
+
+    embedding_vector = None
+    if embeddings:
+        with timed("ingest.embed"):
+            embedding_vector = embeddings.embed_query(chunk_text)
+    with timed("ingest.db_insert"):
+        conn.execute(text("""
+            INSERT INTO document_chunks (school_id, document_id, chunk_text, embedding, minhash, lsh_bands)
+            VALUES (:school_id, :document_id, :chunk_text, :embedding, CAST(:minhash AS BIGINT[]), CAST(:bands AS BIGINT[]))
+        """), {**params, "embedding": embedding_vector})
+    return "inserted"
+
 def process_pdf_from_s3(s3_client, key, engine, school_id, embeddings=None):
     """S3의 PDF 파일을 처리하여 PostgreSQL DB에 저장합니다."""
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
+        return ingest_pdf(s3_client, key, engine, school_id, embeddings)
+    except Exception as e:
+        st.error(f"PDF 처리 실패: {str(e)}")
+        return 0
+
+def ingest_pdf(s3_client, key, engine, school_id, embeddings=None, on_progress=None):
+    """PDF 처리 본체. 실패 시 예외를 그대로 올리며, on_progress(처리한 청크 수, 전체 청크 수)를 호출합니다."""
+    started = time.perf_counter()
+    tmp_path = None
+    try:
+        with timed("ingest.pdf.download"), tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
             s3_client.download_fileobj(settings.S3_BUCKET_NAME, key, tmp_file)
             tmp_path = tmp_file.name
         
-        pdf_loader = PyPDFLoader(tmp_path)
-        splitter = CharacterTextSplitter.from_tiktoken_encoder(
-            separator="\n", chunk_size=800, chunk_overlap=100
-        )
-        documents = pdf_loader.load_and_split(text_splitter=splitter)
+        with timed("ingest.pdf.split"):
+            pdf_loader = PyPDFLoader(tmp_path)
+            splitter = CharacterTextSplitter.from_tiktoken_encoder(
+                separator="\n", chunk_size=800, chunk_overlap=100
+            )
+            documents = pdf_loader.load_and_split(text_splitter=splitter)
         
         with engine.connect() as conn:
             source_url = f"s3://{settings.S3_BUCKET_NAME}/{key}"
@@ -100,91 +206,112 @@ def process_pdf_from_s3(s3_client, key, engine, school_id, embeddings=None):
                 """), {"school_id": school_id, "file_name": file_name, "source_url": source_url, "chunks_count": len(documents)}).fetchone()[0]
                 document_id = result
 
-            conn.execute(text("DELETE FROM document_chunks WHERE document_id = :document_id"), {"document_id": document_id})
+            # 이 문서 청크에 연결된 다른 문서의 유사 중복 청크는 DB 트리거가 다시 연결합니다 (0006 마이그레이션).
+            conn.execute(text("DELETE FROM document_chunks WHERE school_id = :school_id AND document_id = :document_id"),
+                         {"school_id": school_id, "document_id": document_id})
 
-            for doc in documents:
-                embedding_vector = embeddings.embed_query(doc.page_content) if embeddings else None
-                conn.execute(text("""
-                    INSERT INTO document_chunks (document_id, chunk_text, embedding)
-                    VALUES (:document_id, :chunk_text, :embedding)
-                """), {"document_id": document_id, "chunk_text": doc.page_content, "embedding": embedding_vector})
+            dedup = ChunkDeduplicator(conn, school_id)
+            stored_chunks = 0
+            for index, doc in enumerate(documents):
+                if store_chunk(conn, dedup, school_id, document_id, doc.page_content, embeddings) != "skipped":
+                    stored_chunks += 1
+                if on_progress:
+                    on_progress(index + 1, len(documents))
             
+            conn.execute(text("UPDATE documents SET chunks_count = :chunks_count WHERE id = :id"),
+                         {"chunks_count": stored_chunks, "id": document_id})
             conn.commit()
-        
-        os.unlink(tmp_path)
-        return len(documents)
-    except Exception as e:
-        st.error(f"PDF 처리 실패: {str(e)}")
-        return 0
+    finally:
+        if tmp_path:
+            os.unlink(tmp_path)
+
+    elapsed = time.perf_counter() - started
+    metrics.record("ingest.pdf.total", elapsed)
+    metrics.record_ingest("pdf", len(documents), elapsed)
+    return stored_chunks
 
 def process_rss_feed(engine, rss_url, school_id, embeddings=None):
     """RSS 피드를 처리하여 DB에 저장합니다."""
     try:
+        chunks_processed, skipped_duplicates = ingest_rss(engine, rss_url, school_id, embeddings)
+        if skipped_duplicates > 0:
+            st.info(f"📊 처리 결과: 신규 {chunks_processed}개 청크 추가, 중복 {skipped_duplicates}개 항목 스킵")
+        return chunks_processed
+    except Exception as e:
+        st.error(f"RSS 피드 처리 실패: {str(e)}")
+        return 0
+
+def ingest_rss(engine, rss_url, school_id, embeddings=None, on_progress=None):
+    """RSS 처리 본체. (신규 청크 수, 중복으로 건너뛴 항목 수)를 반환하며 실패 시 예외를 올립니다.
+
+    on_progress(처리한 항목 수, 전체 항목 수)를 항목마다 호출합니다.
+    """
+    started = time.perf_counter()
+    with timed("ingest.rss.fetch"):
         feed = feedparser.parse(rss_url)
-        chunks_processed = 0
-        skipped_duplicates = 0
+    chunks_processed = 0
+    skipped_duplicates = 0
+    
+    with engine.connect() as conn:
+        feed_title = feed.feed.get('title', rss_url)
+        rss_feed_result = conn.execute(text("""
+            INSERT INTO rss_feeds (school_id, url, title, status)
+            VALUES (:school_id, :url, :title, 'active')
+            ON CONFLICT (school_id, url) DO UPDATE SET title = EXCLUDED.title, last_processed = NOW()
+            RETURNING id
+        """),
+        {"school_id": school_id, "url": rss_url, "title": feed_title}).fetchone()
         
-        with engine.connect() as conn:
-            feed_title = feed.feed.get('title', rss_url)
-            rss_feed_result = conn.execute(text("""
-                INSERT INTO rss_feeds (school_id, url, title, status)
-                VALUES (:school_id, :url, :title, 'active')
-                ON CONFLICT (school_id, url) DO UPDATE SET title = EXCLUDED.title, last_processed = NOW()
-                RETURNING id
-            """),
-            {"school_id": school_id, "url": rss_url, "title": feed_title}).fetchone()
-            
-            rss_feed_id = rss_feed_result[0]
+        rss_feed_id = rss_feed_result[0]
+        
+        existing_doc = conn.execute(text("""
+            SELECT id FROM documents WHERE source_url = :rss_url AND category = 'rss' AND school_id = :school_id
+        """),
+        {"rss_url": rss_url, "school_id": school_id}).fetchone()
+        
+        document_id = existing_doc[0] if existing_doc else conn.execute(text("""
+            INSERT INTO documents (school_id, source_url, category, processed, chunks_count)
+            VALUES (:school_id, :rss_url, 'rss', FALSE, 0) RETURNING id
+        """),
+        {"school_id": school_id, "rss_url": rss_url}).fetchone()[0]
+        
+        dedup = ChunkDeduplicator(conn, school_id)
+        existing_contents = conn.execute(text("SELECT chunk_text FROM document_chunks WHERE school_id = :school_id AND document_id = :id"),
+                                         {"school_id": school_id, "id": document_id}).fetchall()
+        existing_titles = {line.replace('제목:', '').strip() for row in existing_contents for line in row[0].split('\n') if line.strip().startswith('제목:')}
+        existing_links = {line.replace('링크:', '').strip() for row in existing_contents for line in row[0].split('\n') if line.strip().startswith('링크:')}
+
+        for index, entry in enumerate(feed.entries):
+            if on_progress:
+                on_progress(index, len(feed.entries))
+            entry_title = entry.get('title', '').strip()
+            entry_link = entry.get('link', '').strip()
+
+            if entry_title in existing_titles or entry_link in existing_links:
+                skipped_duplicates += 1
+                continue
             
-            existing_doc = conn.execute(text("""
-                SELECT id FROM documents WHERE source_url = :rss_url AND category = 'rss' AND school_id = :school_id
-            """),
-            {"rss_url": rss_url, "school_id": school_id}).fetchone()
+            content = f"제목: {entry_title}\n내용: {entry.get('summary', '')}\n링크: {entry_link}\n발행일: {entry.get('published', '')}"
             
-            document_id = existing_doc[0] if existing_doc else conn.execute(text("""
-                INSERT INTO documents (school_id, source_url, category, processed, chunks_count)
-                VALUES (:school_id, :rss_url, 'rss', FALSE, 0) RETURNING id
-            """),
-            {"school_id": school_id, "rss_url": rss_url}).fetchone()[0]
+            splitter = CharacterTextSplitter.from_tiktoken_encoder(separator="\n", chunk_size=800, chunk_overlap=100)
+            chunks = splitter.split_text(content)
             
-            existing_contents = conn.execute(text("SELECT chunk_text FROM document_chunks WHERE document_id = :id"), {"id": document_id}).fetchall()
-            existing_titles = {line.replace('제목:', '').strip() for row in existing_contents for line in row[0].split('\n') if line.strip().startswith('제목:')}
-            existing_links = {line.replace('링크:', '').strip() for row in existing_contents for line in row[0].split('\n') if line.strip().startswith('링크:')}
-
-            for entry in feed.entries:
-                entry_title = entry.get('title', '').strip()
-                entry_link = entry.get('link', '').strip()
-
-                if entry_title in existing_titles or entry_link in existing_links:
-                    skipped_duplicates += 1
-                    continue
-                
-                content = f"제목: {entry_title}\n내용: {entry.get('summary', '')}\n링크: {entry_link}\n발행일: {entry.get('published', '')}"
-                
-                splitter = CharacterTextSplitter.from_tiktoken_encoder(separator="\n", chunk_size=800, chunk_overlap=100)
-                chunks = splitter.split_text(content)
-                
-                for chunk in chunks:
-                    embedding_vector = embeddings.embed_query(chunk) if embeddings else None
-                    conn.execute(text("""
-                        INSERT INTO document_chunks (document_id, chunk_text, embedding)
-                        VALUES (:doc_id, :chunk, :vec)
-                    """),
-                    {"doc_id": document_id, "chunk": chunk, "vec": embedding_vector})
+            for chunk in chunks:
+                if store_chunk(conn, dedup, school_id, document_id, chunk, embeddings) != "skipped":
                     chunks_processed += 1
-                
-                existing_titles.add(entry_title)
-                existing_links.add(entry_link)
+            
+            existing_titles.add(entry_title)
+            existing_links.add(entry_link)
+        if on_progress:
+            on_progress(len(feed.entries), len(feed.entries))
 
-            total_chunks = conn.execute(text("SELECT COUNT(*) FROM document_chunks WHERE document_id = :id"), {"id": document_id}).fetchone()[0]
-            conn.execute(text("UPDATE documents SET processed = TRUE, chunks_count = :count WHERE id = :id"), {"count": total_chunks, "id": document_id})
-            conn.execute(text("UPDATE rss_feeds SET last_processed = NOW(), processed_count = :count WHERE id = :id"), {"count": total_chunks, "id": rss_feed_id})
-            conn.commit()
-        
-        if skipped_duplicates > 0:
-            st.info(f"📊 처리 결과: 신규 {chunks_processed}개 청크 추가, 중복 {skipped_duplicates}개 항목 스킵")
-        
-        return chunks_processed
-    except Exception as e:
-        st.error(f"RSS 피드 처리 실패: {str(e)}")
-        return 0
+        total_chunks = conn.execute(text("SELECT COUNT(*) FROM document_chunks WHERE school_id = :school_id AND document_id = :id"),
+                                    {"school_id": school_id, "id": document_id}).fetchone()[0]
+        conn.execute(text("UPDATE documents SET processed = TRUE, chunks_count = :count WHERE id = :id"), {"count": total_chunks, "id": document_id})
+        conn.execute(text("UPDATE rss_feeds SET last_processed = NOW(), processed_count = :count WHERE id = :id"), {"count": total_chunks, "id": rss_feed_id})
+        conn.commit()
+    
+    elapsed = time.perf_counter() - started
+    metrics.record("ingest.rss.total", elapsed)
+    metrics.record_ingest("rss", chunks_processed, elapsed)
+    return chunks_processed, skipped_duplicates
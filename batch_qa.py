@@ -0,0 +1,175 @@
+"""
+배치 질의응답 실행기.
+
+(학교, 질문) JSONL을 읽어 질의 임베딩을 묶음으로 계산한 뒤, 검색과 답변 생성을 제한된 동시성으로
+실행하고 결과(답변, 출처, 단계별 시간)를 JSONL로 기록합니다. --warm-cache를 지정하면 결과를
+답변 캐시에 미리 채워 피크 시간 전에 사용할 수 있습니다.
+
+입력 형식 (한 줄에 하나):
+    {"school": "연성대학교", "question": "장학금 신청 방법"}
+    school에는 학교 이름, 코드(YSU), 또는 ID를 쓸 수 있습니다.
+
+사용 예:
+    python batch_qa.py questions.jsonl --output answers.jsonl --concurrency 8 --warm-cache --cache-ttl-hours 24
+"""
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import text
+
+from database import init_postgresql_vectorstore, init_pgvector, find_relevant_department
+from aws_utils import init_aws_clients
+from chatbot_logic import (
+    search_documents, generate_ai_response, is_error_response, prime_query_embeddings
+)
+from answer_cache import AnswerCache
+from metrics import trace
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="ClassMATE 배치 질의응답 실행기")
+    parser.add_argument("input", help="(school, question) JSONL 파일")
+    parser.add_argument("--output", help="결과 JSONL 파일 (기본: 표준 출력)")
+    parser.add_argument("--concurrency", type=int, default=8, help="동시 검색/답변 작업 수")
+    parser.add_argument("--embed-batch-size", type=int, default=64, help="임베딩 요청 한 번에 묶을 질문 수")
+    parser.add_argument("--retrieval-only", action="store_true", help="답변 생성 없이 검색만 실행")
+    parser.add_argument("--warm-cache", action="store_true", help="생성된 답변을 답변 캐시에 미리 저장")
+    parser.add_argument("--cache-ttl-hours", type=float, default=24.0, help="미리 저장한 답변의 유지 시간")
+    return parser.parse_args(argv)
+
+def load_schools(engine):
+    """이름/코드/ID 문자열을 school_id로 매핑하는 딕셔너리를 만듭니다."""
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT id, name, code FROM schools")).fetchall()
+    mapping = {}
+    for school_id, name, code in rows:
+        mapping[str(school_id)] = school_id
+        mapping[name] = school_id
+        if code:
+            mapping[code] = school_id
+    return mapping
+
+def read_questions(path, schools):
+    items = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            school = str(record.get("school", "")).strip()
+            question = str(record.get("question", "")).strip()
+            items.append({
+                "line": line_number,
+                "school": school,
+                "school_id": schools.get(school),
+                "question": question
+            })
+    return items
+
+def embed_queries_batched(embeddings, queries):
+    """여러 질의를 한 번의 Bedrock 호출로 임베딩합니다 (Cohere 모델)."""
+    model_id = getattr(embeddings, "model_id", "") or ""
+    if not model_id.startswith("cohere."):
+        # Titan 등 단건 입력만 받는 모델은 개별 호출로 처리합니다.
+        return [embeddings.embed_query(q) for q in queries]
+
+    # BedrockEmbeddings.embed_query와 같은 요청 형식을 사용해 캐시된 벡터가 앱 검색과 일치하게 합니다.
+    response = embeddings.client.invoke_model(
+        body=json.dumps({"texts": queries, "input_type": "search_document"}),
+        modelId=model_id, accept="application/json", contentType="application/json"
+    )
+    vectors = json.loads(response["body"].read())["embeddings"]
+    if isinstance(vectors, dict):  # embedding_types를 지원하는 모델은 {"float": [...]} 형태로 반환
+        vectors = vectors["float"]
+    return vectors
+
+def summarize_source(doc):
+    return {
+        "title": doc.metadata.get("title"),
+        "date": doc.metadata.get("date"),
+        "source": doc.metadata.get("source"),
+        "relevance_score": doc.metadata.get("relevance_score")
+    }
+
+def answer_item(item, engine, vectorstore, embeddings, bedrock_client, retrieval_only):
+    result = {"school": item["school"], "school_id": item["school_id"], "question": item["question"],
+              "answer": None, "sources": [], "department": None, "error": None}
+    if item["school_id"] is None:
+        result["error"] = f"알 수 없는 학교: {item['school']}"
+        return result, []
+    if not item["question"]:
+        result["error"] = "질문이 비어 있습니다."
+        return result, []
+
+    with trace() as item_trace:
+        results = search_documents(engine, vectorstore, item["question"], item["school_id"], embeddings)
+        if results and not retrieval_only:
+            result["answer"] = generate_ai_response(bedrock_client, item["question"], results)
+            if is_error_response(result["answer"]):
+                result["error"] = result["answer"]
+        elif not results:
+            result["department"] = find_relevant_department(engine, item["question"], item["school_id"])
+
+    result["sources"] = [summarize_source(doc) for doc in results]
+    result["result_count"] = len(results)
+    result["timings_ms"] = {k: round(v, 2) for k, v in item_trace.stages.items()}
+    result["total_ms"] = round(item_trace.elapsed_ms, 2)
+    return result, results
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    engine = init_postgresql_vectorstore()
+    bedrock_client, embeddings, _ = init_aws_clients()
+    if not engine or not bedrock_client:
+        print("시스템 초기화에 실패했습니다. 설정을 확인해주세요.", file=sys.stderr)
+        return 1
+    vectorstore = init_pgvector(embeddings, engine)
+
+    items = read_questions(args.input, load_schools(engine))
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    cache_entries = []
+    started = time.perf_counter()
+    answered = failed = 0
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as executor:
+            for offset in range(0, len(items), args.embed_batch_size):
+                batch = items[offset:offset + args.embed_batch_size]
+
+                # 1. 배치의 고유 질문을 한 번에 임베딩하고 질의 임베딩 캐시에 넣습니다.
+                if vectorstore and embeddings:
+                    questions = sorted({i["question"] for i in batch if i["question"] and i["school_id"]})
+                    if questions:
+                        prime_query_embeddings(embeddings, questions, embed_queries_batched(embeddings, questions))
+
+                # 2. 검색/답변은 제한된 동시성으로 실행하고 입력 순서대로 기록합니다.
+                futures = [executor.submit(answer_item, item, engine, vectorstore, embeddings,
+                                           bedrock_client, args.retrieval_only) for item in batch]
+                for item, future in zip(batch, futures):
+                    result, documents = future.result()
+                    output.write(json.dumps(result, ensure_ascii=False, default=str) + "\n")
+                    if result["error"]:
+                        failed += 1
+                    elif result["answer"]:
+                        answered += 1
+                        cache_entries.append((item["school_id"], item["question"], result["answer"], documents))
+                output.flush()
+                print(f"[batch] {min(offset + len(batch), len(items))}/{len(items)} 처리", file=sys.stderr)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    if args.warm_cache and cache_entries:
+        cache = AnswerCache(engine)
+        saved = cache.put_many(cache_entries, ttl_seconds=int(args.cache_ttl_hours * 3600), prewarmed=True)
+        print(f"[batch] 답변 캐시에 {saved}건 저장", file=sys.stderr)
+
+    elapsed = time.perf_counter() - started
+    print(f"[batch] 완료: {len(items)}건, 답변 {answered}건, 실패 {failed}건, {elapsed:.1f}초", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""
+Bedrock 모델 접근 계층.
+
+앱(Streamlit), API 서버, 수집 워커, 배치, Lambda가 모두 이 모듈로 bedrock-runtime
+클라이언트를 만듭니다.
+
+- botocore 연결 풀(max_pool_connections)을 동시 호출 수에 맞춥니다. 기본값 10이면
+  11번째 동시 호출부터 연결을 기다리게 됩니다.
+- adaptive 재시도 모드: 스로틀링 응답을 받으면 클라이언트 쪽 전송 속도를 낮추고
+  지수 백오프로 재시도합니다.
+- 클라이언트·임베딩·ChatBedrock 인스턴스를 프로세스에서 공유합니다 (모두 스레드 안전).
+- 호출 지연(bedrock.<API 이름>)과 스로틀링·재시도·오류 횟수를 metrics에 기록합니다.
+
+Lambda 패키지에서도 import할 수 있도록 config는 get_* 함수 안에서만 불러옵니다.
+"""
+import threading
+import time
+
+import boto3
+from botocore.config import Config
+from langchain_aws import BedrockEmbeddings, ChatBedrock
+
+from metrics import metrics
+
+THROTTLE_ERROR_CODES = {"ThrottlingException", "TooManyRequestsException", "ServiceQuotaExceededException"}
+# max_tokens가 호출마다 조금씩 달라도 같은 ChatBedrock 인스턴스를 쓰도록 올림합니다.
+LLM_MAX_TOKENS_STEP = 128
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+# --- 호출 계측 ---
+
+def _on_before_call(model, context, **kwargs):
+    context["bedrock_call"] = (model.name, time.perf_counter())
+
+def _record_call(context, retry_attempts, error=False):
+    operation, started = context.get("bedrock_call", (None, None))
+    if operation is None:
+        return
+    # 스트리밍 API는 응답 헤더를 받은 시점(첫 이벤트 전)까지의 시간입니다.
+    metrics.record(f"bedrock.{operation}", time.perf_counter() - started)
+    if retry_attempts:
+        metrics.increment("bedrock.retries", retry_attempts)
+    if error:
+        metrics.increment("bedrock.errors")
+
+def _on_after_call(http_response, parsed, context, **kwargs):
+    # 오류 응답(스로틀링 재시도 소진 등)도 여기로 오며, 예외는 이 이벤트 뒤에 발생합니다.
+    _record_call(context, parsed.get("ResponseMetadata", {}).get("RetryAttempts", 0),
+                 error=http_response.status_code >= 300)
+
+def _on_after_call_error(exception, context, **kwargs):
+    # 연결 오류·타임아웃처럼 응답을 받지 못한 경우
+    response = getattr(exception, "response", None) or {}
+    _record_call(context, response.get("ResponseMetadata", {}).get("RetryAttempts", 0), error=True)
+
+def _on_needs_retry(response, **kwargs):
+    # 재시도 여부는 botocore 재시도 핸들러가 정하며, 여기서는 시도마다 스로틀링만 셉니다.
+    if response is None:
+        return None
+    http_response, parsed = response
+    code = parsed.get("Error", {}).get("Code")
+    if code in THROTTLE_ERROR_CODES or http_response.status_code == 429:
+        metrics.increment("bedrock.throttled")
+    return None
+
+def instrument_client(client):
+    """클라이언트에 지연·스로틀링 계측 이벤트 핸들러를 등록합니다."""
+    service = client.meta.service_model.service_id.hyphenize()
+    events = client.meta.events
+    events.register(f"before-call.{service}", _on_before_call)
+    events.register(f"after-call.{service}", _on_after_call)
+    events.register(f"after-call-error.{service}", _on_after_call_error)
+    events.register(f"needs-retry.{service}", _on_needs_retry)
+    return client
+
+# --- 클라이언트 생성 ---
+
+def make_bedrock_client(region, max_pool_connections=64, max_attempts=8, retry_mode="adaptive",
+                        connect_timeout=5, read_timeout=120):
+    """연결 풀·재시도 설정과 계측이 적용된 bedrock-runtime 클라이언트를 생성합니다."""
+    config = Config(
+        region_name=region,
+        max_pool_connections=max_pool_connections,
+        retries={"max_attempts": max_attempts, "mode": retry_mode},
+        connect_timeout=connect_timeout,
+        read_timeout=read_timeout
+    )
+    return instrument_client(boto3.client("bedrock-runtime", config=config))
+
+def _get_shared(key, factory):
+    with _shared_lock:
+        value = _shared.get(key)
+        if value is None:
+            value = factory()
+            _shared[key] = value
+        return value
+
+def get_bedrock_client():
+    """프로세스 공용 bedrock-runtime 클라이언트 (처음 호출 시 생성)."""
+    from config import settings
+
+    return _get_shared("client", lambda: make_bedrock_client(
+        settings.BEDROCK_REGION or settings.AWS_REGION,
+        max_pool_connections=settings.BEDROCK_MAX_POOL_CONNECTIONS,
+        max_attempts=settings.BEDROCK_MAX_ATTEMPTS,
+        retry_mode=settings.BEDROCK_RETRY_MODE,
+        connect_timeout=settings.BEDROCK_CONNECT_TIMEOUT,
+        read_timeout=settings.BEDROCK_READ_TIMEOUT
+    ))
+
+def get_embeddings():
+    """프로세스 공용 임베딩 인스턴스."""
+    from config import settings
+
+    client = get_bedrock_client()
+    return _get_shared("embeddings", lambda: BedrockEmbeddings(client=client, model_id=settings.EMBEDDING_MODEL_ID))
+
+def get_llm(client, model_id, max_tokens, temperature=0.7):
+    """(클라이언트, 모델, max_tokens 구간, temperature)별 공용 ChatBedrock 인스턴스."""
+    max_tokens = -(-max_tokens // LLM_MAX_TOKENS_STEP) * LLM_MAX_TOKENS_STEP
+    return _get_shared(("llm", client, model_id, max_tokens, temperature), lambda: ChatBedrock(
+        client=client,
+        model_id=model_id,
+        model_kwargs={"temperature": temperature, "max_tokens": max_tokens}
+    ))
@@ -0,0 +1 @@
+"""로컬 대체 서비스(Bedrock/S3/RSS)를 사용하는 오프라인 성능 벤치마크 모음."""
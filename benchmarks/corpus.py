@@ -0,0 +1,86 @@
+import random
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+from xml.sax.saxutils import escape
+
+# 벤치마크 문서에 사용할 학사 관련 어휘 (PDF 기본 글꼴로 표현 가능한 ASCII 표기)
+VOCABULARY = [
+    "tuition", "scholarship", "registration", "enrollment", "graduation", "credits", "semester",
+    "leave", "return", "dormitory", "library", "exam", "grades", "internship", "career",
+    "counseling", "admission", "freshman", "course", "lecture", "deadline", "payment", "refund",
+    "certificate", "transcript", "advisor", "department", "office", "schedule", "application",
+    "policy", "notice", "campus", "facility", "budget", "research", "laboratory", "seminar",
+    "portal", "student", "faculty", "staff", "support", "program", "major", "minor", "thesis"
+]
+
+DEPARTMENTS = [
+    ("Academic Affairs", ["registration", "course", "grades", "graduation", "leave", "return"]),
+    ("Student Support", ["scholarship", "counseling", "dormitory", "career", "internship"]),
+    ("Admissions", ["admission", "freshman", "application"]),
+    ("Finance", ["tuition", "payment", "refund", "budget"])
+]
+
+def make_sentence(rng, words=12):
+    return " ".join(rng.choice(VOCABULARY) for _ in range(words)).capitalize() + "."
+
+def make_document_pages(rng, pages=3, lines_per_page=40):
+    """페이지별 텍스트 줄 목록을 생성합니다."""
+    return [[make_sentence(rng) for _ in range(lines_per_page)] for _ in range(pages)]
+
+def make_queries(rng, count):
+    return [" ".join(rng.sample(VOCABULARY, 3)) for _ in range(count)]
+
+def _pdf_escape(line):
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def make_pdf(pages):
+    """텍스트 줄 목록으로 구성된 최소한의 PDF 바이트를 생성합니다."""
+    objects = []
+    page_count = len(pages)
+    font_id = 3
+    first_page_id = 4
+    kids = " ".join(f"{first_page_id + i * 2} 0 R" for i in range(page_count))
+
+    objects.append("<< /Type /Catalog /Pages 2 0 R >>")
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {page_count} >>")
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    for i, lines in enumerate(pages):
+        content_id = first_page_id + i * 2 + 1
+        stream = "BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(f"({_pdf_escape(l)}) '" for l in lines) + " ET"
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {content_id} 0 R >>"
+        )
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref_offset = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode("latin-1")
+    return bytes(out)
+
+def make_rss(rng, title, entries, base_link):
+    """항목 수가 entries개인 RSS 2.0 XML 문자열을 생성합니다."""
+    now = datetime(2024, 3, 1, tzinfo=timezone.utc)
+    items = []
+    for i in range(entries):
+        items.append(
+            "<item>"
+            f"<title>{escape(make_sentence(rng, 6))} #{i}</title>"
+            f"<link>{escape(base_link)}/notice/{i}</link>"
+            f"<description>{escape(' '.join(make_sentence(rng) for _ in range(8)))}</description>"
+            f"<pubDate>{format_datetime(now - timedelta(hours=i))}</pubDate>"
+            "</item>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        f'<rss version="2.0"><channel><title>{escape(title)}</title>'
+        f"<link>{escape(base_link)}</link><description>bench</description>"
+        + "".join(items) + "</channel></rss>"
+    )
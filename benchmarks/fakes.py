@@ -0,0 +1,222 @@
+import hashlib
+import io
+import json
+import math
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- Bedrock 대체 ---
+
+class _Meta:
+    """boto3 클라이언트의 meta 속성을 흉내 냅니다."""
+    def __init__(self, region_name):
+        self.region_name = region_name
+
+def embed_text(text, dim):
+    """텍스트를 결정적인 단위 벡터로 변환합니다.
+
+    토큰 해싱 방식이므로 같은 단어를 많이 공유하는 텍스트일수록 코사인 유사도가 높아집니다.
+    """
+    vector = [0.0] * dim
+    for token in re.findall(r'\w+', text.lower()):
+        digest = hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest()
+        value = int.from_bytes(digest, 'little')
+        vector[value % dim] += 1.0 if (value >> 32) & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector))
+    if norm == 0:
+        vector[0] = 1.0
+        return vector
+    return [v / norm for v in vector]
+
+class FakeBedrockRuntime:
+    """bedrock-runtime 클라이언트의 in-process 대체 구현.
+
+    Cohere/Titan 임베딩과 Anthropic 메시지 API 요청 형식을 이해하며,
+    호출마다 설정된 지연 시간(초)만큼 대기한 뒤 결정적인 응답을 반환합니다.
+    """
+
+    def __init__(self, dim=1536, embed_latency=0.0, chat_latency=0.0,
+                 stream_chunk_latency=0.0, region_name="us-west-1"):
+        self.dim = dim
+        self.embed_latency = embed_latency
+        self.chat_latency = chat_latency
+        self.stream_chunk_latency = stream_chunk_latency
+        self.meta = _Meta(region_name)
+        self._lock = threading.Lock()
+        self.calls = {"embed": 0, "chat": 0}
+
+    def _count(self, kind):
+        with self._lock:
+            self.calls[kind] += 1
+
+    def _answer_text(self, body):
+        messages = body.get("messages") or []
+        prompt = body.get("prompt", "")
+        if messages:
+            content = messages[-1].get("content", "")
+            prompt = content if isinstance(content, str) else " ".join(
+                part.get("text", "") for part in content if isinstance(part, dict))
+        doc_count = prompt.count("<doc>")
+        return f"벤치마크 응답입니다. 참고 문서 {doc_count}건을 바탕으로 답변했습니다."
+
+    def invoke_model(self, body, modelId, accept="application/json", contentType="application/json", **kwargs):
+        request = json.loads(body)
+
+        if "texts" in request:
+            self._count("embed")
+            time.sleep(self.embed_latency)
+            vectors = [embed_text(t, self.dim) for t in request["texts"]]
+            payload = {"embeddings": vectors, "id": "bench", "texts": request["texts"]}
+        elif "inputText" in request:
+            self._count("embed")
+            time.sleep(self.embed_latency)
+            payload = {"embedding": embed_text(request["inputText"], self.dim),
+                       "inputTextTokenCount": len(request["inputText"].split())}
+        else:
+            self._count("chat")
+            time.sleep(self.chat_latency)
+            answer = self._answer_text(request)
+            if "messages" in request:
+                payload = {
+                    "id": "bench", "type": "message", "role": "assistant",
+                    "content": [{"type": "text", "text": answer}],
+                    "stop_reason": "end_turn",
+                    "usage": {"input_tokens": len(body) // 4, "output_tokens": len(answer) // 2}
+                }
+            else:
+                payload = {"completion": answer, "stop_reason": "stop_sequence"}
+
+        return {"body": io.BytesIO(json.dumps(payload).encode("utf-8")),
+                "contentType": "application/json"}
+
+    def invoke_model_with_response_stream(self, body, modelId, accept="application/json",
+                                          contentType="application/json", **kwargs):
+        request = json.loads(body)
+        self._count("chat")
+        answer = self._answer_text(request)
+
+        def events():
+            time.sleep(self.chat_latency)
+            yield {"chunk": {"bytes": json.dumps({"type": "message_start", "message": {
+                "usage": {"input_tokens": len(body) // 4}}}).encode("utf-8")}}
+            for word in answer.split(" "):
+                time.sleep(self.stream_chunk_latency)
+                yield {"chunk": {"bytes": json.dumps({
+                    "type": "content_block_delta", "index": 0,
+                    "delta": {"type": "text_delta", "text": word + " "}}).encode("utf-8")}}
+            yield {"chunk": {"bytes": json.dumps({
+                "type": "message_delta", "delta": {"stop_reason": "end_turn"},
+                "usage": {"output_tokens": len(answer) // 2}}).encode("utf-8")}}
+            yield {"chunk": {"bytes": json.dumps({"type": "message_stop"}).encode("utf-8")}}
+
+        return {"body": events(), "contentType": "application/json"}
+
+# --- S3 대체 ---
+
+class LocalS3Client:
+    """로컬 디렉터리에 객체를 저장하는 S3 클라이언트 대체 구현."""
+
+    def __init__(self, root=None):
+        self.root = root or tempfile.mkdtemp(prefix="bench_s3_")
+
+    def _path(self, bucket, key):
+        path = os.path.join(self.root, bucket, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def _metadata_path(self, bucket, key):
+        return self._path(bucket, key) + ".metadata.json"
+
+    def upload_fileobj(self, Fileobj, Bucket, Key, ExtraArgs=None, Callback=None, Config=None):
+        metadata = (ExtraArgs or {}).get("Metadata")
+        if metadata:
+            with open(self._metadata_path(Bucket, Key), "w") as f:
+                json.dump(metadata, f)
+        with open(self._path(Bucket, Key), "wb") as f:
+            while True:
+                data = Fileobj.read(1024 * 1024)
+                if not data:
+                    break
+                f.write(data)
+                if Callback:
+                    Callback(len(data))
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        data = Body if isinstance(Body, bytes) else Body.read()
+        with open(self._path(Bucket, Key), "wb") as f:
+            f.write(data)
+        return {}
+
+    def head_object(self, Bucket, Key, **kwargs):
+        path = self._metadata_path(Bucket, Key)
+        metadata = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                metadata = json.load(f)
+        return {"ContentLength": os.path.getsize(self._path(Bucket, Key)), "Metadata": metadata}
+
+    def download_fileobj(self, Bucket, Key, Fileobj, ExtraArgs=None, Callback=None, Config=None):
+        with open(self._path(Bucket, Key), "rb") as f:
+            shutil.copyfileobj(f, Fileobj)
+
+    def delete_object(self, Bucket, Key, **kwargs):
+        for path in (self._path(Bucket, Key), self._metadata_path(Bucket, Key)):
+            if os.path.exists(path):
+                os.remove(path)
+        return {}
+
+    def cleanup(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+# --- RSS 대체 ---
+
+class LocalRSSServer:
+    """메모리에 등록된 RSS 문서를 제공하는 로컬 HTTP 서버.
+
+    feeds는 {경로: RSS XML 문자열} 딕셔너리이며, 서버는 데몬 스레드에서 실행됩니다.
+    """
+
+    def __init__(self, feeds=None, host="127.0.0.1", port=0):
+        self.feeds = dict(feeds or {})
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = server.feeds.get(self.path)
+                if body is None:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/rss+xml; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url_for(self, path):
+        return f"{self.base_url}{path}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
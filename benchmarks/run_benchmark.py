@@ -0,0 +1,316 @@
+"""
+오프라인 End-to-End 벤치마크.
+
+로컬 PostgreSQL(pgvector 확장 필요)과 in-process Bedrock/S3 대체 구현, 로컬 RSS 서버를 사용해
+수집(process_pdf_from_s3, process_rss_feed, lambda_handler)과 질의(hybrid_search,
+find_relevant_department, generate_answer) 경로의 처리량과 p50/p95/p99 지연 시간을
+여러 코퍼스 크기에서 측정하고 JSON으로 출력합니다.
+질의 경로는 오류를 삼키지 않는 함수를 호출하므로, 실패하거나 검색 결과가 비면 벤치마크가 중단됩니다.
+
+사용 예:
+    python -m benchmarks.run_benchmark --db-name classmate_bench --sizes 10 50 200 --output bench.json
+
+주의: 지정한 데이터베이스의 테이블을 매 실행마다 삭제하고 다시 생성합니다.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.corpus import DEPARTMENTS, make_document_pages, make_pdf, make_queries, make_rss
+from benchmarks.fakes import FakeBedrockRuntime, LocalRSSServer, LocalS3Client
+
+BENCH_SCHOOL_CODE = "YSU"  # Lambda가 documents/YSU/ 경로를 school_id 1로 매핑합니다.
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="ClassMATE 오프라인 성능 벤치마크")
+    parser.add_argument("--db-host", default=os.environ.get("DB_HOST", "localhost"))
+    parser.add_argument("--db-port", type=int, default=int(os.environ.get("DB_PORT", 5432)))
+    parser.add_argument("--db-name", default=os.environ.get("BENCH_DB_NAME", "classmate_bench"))
+    parser.add_argument("--db-user", default=os.environ.get("DB_USER", "postgres"))
+    parser.add_argument("--db-password", default=os.environ.get("DB_PASSWORD", "postgres"))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 200],
+                        help="코퍼스 크기 (PDF 문서 수). 크기마다 스키마를 초기화합니다.")
+    parser.add_argument("--pages", type=int, default=3, help="PDF 문서당 페이지 수")
+    parser.add_argument("--rss-entries", type=int, default=30, help="RSS 피드당 항목 수")
+    parser.add_argument("--queries", type=int, default=50, help="검색 질의 수")
+    parser.add_argument("--query-concurrency", type=int, default=1, help="동시 검색 스레드 수")
+    parser.add_argument("--answers", type=int, default=10, help="generate_answer 호출 수")
+    parser.add_argument("--search-mode", default="exact", choices=["exact", "half", "binary", "full"],
+                        help="VECTOR_SEARCH_MODE (document_chunks 직접 검색 방식)")
+    parser.add_argument("--embed-latency-ms", type=float, default=0.0, help="임베딩 호출당 지연")
+    parser.add_argument("--chat-latency-ms", type=float, default=0.0, help="채팅 호출당 지연")
+    parser.add_argument("--vector-eval", action="store_true",
+                        help="압축 벡터 인덱스(full/half/binary)를 만들고 크기와 recall@5를 측정")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="결과 JSON 파일 경로 (기본: 표준 출력)")
+    return parser.parse_args(argv)
+
+def configure_environment(args):
+    """애플리케이션 모듈 import 전에 설정 환경 변수를 지정합니다."""
+    os.environ.update({
+        "DB_HOST": args.db_host,
+        "DB_PORT": str(args.db_port),
+        "DB_NAME": args.db_name,
+        "DB_USER": args.db_user,
+        "DB_PASSWORD": args.db_password,
+        "S3_BUCKET_NAME": "bench-bucket",
+        # 수집 경로는 document_chunks에만 저장하므로 langchain(PGVector 컬렉션) 모드로는 검색 결과가 없습니다.
+        "VECTOR_SEARCH_MODE": args.search_mode,
+    })
+    os.environ.setdefault("AWS_REGION", "us-west-1")
+    os.environ.setdefault("AWS_DEFAULT_REGION", os.environ["AWS_REGION"])
+
+# --- 통계 ---
+
+def percentile(samples, q):
+    """선형 보간 방식의 백분위수를 계산합니다."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+def summarize(latencies, wall_seconds, errors=0, items=None):
+    """지연 시간 목록을 처리량/백분위수 요약으로 변환합니다."""
+    count = len(latencies)
+    summary = {
+        "count": count,
+        "errors": errors,
+        "wall_s": round(wall_seconds, 4),
+        "throughput_per_s": round(count / wall_seconds, 3) if wall_seconds > 0 else None,
+        "mean_ms": round(sum(latencies) / count * 1000, 3) if count else None,
+    }
+    for q in (50, 95, 99):
+        value = percentile(latencies, q)
+        summary[f"p{q}_ms"] = round(value * 1000, 3) if value is not None else None
+    if items is not None:
+        summary["items"] = items
+        summary["items_per_s"] = round(items / wall_seconds, 3) if wall_seconds > 0 else None
+    return summary
+
+def run_timed(fn, args_list, concurrency=1):
+    """fn을 args_list의 각 인자로 호출하고 (결과 목록, 지연 목록, 전체 소요 시간)을 반환합니다."""
+    def call(call_args):
+        started = time.perf_counter()
+        result = fn(*call_args)
+        return result, time.perf_counter() - started
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            outputs = list(executor.map(call, args_list))
+    else:
+        outputs = [call(a) for a in args_list]
+    wall = time.perf_counter() - started
+    return [o[0] for o in outputs], [o[1] for o in outputs], wall
+
+# --- 데이터 준비 ---
+
+# 주의: 실행할 때마다 모두 삭제합니다. 운영 DB에 사용하지 마세요.
+BENCH_TABLES = ("schema_migrations", "ingest_jobs", "answer_cache", "query_log", "staff_members", "business_keywords",
+                "departments", "document_chunks", "documents", "rss_feeds", "schools")
+
+def reset_schema(engine):
+    """벤치마크 DB의 테이블을 모두 삭제하고 migrations/로 스키마를 다시 만듭니다."""
+    from sqlalchemy import text
+    import migrate
+    import partitions
+    with engine.connect() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {', '.join(BENCH_TABLES)} CASCADE"))
+        conn.commit()
+    migrate.migrate(engine)
+    with engine.connect() as conn:
+        school_id = conn.execute(text(
+            "INSERT INTO schools (name, code) VALUES ('벤치마크대학교', :code) RETURNING id"
+        ), {"code": BENCH_SCHOOL_CODE}).fetchone()[0]
+        for name, keywords in DEPARTMENTS:
+            dept_id = conn.execute(text("""
+                INSERT INTO departments (school_id, name, description, main_phone)
+                VALUES (:school_id, :name, :name, '000-0000') RETURNING id
+            """), {"school_id": school_id, "name": name}).fetchone()[0]
+            for weight, keyword in enumerate(reversed(keywords), start=1):
+                conn.execute(text("""
+                    INSERT INTO business_keywords (department_id, keyword, weight)
+                    VALUES (:dept_id, :keyword, :weight)
+                """), {"dept_id": dept_id, "keyword": keyword, "weight": weight})
+            conn.execute(text("""
+                INSERT INTO staff_members (department_id, name, position, phone, email, is_head)
+                VALUES (:dept_id, 'Head', 'Manager', '000-0001', 'head@example.com', TRUE)
+            """), {"dept_id": dept_id})
+        conn.commit()
+    partitions.add_school_partition(engine, school_id)
+    return school_id
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+# --- 벤치마크 본체 ---
+
+def benchmark_size(size, args, modules, fakes, rss_server):
+    database, aws_utils, chatbot_logic, lambda_module, vector_index = modules
+    bedrock, s3, embeddings = fakes
+    bucket = os.environ["S3_BUCKET_NAME"]
+    rng = random.Random(args.seed + size)
+
+    engine = database.init_postgresql_vectorstore()
+    school_id = reset_schema(engine)
+    results = {"corpus_size": size}
+
+    # 1. 앱 내 PDF 처리
+    app_keys = []
+    for i in range(size):
+        key = f"documents/{BENCH_SCHOOL_CODE}/bench_app_{size}_{i}.pdf"
+        s3.put_object(Bucket=bucket, Key=key, Body=make_pdf(make_document_pages(rng, args.pages)))
+        app_keys.append(key)
+    chunk_counts, latencies, wall = run_timed(
+        aws_utils.process_pdf_from_s3,
+        [(s3, key, engine, school_id, embeddings) for key in app_keys]
+    )
+    results["process_pdf_from_s3"] = summarize(
+        latencies, wall, errors=sum(1 for c in chunk_counts if not c), items=sum(chunk_counts))
+
+    # 2. Lambda PDF 처리 (S3 이벤트)
+    lambda_keys = []
+    for i in range(size):
+        key = f"documents/{BENCH_SCHOOL_CODE}/bench_lambda_{size}_{i}.pdf"
+        s3.put_object(Bucket=bucket, Key=key, Body=make_pdf(make_document_pages(rng, args.pages)))
+        lambda_keys.append(key)
+    events = [({"Records": [{"s3": {"bucket": {"name": bucket}, "object": {"key": key}}}]}, None)
+              for key in lambda_keys]
+    responses, latencies, wall = run_timed(lambda_module.lambda_handler, events)
+    lambda_chunks = 0
+    for response in responses:
+        if response.get("statusCode") == 200 and response.get("body", "").startswith("{"):
+            # 'Successfully processed N chunks' 메시지에서 청크 수를 읽습니다.
+            lambda_chunks += int(json.loads(response["body"])["message"].split()[2])
+    results["lambda_handler"] = summarize(
+        latencies, wall, errors=sum(1 for r in responses if r.get("statusCode") != 200), items=lambda_chunks)
+
+    # 3. RSS 피드 처리
+    feed_urls = []
+    for i in range(max(1, size // 5)):
+        path = f"/bench/{size}/feed_{i}.xml"
+        rss_server.feeds[path] = make_rss(rng, f"Bench feed {i}", args.rss_entries, rss_server.url_for(path))
+        feed_urls.append(rss_server.url_for(path))
+    chunk_counts, latencies, wall = run_timed(
+        aws_utils.process_rss_feed, [(engine, url, school_id, embeddings) for url in feed_urls]
+    )
+    results["process_rss_feed"] = summarize(
+        latencies, wall, errors=sum(1 for c in chunk_counts if not c), items=sum(chunk_counts))
+
+    # 4. 검색
+    if args.search_mode in vector_index.COMPACT_MODES:
+        vector_index.create_compact_index(engine, args.search_mode)
+    vectorstore = database.init_pgvector(embeddings, engine)
+    queries = make_queries(rng, args.queries)
+    search_results, latencies, wall = run_timed(
+        chatbot_logic.hybrid_search,
+        [(engine, vectorstore, q, school_id, embeddings) for q in queries],
+        concurrency=args.query_concurrency
+    )
+    empty = sum(1 for r in search_results if not r)
+    if empty:
+        raise RuntimeError(f"검색 결과가 없는 질의가 {empty}/{len(queries)}개입니다 "
+                           f"(VECTOR_SEARCH_MODE={args.search_mode}).")
+    results["hybrid_search"] = summarize(
+        latencies, wall, items=sum(len(r) for r in search_results))
+
+    # 5. 부서 검색
+    departments, latencies, wall = run_timed(
+        database.find_relevant_department, [(engine, q, school_id) for q in queries],
+        concurrency=args.query_concurrency
+    )
+    results["find_relevant_department"] = summarize(
+        latencies, wall, items=sum(1 for d in departments if d))
+
+    # 6. 답변 생성
+    answer_inputs = [(bedrock, q, r) for q, r in zip(queries, search_results)][:args.answers]
+    answers, latencies, wall = run_timed(chatbot_logic.generate_answer, answer_inputs)
+    results["generate_answer"] = summarize(latencies, wall)
+
+    # 7. 압축 벡터 인덱스 크기 및 정확 검색 대비 recall
+    if args.vector_eval:
+        for mode in vector_index.COMPACT_MODES:
+            vector_index.create_compact_index(engine, mode)
+        results["vector_index"] = vector_index.evaluate(engine, school_id, sample=args.queries, k=5)
+
+    with engine.connect() as conn:
+        results["stored_chunks"] = conn.exec_driver_sql("SELECT COUNT(*) FROM document_chunks").scalar()
+    return results
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_environment(args)
+
+    # 설정이 환경 변수에서 로드되므로 애플리케이션 모듈은 환경 구성 후 import 합니다.
+    import aws_utils
+    import chatbot_logic
+    import database
+    import lambda_pdf_processor_production as lambda_module
+    import vector_index
+    from langchain_aws import BedrockEmbeddings
+
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith("streamlit"):
+            logging.getLogger(name).setLevel(logging.ERROR)
+
+    bedrock = FakeBedrockRuntime(
+        embed_latency=args.embed_latency_ms / 1000, chat_latency=args.chat_latency_ms / 1000,
+        region_name=os.environ["AWS_REGION"]
+    )
+    s3 = LocalS3Client()
+    embeddings = BedrockEmbeddings(client=bedrock, region_name=os.environ["AWS_REGION"],
+                                   model_id="cohere.embed-v4:0")
+    lambda_module.s3_client = s3
+    lambda_module.embeddings = BedrockEmbeddings(client=bedrock, model_id="amazon.titan-embed-text-v2:0")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "parameters": {k: v for k, v in vars(args).items() if k not in ("db_password", "output")},
+        },
+        "results": []
+    }
+
+    try:
+        with LocalRSSServer() as rss_server:
+            for size in args.sizes:
+                result = benchmark_size(size, args, (database, aws_utils, chatbot_logic, lambda_module, vector_index),
+                                        (bedrock, s3, embeddings), rss_server)
+                report["results"].append(result)
+                print(f"[bench] size={size} 완료", file=sys.stderr)
+    finally:
+        s3.cleanup()
+
+    report["meta"]["bedrock_calls"] = dict(bedrock.calls)
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
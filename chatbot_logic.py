@@ -1,95 +1,146 @@
 import streamlit as st
 import json
 import re
+import threading
+import time
+from collections import OrderedDict
 from langchain.schema import Document
-from langchain_aws import ChatBedrock
 from sqlalchemy import text
 
+from bedrock import get_llm
 from database import is_similar_keyword
+from context_builder import build_context, choose_max_tokens
+from config import settings
+from metrics import metrics, timed
+from singleflight import SingleFlight, StreamFlight
+from vector_index import SEARCH_MODES, search_similar_chunks
+
+# --- 질의 임베딩 캐시 ---
+
+QUERY_EMBEDDING_CACHE_SIZE = 1024
+_query_embedding_cache = OrderedDict()
+_query_embedding_lock = threading.Lock()
+
+def embed_query_cached(embeddings, query):
+    """질의 임베딩을 LRU 캐시를 통해 계산합니다."""
+    key = (getattr(embeddings, 'model_id', None), query.strip())
+    with _query_embedding_lock:
+        cached = _query_embedding_cache.get(key)
+        if cached is not None:
+            _query_embedding_cache.move_to_end(key)
+    metrics.record_cache("query_embedding", cached is not None)
+    if cached is not None:
+        return cached
+
+    with timed("search.query_embedding"):
+        vector = embeddings.embed_query(query)
+
+    with _query_embedding_lock:
+        _query_embedding_cache[key] = vector
+        if len(_query_embedding_cache) > QUERY_EMBEDDING_CACHE_SIZE:
+            _query_embedding_cache.popitem(last=False)
+    return vector
+
+def prime_query_embeddings(embeddings, queries, vectors):
+    """미리 계산한 질의 임베딩을 캐시에 넣어 이후 검색에서 임베딩 호출을 생략하게 합니다."""
+    model_id = getattr(embeddings, 'model_id', None)
+    with _query_embedding_lock:
+        for query, vector in zip(queries, vectors):
+            _query_embedding_cache[(model_id, query.strip())] = vector
+            _query_embedding_cache.move_to_end((model_id, query.strip()))
+        while len(_query_embedding_cache) > QUERY_EMBEDDING_CACHE_SIZE:
+            _query_embedding_cache.popitem(last=False)
 
 # --- 챗봇 핵심 로직 ---
 
-def search_documents(engine, vectorstore, query, school_id, embeddings):
-    """벡터 검색과 키워드 검색을 결합한 하이브리드 검색을 수행합니다."""
-    try:
-        # 1. 벡터 유사도 검색 (by LangChain PGVector)
-        if vectorstore:
-            # school_id를 기준으로 필터링
-            filter_criteria = {"school_id": school_id}
-            vector_results = vectorstore.similarity_search_with_relevance_scores(
-                query=query,
+@timed("search.total")
+def hybrid_search(engine, vectorstore, query, school_id, embeddings):
+    """벡터 검색과 키워드 검색을 결합한 하이브리드 검색을 수행합니다. 실패하면 예외를 그대로 올립니다."""
+    # 1. 벡터 유사도 검색
+    if settings.VECTOR_SEARCH_MODE in SEARCH_MODES and embeddings:
+        # document_chunks 임베딩 직접 검색 (압축 인덱스 후보 + 원본 벡터 재순위화)
+        query_embedding = embed_query_cached(embeddings, query)
+        with timed("search.vector"), engine.begin() as conn:
+            rows = search_similar_chunks(conn, school_id, query_embedding, k=5,
+                                         mode=settings.VECTOR_SEARCH_MODE)
+        vector_results = [(chunk_row_to_document(row, query), 1 - float(row.distance)) for row in rows]
+    elif vectorstore:
+        # LangChain PGVector 컬렉션 검색
+        query_embedding = embed_query_cached(embeddings or vectorstore.embedding_function, query)
+        # school_id를 기준으로 필터링
+        filter_criteria = {"school_id": school_id}
+        with timed("search.vector"):
+            scored_results = vectorstore.similarity_search_with_score_by_vector(
+                embedding=query_embedding,
                 k=5,
                 filter=filter_criteria
             )
-            # vector_results는 (Document, score) 튜플의 리스트
-        else:
-            vector_results = []
-
-        # 2. 키워드 기반 검색 (Fallback)
-        with engine.connect() as conn:
-            keyword_results_raw = conn.execute(text(f"""
-                SELECT dc.chunk_text, d.source_url, d.file_name, d.category, d.created_at
-                FROM document_chunks dc
-                JOIN documents d ON dc.document_id = d.id
-                WHERE d.school_id = :school_id AND dc.chunk_text ILIKE :query
-                ORDER BY d.created_at DESC
-                LIMIT 5
-            """), {"school_id": school_id, "query": f"%{query}%"}).fetchall()
-
-        # 3. 결과 통합 및 Document 객체 변환
-        processed_sources = set()
-        combined_results = []
-
-        # 벡터 검색 결과 처리
-        for doc, score in vector_results:
-            if doc.metadata['source'] not in processed_sources:
-                doc.metadata['relevance_score'] = score
-                combined_results.append(doc)
-                processed_sources.add(doc.metadata['source'])
-
-        # 키워드 검색 결과 처리 (벡터 검색 결과와 중복되지 않게)
-        for row in keyword_results_raw:
-            source_url = row.source_url
-            if source_url not in processed_sources:
-                metadata = {
-                    "source": source_url,
-                    "filename": row.file_name or "RSS 공지사항",
-                    "category": row.category,
-                    "date": row.created_at.strftime("%Y-%m-%d") if row.created_at else "N/A",
-                    "title": extract_title_from_text(row.chunk_text),
-                    "relevance_score": calculate_relevance_score(query, row.chunk_text, {}) # 점수 별도 계산
-                }
-                combined_results.append(Document(page_content=row.chunk_text, metadata=metadata))
-                processed_sources.add(source_url)
-        
-        # 최종적으로 관련성 점수 기준으로 정렬
-        combined_results.sort(key=lambda x: x.metadata.get('relevance_score', 0.0), reverse=True)
-        
-        return combined_results[:5] # 상위 5개 결과만 반환
+        # 거리 점수를 similarity_search_with_relevance_scores와 같은 관련성 점수로 변환
+        relevance_score_fn = vectorstore._select_relevance_score_fn()
+        vector_results = [(doc, relevance_score_fn(score)) for doc, score in scored_results]
+    else:
+        vector_results = []
+
+    # 2. 키워드 기반 검색 (Fallback)
+    with timed("search.keyword"), engine.connect() as conn:
+        keyword_results_raw = conn.execute(text(f"""
+            SELECT dc.chunk_text, d.source_url, d.file_name, d.category, d.created_at
+            FROM document_chunks dc
+            JOIN documents d ON dc.document_id = d.id
+            WHERE dc.school_id = :school_id AND dc.duplicate_of IS NULL AND dc.chunk_text ILIKE :query
+            ORDER BY d.created_at DESC
+            LIMIT 5
+        """), {"school_id": school_id, "query": f"%{query}%"}).fetchall()
+
+    # 3. 결과 통합 및 Document 객체 변환
+    processed_sources = set()
+    combined_results = []
 
+    # 벡터 검색 결과 처리
+    for doc, score in vector_results:
+        if doc.metadata['source'] not in processed_sources:
+            doc.metadata['relevance_score'] = score
+            combined_results.append(doc)
+            processed_sources.add(doc.metadata['source'])
+
+    # 키워드 검색 결과 처리 (벡터 검색 결과와 중복되지 않게)
+    for row in keyword_results_raw:
+        source_url = row.source_url
+        if source_url not in processed_sources:
+            combined_results.append(chunk_row_to_document(row, query))
+            processed_sources.add(source_url)
+    
+    # 최종적으로 관련성 점수 기준으로 정렬
+    combined_results.sort(key=lambda x: x.metadata.get('relevance_score', 0.0), reverse=True)
+    
+    return combined_results[:5] # 상위 5개 결과만 반환
+
+def search_documents(engine, vectorstore, query, school_id, embeddings):
+    """hybrid_search의 UI용 버전. 실패하면 오류를 표시하고 빈 결과를 반환합니다."""
+    try:
+        return hybrid_search(engine, vectorstore, query, school_id, embeddings)
     except Exception as e:
         st.error(f"문서 검색 실패: {str(e)}")
         return []
 
-def generate_ai_response(bedrock_client, query, search_results):
-    """검색된 문서를 바탕으로 AI 답변을 생성합니다."""
-    try:
-        # ChatBedrock 인스턴스 생성
-        llm = ChatBedrock(
-            client=bedrock_client,
-            model_id="anthropic.claude-3-sonnet-20240229-v1:0", # Sonnet 모델 사용
-            model_kwargs={"temperature": 0.7, "max_tokens": 4000}
-        )
-
-        if search_results:
-            context = "\n".join([f"<doc>{doc.page_content}</doc>" for doc in search_results])
-            sources = "\n".join([f"- {doc.metadata.get('title', '제목 없음')} ({doc.metadata.get('date', '날짜 정보 없음')})" for doc in search_results])
-            
-            prompt = f"""당신은 학사 정보 전문 AI 챗봇 'ClassMATE'입니다. 주어진 <docs> 안의 문서 내용을 바탕으로 사용자의 질문에 대해 명확하고 친절하게 한국어로 답변해주세요.
+ANSWER_MODEL_ID = "anthropic.claude-3-sonnet-20240229-v1:0"
+ERROR_RESPONSE_PREFIX = "죄송합니다. AI 응답 생성 중 오류가 발생했습니다"
+
+def create_llm(bedrock_client, max_tokens=4000):
+    """답변 생성에 사용할 ChatBedrock 인스턴스를 반환합니다 (max_tokens 구간별로 공유)."""
+    return get_llm(bedrock_client, ANSWER_MODEL_ID, max_tokens, temperature=0.7)
+
+def build_answer_prompt(query, search_results):
+    """검색 결과와 질문으로 답변 생성 프롬프트를 구성하고 (프롬프트, 최대 토큰 수)를 반환합니다."""
+    if search_results:
+        with timed("answer.context_build"):
+            assembled = build_context(search_results)
+        
+        prompt = f"""당신은 학사 정보 전문 AI 챗봇 'ClassMATE'입니다. 주어진 <docs> 안의 문서 내용을 바탕으로 사용자의 질문에 대해 명확하고 친절하게 한국어로 답변해주세요.
 문서에 없는 내용은 절대 언급하지 말고, 확실한 정보만 답변에 포함해주세요.
 
 <docs>
-{context}
+{assembled["context"]}
 </docs>
 
 사용자 질문: {query}
@@ -97,24 +148,121 @@ def generate_ai_response(bedrock_client, query, search_results):
 답변 마지막에는 반드시 다음 형식으로 참고 자료를 명시해주세요.
 ---
 📋 **참고 자료:**
-{sources}
+{assembled["sources"]}
 """
-        else:
-            prompt = f"""당신은 학사 정보 전문 AI 챗봇 'ClassMATE'입니다.
+        return prompt, choose_max_tokens(assembled["context_tokens"])
+
+    prompt = f"""당신은 학사 정보 전문 AI 챗봇 'ClassMATE'입니다.
 사용자 질문: {query}
 
 주어진 정보가 없으므로, 질문에 직접 답변하지 마세요. 대신, 관련 정보를 찾을 수 없다고 안내하고 학교 공식 홈페이지나 담당 부서에 문의하라고 친절하게 안내해주세요."""
+    return prompt, choose_max_tokens(0, has_results=False)
+
+@timed("answer.total")
+def generate_answer(bedrock_client, query, search_results):
+    """검색된 문서를 바탕으로 AI 답변을 생성합니다. 실패하면 예외를 그대로 올립니다."""
+    prompt, max_tokens = build_answer_prompt(query, search_results)
+    llm = create_llm(bedrock_client, max_tokens)
 
-        # LangChain을 통해 AI 모델 호출
+    # LangChain을 통해 AI 모델 호출
+    with timed("answer.llm"):
         response = llm.invoke(prompt)
-        return response.content
+    return response.content
 
+def generate_ai_response(bedrock_client, query, search_results):
+    """generate_answer의 UI용 버전. 실패하면 오류 안내 문구를 답변으로 반환합니다."""
+    try:
+        return generate_answer(bedrock_client, query, search_results)
     except Exception as e:
-        return f"죄송합니다. AI 응답 생성 중 오류가 발생했습니다: {str(e)}"
+        return f"{ERROR_RESPONSE_PREFIX}: {str(e)}"
+
+def is_error_response(response):
+    """generate_ai_response가 반환한 오류 안내 문구인지 확인합니다."""
+    return response.startswith(ERROR_RESPONSE_PREFIX)
+
+def stream_answer(bedrock_client, query, search_results):
+    """generate_answer의 스트리밍 버전. 답변 텍스트 조각을 순서대로 yield 하며, 실패하면 예외를 올립니다."""
+    started = time.perf_counter()
+    first_token_recorded = False
+    try:
+        prompt, max_tokens = build_answer_prompt(query, search_results)
+        llm = create_llm(bedrock_client, max_tokens)
+        for chunk in llm.stream(prompt):
+            if not chunk.content:
+                continue
+            if not first_token_recorded:
+                metrics.record("answer.first_token", time.perf_counter() - started)
+                first_token_recorded = True
+            yield chunk.content
+    finally:
+        metrics.record("answer.stream_total", time.perf_counter() - started)
+
+def stream_ai_response(bedrock_client, query, search_results):
+    """stream_answer의 UI용 버전. 실패하면 오류 안내 문구를 마지막 조각으로 yield 합니다."""
+    try:
+        yield from stream_answer(bedrock_client, query, search_results)
+    except Exception as e:
+        yield f"{ERROR_RESPONSE_PREFIX}: {str(e)}"
+
+# --- 동일 질의 합치기 (single-flight) ---
+
+_search_flight = SingleFlight("search")
+_answer_flight = SingleFlight("answer")
+_answer_stream_flight = StreamFlight("answer_stream")
+
+def coalesce_key(school_id, query):
+    return (school_id, normalize_query(query))
+
+# *_coalesced 함수는 예외를 기다리던 모든 호출에 그대로 전달합니다 (API용).
+# search_documents_coalesced/generate_ai_response_coalesced는 UI용 오류 처리를 덧씌운 버전입니다.
+
+def hybrid_search_coalesced(engine, vectorstore, query, school_id, embeddings):
+    """동시에 들어온 같은 학교·같은 질의의 검색을 한 번만 실행하고 결과를 공유합니다."""
+    return _search_flight.do(coalesce_key(school_id, query), hybrid_search,
+                             engine, vectorstore, query, school_id, embeddings)
+
+def search_documents_coalesced(engine, vectorstore, query, school_id, embeddings):
+    """hybrid_search_coalesced의 UI용 버전. 실패하면 오류를 표시하고 빈 결과를 반환합니다."""
+    try:
+        return hybrid_search_coalesced(engine, vectorstore, query, school_id, embeddings)
+    except Exception as e:
+        st.error(f"문서 검색 실패: {str(e)}")
+        return []
+
+def generate_answer_coalesced(bedrock_client, query, school_id, search_results):
+    """동시에 들어온 같은 질의의 답변 생성을 한 번의 모델 호출로 합칩니다."""
+    return _answer_flight.do(coalesce_key(school_id, query), generate_answer,
+                             bedrock_client, query, search_results)
+
+def generate_ai_response_coalesced(bedrock_client, query, school_id, search_results):
+    """generate_answer_coalesced의 UI용 버전. 실패하면 오류 안내 문구를 답변으로 반환합니다."""
+    try:
+        return generate_answer_coalesced(bedrock_client, query, school_id, search_results)
+    except Exception as e:
+        return f"{ERROR_RESPONSE_PREFIX}: {str(e)}"
+
+def stream_answer_coalesced(bedrock_client, query, school_id, search_results):
+    """같은 질의의 스트리밍 구독자들이 하나의 답변 스트림에 함께 연결되도록 합니다."""
+    return _answer_stream_flight.stream(
+        coalesce_key(school_id, query),
+        lambda: stream_answer(bedrock_client, query, search_results)
+    )
 
 
 # --- 헬퍼 함수 (관련성 점수, 텍스트 처리 등) ---
 
+def chunk_row_to_document(row, query):
+    """document_chunks/documents 조회 행을 검색 결과 Document로 변환합니다."""
+    metadata = {
+        "source": row.source_url,
+        "filename": row.file_name or "RSS 공지사항",
+        "category": row.category,
+        "date": row.created_at.strftime("%Y-%m-%d") if row.created_at else "N/A",
+        "title": extract_title_from_text(row.chunk_text),
+        "relevance_score": calculate_relevance_score(query, row.chunk_text, {}) # 점수 별도 계산
+    }
+    return Document(page_content=row.chunk_text, metadata=metadata)
+
 def extract_title_from_text(text):
     """텍스트에서 제목을 추출합니다."""
     lines = text.split('\n')
@@ -126,6 +274,10 @@ def extract_title_from_text(text):
             return line
     return text[:50] + "..." if len(text) > 50 else text
 
+def normalize_query(query):
+    """질의를 비교/집계용 형태(소문자, 구두점 제거, 공백 정리)로 정규화합니다."""
+    return ' '.join(re.sub(r'[^\w가-힣\s]', ' ', query.lower()).split())
+
 def preprocess_query(query):
     """자연어 쿼리에서 핵심 키워드를 추출합니다."""
     stopwords = ['에', '대해', '대한', '에서', '으로', '로', '이', '가', '을', '를', '은', '는', '궁금합니다', '궁금해요', '알고싶어요', '알려주세요', '문의', '질문', '어떻게', '언제', '어디서', '무엇', '왜', '어떤', '입니다', '해주세요']
@@ -14,6 +14,66 @@ class Settings(BaseSettings):
     DB_USER: str
     DB_PASSWORD: str
 
+    # S3 업로드 전송 설정 (멀티파트 임계값/청크 크기는 MB 단위)
+    S3_MULTIPART_THRESHOLD_MB: int = 8
+    S3_MULTIPART_CHUNKSIZE_MB: int = 8
+    S3_MAX_CONCURRENCY: int = 10
+    S3_UPLOAD_WORKERS: int = 4
+
+    # DB 연결 풀 설정 (db.py). 프로세스당 최대 연결 수 = DB_POOL_SIZE + DB_MAX_OVERFLOW
+    # DB_POOLING_MODE: session(직접 연결) | transaction(PgBouncer transaction 모드)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOLING_MODE: str = "session"
+    DB_STATEMENT_TIMEOUT_MS: int = 30000
+    DB_WORKER_STATEMENT_TIMEOUT_MS: int = 300000
+
+    # Bedrock 호출 설정 (bedrock.py). BEDROCK_MAX_POOL_CONNECTIONS는 프로세스의 동시 호출 수 이상으로 둡니다.
+    # BEDROCK_REGION을 비우면 AWS_REGION을 사용합니다.
+    BEDROCK_REGION: str = ""
+    BEDROCK_MAX_POOL_CONNECTIONS: int = 64
+    BEDROCK_MAX_ATTEMPTS: int = 8
+    BEDROCK_RETRY_MODE: str = "adaptive"
+    BEDROCK_CONNECT_TIMEOUT: int = 5
+    BEDROCK_READ_TIMEOUT: int = 120
+    EMBEDDING_MODEL_ID: str = "cohere.embed-v4:0"
+
+    # 헤드리스 API 서버 설정 (동시 처리 한도, 대기 시간은 초 단위)
+    API_MAX_CONCURRENT_SEARCHES: int = 32
+    API_MAX_CONCURRENT_ANSWERS: int = 16
+    API_WORKER_THREADS: int = 64
+    API_QUEUE_TIMEOUT: float = 10.0
+
+    # 답변 컨텍스트/토큰 예산 설정
+    CONTEXT_TOKEN_BUDGET: int = 2500
+    CONTEXT_DUPLICATE_THRESHOLD: float = 0.8
+    ANSWER_MIN_TOKENS: int = 512
+    ANSWER_MAX_TOKENS: int = 2000
+    ANSWER_FALLBACK_MAX_TOKENS: int = 400
+
+    # 벡터 검색 설정
+    # VECTOR_SEARCH_MODE: langchain(PGVector 컬렉션) | exact | half | binary | full
+    EMBEDDING_DIM: int = 1536
+    VECTOR_SEARCH_MODE: str = "langchain"
+    VECTOR_RERANK_CANDIDATES: int = 40
+
+    # 답변 캐시 유지 시간 (초)
+    ANSWER_CACHE_TTL_SECONDS: int = 3600
+
+    # 수집 작업 큐 설정 (시간은 초 단위)
+    INGEST_WORKERS: int = 2
+    INGEST_MAX_ATTEMPTS: int = 5
+    INGEST_RETRY_BASE_SECONDS: int = 30
+    INGEST_RETRY_MAX_SECONDS: int = 1800
+    INGEST_LEASE_SECONDS: int = 300
+    INGEST_POLL_INTERVAL: float = 2.0
+
+    # 유사 중복 청크 처리 (NEAR_DUP_MODE: link | skip | off)
+    NEAR_DUP_MODE: str = "link"
+    NEAR_DUP_THRESHOLD: float = 0.85
+
     @property
     def DATABASE_URL(self) -> str:
         """
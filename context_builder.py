@@ -0,0 +1,121 @@
+import re
+
+import tiktoken
+
+from config import settings
+
+# Claude 토크나이저와 정확히 같지는 않지만 예산 계산에는 충분히 가까운 근사치입니다.
+_encoding = tiktoken.get_encoding("cl100k_base")
+
+SENTENCE_SPLIT_PATTERN = re.compile(r'\n+|(?<=[.!?。])\s+')
+SHORT_SENTENCE_CHARS = 15
+
+def count_tokens(text):
+    return len(_encoding.encode(text, disallowed_special=()))
+
+def split_sentences(text):
+    """청크 텍스트를 줄/문장 단위로 나눕니다."""
+    return [s.strip() for s in SENTENCE_SPLIT_PATTERN.split(text) if s and s.strip()]
+
+def _normalize(sentence):
+    return re.sub(r'\s+', ' ', re.sub(r'[^\w가-힣\s]', ' ', sentence.lower())).strip()
+
+def _shingles(normalized, size=3):
+    compact = normalized.replace(' ', '')
+    if len(compact) <= size:
+        return {compact}
+    return {compact[i:i + size] for i in range(len(compact) - size + 1)}
+
+class _SentenceDeduplicator:
+    """이미 채택한 문장과 같거나 거의 같은 문장을 걸러냅니다."""
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self._exact = set()
+        self._shingle_sets = []
+
+    def is_duplicate(self, sentence):
+        normalized = _normalize(sentence)
+        if not normalized or normalized in self._exact:
+            return True
+        if len(normalized) >= SHORT_SENTENCE_CHARS:
+            shingles = _shingles(normalized)
+            for other in self._shingle_sets:
+                union = len(shingles | other)
+                if union and len(shingles & other) / union >= self.threshold:
+                    return True
+        return False
+
+    def add(self, sentence):
+        normalized = _normalize(sentence)
+        self._exact.add(normalized)
+        if len(normalized) >= SHORT_SENTENCE_CHARS:
+            self._shingle_sets.append(_shingles(normalized))
+
+def format_source(doc):
+    return f"- {doc.metadata.get('title', '제목 없음')} ({doc.metadata.get('date', '날짜 정보 없음')})"
+
+def build_context(search_results, token_budget=None, duplicate_threshold=None):
+    """검색 결과를 중복 없이 토큰 예산에 맞춰 <doc> 컨텍스트로 조립합니다.
+
+    청크 간 겹치는 구간과 거의 같은 문장은 한 번만 포함하며, 예산이 부족하면
+    모든 출처의 첫 문장을 먼저 넣은 뒤 관련성 순서대로 나머지 문장을 채웁니다.
+    참고 자료 목록에는 모든 검색 결과가 그대로 남습니다.
+    """
+    token_budget = token_budget or settings.CONTEXT_TOKEN_BUDGET
+    duplicate_threshold = duplicate_threshold or settings.CONTEXT_DUPLICATE_THRESHOLD
+
+    # 1. 관련성 순서대로 문장을 훑으며 중복 제거
+    dedup = _SentenceDeduplicator(duplicate_threshold)
+    candidates = []  # 문서별 [(문장, 토큰 수)]
+    input_tokens = 0
+    dropped = 0
+    for doc in search_results:
+        kept = []
+        for sentence in split_sentences(doc.page_content):
+            tokens = count_tokens(sentence)
+            input_tokens += tokens
+            if dedup.is_duplicate(sentence):
+                dropped += 1
+                continue
+            dedup.add(sentence)
+            kept.append((sentence, tokens))
+        candidates.append(kept)
+
+    # 2. 예산 배분: 출처별 첫 문장 우선, 이후 관련성 순서대로 채움
+    selected = [set() for _ in candidates]
+    used = 0
+    for doc_index, kept in enumerate(candidates):
+        if kept and used + kept[0][1] <= token_budget:
+            selected[doc_index].add(0)
+            used += kept[0][1]
+    for doc_index, kept in enumerate(candidates):
+        for sentence_index, (_, tokens) in enumerate(kept):
+            if sentence_index in selected[doc_index]:
+                continue
+            if used + tokens > token_budget:
+                continue
+            selected[doc_index].add(sentence_index)
+            used += tokens
+
+    docs = []
+    for doc_index, kept in enumerate(candidates):
+        sentences = [kept[i][0] for i in sorted(selected[doc_index])]
+        if sentences:
+            docs.append("<doc>" + "\n".join(sentences) + "</doc>")
+    dropped += sum(len(kept) - len(chosen) for kept, chosen in zip(candidates, selected))
+
+    return {
+        "context": "\n".join(docs),
+        "sources": "\n".join(format_source(doc) for doc in search_results),
+        "input_tokens": input_tokens,
+        "context_tokens": used,
+        "dropped_sentences": dropped
+    }
+
+def choose_max_tokens(context_tokens, has_results=True):
+    """컨텍스트 크기에 비례해 답변 최대 토큰 수를 정합니다."""
+    if not has_results:
+        return settings.ANSWER_FALLBACK_MAX_TOKENS
+    scaled = settings.ANSWER_MIN_TOKENS + context_tokens // 2
+    return max(settings.ANSWER_MIN_TOKENS, min(settings.ANSWER_MAX_TOKENS, scaled))
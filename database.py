@@ -2,11 +2,14 @@ import streamlit as st
 import pandas as pd
 import feedparser
 import re
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from langchain_community.vectorstores import PGVector
 
 # 분리된 설정 파일에서 설정값 가져오기
 from config import settings
+from db import get_engine
+from metrics import timed
+from migrate import pending_migrations
 
 # --- 초기화 함수 ---
 
@@ -14,18 +17,15 @@ from config import settings
 def init_postgresql_vectorstore():
     """PostgreSQL을 벡터 스토어로 초기화합니다."""
     try:
-        engine = create_engine(settings.DATABASE_URL)
+        engine = get_engine()
         
-        # 연결 테스트 및 필요한 컬럼 추가
+        # 연결 테스트 및 스키마 버전 확인 (DDL은 migrate.py에서만 실행)
         with engine.connect() as conn:
             conn.execute(text("SELECT 1"))
-            try:
-                conn.execute(text("ALTER TABLE documents ADD COLUMN IF NOT EXISTS processed BOOLEAN DEFAULT FALSE"))
-                conn.execute(text("ALTER TABLE documents ADD COLUMN IF NOT EXISTS chunks_count INTEGER DEFAULT 0"))
-                conn.commit()
-            except Exception:
-                # 컬럼이 이미 있거나 권한 문제면 무시
-                pass
+            pending = pending_migrations(conn)
+        if pending:
+            names = ", ".join(f"{version:04d}_{name}" for version, name in pending)
+            st.warning(f"적용되지 않은 스키마 마이그레이션이 있습니다: {names} (python migrate.py up 실행 필요)")
         
         return engine
     except Exception as e:
@@ -40,10 +40,13 @@ def init_pgvector(_embeddings, _engine):
         return None
     
     try:
+        # 연결 하나를 넘기면 스레드 간에 공유되고 pre-ping·재활용도 적용되지 않으므로 엔진을 넘깁니다.
+        # PGVector는 이를 Session(bind)로만 사용하므로 조회마다 공용 풀에서 연결을 빌렸다 반납합니다.
         vectorstore = PGVector(
             connection_string=settings.DATABASE_URL,
             embedding_function=_embeddings,
-            collection_name="university_docs"
+            collection_name="university_docs",
+            connection=_engine
         )
         return vectorstore
     except Exception as e:
@@ -53,108 +56,307 @@ def init_pgvector(_embeddings, _engine):
 
 # --- 데이터 조회 함수 ---
 
+# 조회 결과 캐시 유지 시간 (초). 업로드/삭제 후에는 invalidate_* 함수로 즉시 비웁니다.
+SCHOOLS_CACHE_TTL = 600
+STATS_CACHE_TTL = 60
+# 문서 목록은 수집 작업 진행 상태를 함께 보여주므로 짧게 유지합니다.
+LISTING_CACHE_TTL = 10
+QUERY_STATS_CACHE_TTL = 300
+
+# fetch_* 함수는 캐시되는 조회이며 실패 시 예외를 그대로 올립니다. st.cache_data는 예외를
+# 캐시하지 않으므로 일시적인 DB 오류가 TTL 동안 빈 결과로 굳지 않습니다. 오류 표시와 기본값
+# 반환은 캐시되지 않는 get_*/list_* 래퍼(UI용)에서만 합니다.
+
+def invalidate_document_reads():
+    """PDF 업로드/삭제/작업 등록 후 문서 목록과 학교 통계 캐시를 비웁니다."""
+    fetch_documents.clear()
+    fetch_school_stats.clear()
+
+def invalidate_rss_reads():
+    """RSS 피드 추가/삭제/수집 등록 후 피드 목록과 학교 통계 캐시를 비웁니다."""
+    fetch_rss_feeds.clear()
+    fetch_school_stats.clear()
+
+@st.cache_data(ttl=SCHOOLS_CACHE_TTL, show_spinner=False)
+def fetch_schools_list(_engine):
+    """학교 목록을 {이름: id} 형태로 조회합니다."""
+    with _engine.connect() as conn:
+        result = conn.execute(text("SELECT id, name, code FROM schools ORDER BY name"))
+        schools = result.fetchall()
+        return {school[1]: school[0] for school in schools}
+
 def get_schools_list(engine):
-    """학교 목록을 조회합니다."""
+    """학교 목록을 조회합니다. 실패하면 오류를 표시하고 기본값을 반환합니다."""
     try:
-        with engine.connect() as conn:
-            result = conn.execute(text("SELECT id, name, code FROM schools ORDER BY name"))
-            schools = result.fetchall()
-            return {school[1]: school[0] for school in schools}  # {name: id} 형태
+        return fetch_schools_list(engine)
     except Exception as e:
         st.error(f"학교 목록 조회 실패: {str(e)}")
         return {"연성대학교": 1}  # 기본값
 
+@st.cache_data(ttl=STATS_CACHE_TTL, show_spinner=False)
+def fetch_school_stats(_engine, school_id):
+    """선택한 학교의 문서·청크 통계를 조회합니다."""
+    with _engine.connect() as conn:
+        result = conn.execute(text("""
+            SELECT 
+                COUNT(d.id) as total_documents,
+                SUM(CASE WHEN d.processed = true THEN 1 ELSE 0 END) as processed_documents,
+                SUM(COALESCE(d.chunks_count, 0)) as total_chunks
+            FROM documents d
+            WHERE d.school_id = :school_id
+        """), {"school_id": school_id})
+        stats = result.fetchone()
+        return {
+            "total_documents": stats[0] or 0,
+            "processed_documents": stats[1] or 0,
+            "total_chunks": int(stats[2] or 0)
+        }
+
 def get_school_stats(engine, school_id):
     """선택한 학교의 통계를 조회합니다."""
     try:
-        with engine.connect() as conn:
-            result = conn.execute(text("""
-                SELECT 
-                    COUNT(d.id) as total_documents,
-                    SUM(CASE WHEN d.processed = true THEN 1 ELSE 0 END) as processed_documents,
-                    SUM(COALESCE(d.chunks_count, 0)) as total_chunks
-                FROM documents d
-                WHERE d.school_id = :school_id
-            """), {"school_id": school_id})
-            stats = result.fetchone()
-            return {
-                "total_documents": stats[0] or 0,
-                "processed_documents": stats[1] or 0,
-                "total_chunks": int(stats[2] or 0)
-            }
+        return fetch_school_stats(engine, school_id)
     except Exception as e:
         st.error(f"통계 조회 실패: {str(e)}")
         return {"total_documents": 0, "processed_documents": 0, "total_chunks": 0}
 
+@st.cache_data(ttl=SCHOOLS_CACHE_TTL, show_spinner=False)
+def fetch_school_code(_engine, school_id):
+    """school_id로 학교 코드를 조회합니다. 학교가 없으면 None입니다."""
+    with _engine.connect() as conn:
+        result = conn.execute(text("SELECT code FROM schools WHERE id = :school_id"), 
+                             {"school_id": school_id})
+        school = result.fetchone()
+        return school[0] if school else None
+
 def get_school_code_by_id(engine, school_id):
     """school_id로 학교 코드를 조회합니다."""
     try:
-        with engine.connect() as conn:
-            result = conn.execute(text("SELECT code FROM schools WHERE id = :school_id"), 
-                                 {"school_id": school_id})
-            school = result.fetchone()
-            return school[0] if school else "UNK"
+        return fetch_school_code(engine, school_id) or "UNK"
     except Exception:
         return "UNK"
 
-def get_file_metadata(engine, school_id):
-    """documents 테이블에서 특정 학교의 파일 메타데이터를 조회합니다."""
+# --- 목록 조회 (키셋 페이지네이션) ---
+
+DOCUMENT_STATUS_FILTERS = {
+    "processed": "COALESCE(d.processed, FALSE)",
+    "unprocessed": "NOT COALESCE(d.processed, FALSE) AND j.id IS NULL",
+    "in_progress": "j.status IN ('queued', 'running')",
+    "failed": "j.status = 'failed'"
+}
+
+RSS_STATUS_FILTERS = {
+    "active": "rf.status = 'active'",
+    "paused": "rf.status <> 'active'"
+}
+
+def like_pattern(value):
+    """ILIKE 부분 일치 패턴 (사용자 입력의 %, _는 문자 그대로 취급)."""
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+def build_listing_filters(alias, school_id, cursor, name_columns, name, date_from, date_to):
+    """키셋 커서와 이름/기간 필터의 WHERE 조건과 파라미터를 만듭니다.
+
+    cursor는 직전 페이지 마지막 행의 (created_at, id)이며, 목록은 (created_at, id) 내림차순입니다.
+    """
+    conditions = [f"{alias}.school_id = %(school_id)s"]
+    params = {"school_id": school_id}
+    if cursor:
+        conditions.append(f"({alias}.created_at, {alias}.id) < (%(cursor_created_at)s, %(cursor_id)s)")
+        params.update(cursor_created_at=cursor[0], cursor_id=cursor[1])
+    if name:
+        conditions.append("(" + " OR ".join(f"{column} ILIKE %(name)s" for column in name_columns) + ")")
+        params["name"] = like_pattern(name)
+    if date_from:
+        conditions.append(f"{alias}.created_at >= %(date_from)s")
+        params["date_from"] = date_from
+    if date_to:
+        # 종료일 포함
+        conditions.append(f"{alias}.created_at < %(date_to)s::date + 1")
+        params["date_to"] = date_to
+    return conditions, params
+
+def next_page_cursor(df, page_size):
+    """page_size + 1개를 조회한 결과에서 현재 페이지와 다음 페이지 커서를 분리합니다."""
+    if len(df) <= page_size:
+        return df, None
+    page = df.iloc[:page_size]
+    last = page.iloc[-1]
+    return page, (last["created_at"].to_pydatetime(), int(last["id"]))
+
+@st.cache_data(ttl=LISTING_CACHE_TTL, show_spinner=False)
+def fetch_documents(_engine, school_id, cursor=None, page_size=20, name=None, status=None,
+                    date_from=None, date_to=None):
+    """특정 학교의 PDF 문서 한 페이지와 다음 페이지 커서를 조회합니다.
+
+    status: processed | unprocessed | in_progress | failed (None이면 전체)
+    """
+    conditions, params = build_listing_filters("d", school_id, cursor, ["d.file_name"], name, date_from, date_to)
+    conditions.append("d.category != 'rss'")
+    if status:
+        conditions.append(DOCUMENT_STATUS_FILTERS[status])
+    params["limit"] = page_size + 1
+    df = pd.read_sql(f"""
+        SELECT d.id, d.file_name as filename, 
+               d.source_url as s3_key, 
+               d.created_at, 
+               d.category as document_type, 
+               COALESCE(d.processed, FALSE) as processed, 
+               COALESCE(d.chunks_count, 0) as chunks_count,
+               j.id as job_id, j.status as job_status, j.attempts as job_attempts,
+               j.progress_done as job_progress_done, j.progress_total as job_progress_total,
+               j.last_error as job_error
+        FROM documents d
+        LEFT JOIN LATERAL (
+            SELECT ij.id, ij.status, ij.attempts, ij.progress_done, ij.progress_total, ij.last_error
+            FROM ingest_jobs ij
+            WHERE ij.school_id = d.school_id AND ij.target = d.source_url
+            ORDER BY ij.id DESC
+            LIMIT 1
+        ) j ON TRUE
+        WHERE {" AND ".join(conditions)}
+        ORDER BY d.created_at DESC, d.id DESC
+        LIMIT %(limit)s
+    """, _engine, params=params)
+    return next_page_cursor(df, page_size)
+
+def list_documents(engine, school_id, cursor=None, page_size=20, name=None, status=None,
+                   date_from=None, date_to=None):
+    """fetch_documents와 같으며, 실패하면 오류를 표시하고 빈 페이지를 반환합니다."""
     try:
-        df = pd.read_sql("""
-            SELECT d.id, d.file_name as filename, 
-                   d.source_url as s3_key, 
-                   d.created_at as upload_date, 
-                   d.category as document_type, 
-                   COALESCE(d.processed, FALSE) as processed, 
-                   COALESCE(d.chunks_count, 0) as chunks_count
-            FROM documents d
-            WHERE d.category != 'rss' AND d.school_id = %(school_id)s
-            ORDER BY d.created_at DESC
-        """, engine, params={"school_id": school_id})
-        return df
+        return fetch_documents(engine, school_id, cursor=cursor, page_size=page_size, name=name,
+                               status=status, date_from=date_from, date_to=date_to)
     except Exception as e:
         st.error(f"메타데이터 조회 실패: {str(e)}")
-        return pd.DataFrame()
+        return pd.DataFrame(), None
+
+@st.cache_data(ttl=LISTING_CACHE_TTL, show_spinner=False)
+def fetch_rss_feeds(_engine, school_id, cursor=None, page_size=20, name=None, status=None,
+                    date_from=None, date_to=None):
+    """특정 학교의 RSS 피드 한 페이지와 다음 페이지 커서를 조회합니다.
+
+    status: active | paused (None이면 전체)
+    """
+    conditions, params = build_listing_filters("rf", school_id, cursor, ["rf.title", "rf.url"], name, date_from, date_to)
+    if status:
+        conditions.append(RSS_STATUS_FILTERS[status])
+    params["limit"] = page_size + 1
+    df = pd.read_sql(f"""
+        SELECT rf.id, rf.url as rss_url, rf.title, rf.last_processed,
+                rf.processed_count, rf.status, rf.created_at,
+                j.id as job_id, j.status as job_status, j.last_error as job_error
+        FROM rss_feeds rf
+        LEFT JOIN LATERAL (
+            SELECT ij.id, ij.status, ij.last_error
+            FROM ingest_jobs ij
+            WHERE ij.school_id = rf.school_id AND ij.target = rf.url
+            ORDER BY ij.id DESC
+            LIMIT 1
+        ) j ON TRUE
+        WHERE {" AND ".join(conditions)}
+        ORDER BY rf.created_at DESC, rf.id DESC
+        LIMIT %(limit)s
+    """, _engine, params=params)
+    return next_page_cursor(df, page_size)
 
-def get_rss_feeds(engine, school_id):
-    """특정 학교의 RSS 피드 목록을 조회합니다."""
+def list_rss_feeds(engine, school_id, cursor=None, page_size=20, name=None, status=None,
+                   date_from=None, date_to=None):
+    """fetch_rss_feeds와 같으며, 실패하면 오류를 표시하고 빈 페이지를 반환합니다."""
     try:
-        df = pd.read_sql("""
-            SELECT rf.id, rf.url as rss_url, rf.title, rf.last_processed,
-                    rf.processed_count, rf.status, rf.created_at
-            FROM rss_feeds rf
-            WHERE rf.school_id = %(school_id)s
-            ORDER BY rf.created_at DESC
-        """, engine, params={"school_id": school_id})
-        return df
+        return fetch_rss_feeds(engine, school_id, cursor=cursor, page_size=page_size, name=name,
+                               status=status, date_from=date_from, date_to=date_to)
     except Exception as e:
         st.error(f"RSS 피드 조회 실패: {str(e)}")
+        return pd.DataFrame(), None
+
+# --- 질의 로그 분석 함수 ---
+
+QUERY_STATS_SQL = """
+    SELECT ql.normalized_query,
+           MIN(ql.query) as example_query,
+           COUNT(*) as query_count,
+           ROUND(AVG(ql.total_ms)::numeric, 1) as avg_ms,
+           ROUND(percentile_cont(0.95) WITHIN GROUP (ORDER BY ql.total_ms)::numeric, 1) as p95_ms,
+           ROUND(AVG(ql.result_count)::numeric, 1) as avg_results,
+           SUM(CASE WHEN ql.result_count = 0 THEN 1 ELSE 0 END) as zero_result_count,
+           SUM(CASE WHEN ql.cache_hit THEN 1 ELSE 0 END) as cache_hit_count,
+           MAX(ql.created_at) as last_seen
+    FROM query_log ql
+    WHERE ql.school_id = %(school_id)s AND ql.created_at >= NOW() - make_interval(days => %(days)s)
+    GROUP BY ql.normalized_query
+    ORDER BY {order_by}
+    LIMIT %(limit)s
+"""
+
+QUERY_STATS_ORDERS = {
+    "slow": "p95_ms DESC NULLS LAST",
+    "hot": "query_count DESC, p95_ms DESC"
+}
+
+@st.cache_data(ttl=QUERY_STATS_CACHE_TTL, show_spinner=False)
+def fetch_query_stats(_engine, school_id, order, days=7, limit=20):
+    """최근 기간의 질의 통계를 order(slow | hot) 순서로 조회합니다."""
+    return pd.read_sql(QUERY_STATS_SQL.format(order_by=QUERY_STATS_ORDERS[order]), _engine,
+                       params={"school_id": school_id, "days": days, "limit": limit})
+
+def get_slow_queries(engine, school_id, days=7, limit=20):
+    """최근 기간 동안 p95 응답 시간이 가장 긴 질의를 조회합니다."""
+    try:
+        return fetch_query_stats(engine, school_id, "slow", days=days, limit=limit)
+    except Exception as e:
+        st.error(f"느린 질의 조회 실패: {str(e)}")
+        return pd.DataFrame()
+
+def get_hot_queries(engine, school_id, days=7, limit=20):
+    """최근 기간 동안 가장 자주 들어온 질의를 조회합니다."""
+    try:
+        return fetch_query_stats(engine, school_id, "hot", days=days, limit=limit)
+    except Exception as e:
+        st.error(f"빈도 높은 질의 조회 실패: {str(e)}")
         return pd.DataFrame()
 
 # --- 데이터 수정/삭제 함수 ---
 
 def save_file_metadata(engine, filename, s3_key, doc_type, school_id):
     """파일 메타데이터를 documents 테이블에 저장합니다."""
+    return save_files_metadata(engine, [(filename, s3_key)], doc_type, school_id)
+
+def save_files_metadata(engine, files, doc_type, school_id):
+    """여러 파일의 메타데이터를 한 번의 쿼리로 documents 테이블에 저장합니다.
+
+    files는 (파일명, S3 키) 튜플의 리스트입니다. 이미 등록된 파일은 건너뜁니다.
+    """
+    file_names, source_urls = [], []
+    for filename, s3_key in files:
+        source_url = s3_key if s3_key.startswith('s3://') else f"s3://{settings.S3_BUCKET_NAME}/{s3_key}"
+        # 같은 배치 안의 중복 파일명은 첫 번째 항목만 저장
+        if filename in file_names or source_url in source_urls:
+            continue
+        file_names.append(filename)
+        source_urls.append(source_url)
+
+    if not file_names:
+        return True
+
     try:
         with engine.connect() as conn:
-            source_url = s3_key if s3_key.startswith('s3://') else f"s3://{settings.S3_BUCKET_NAME}/{s3_key}"
-            
-            existing_doc = conn.execute(text("""
-                SELECT id FROM documents 
-                WHERE source_url = :source_url OR (file_name = :filename AND school_id = :school_id)
-            """), {"source_url": source_url, "filename": filename, "school_id": school_id}).fetchone()
-            
-            if not existing_doc:
-                conn.execute(text("""
-                    INSERT INTO documents (school_id, file_name, source_url, category, processed, chunks_count)
-                    VALUES (:school_id, :filename, :source_url, :doc_type, FALSE, 0)
-                """), {
-                    "school_id": school_id,
-                    "filename": filename,
-                    "source_url": source_url,
-                    "doc_type": doc_type
-                })
-                conn.commit()
+            conn.execute(text("""
+                INSERT INTO documents (school_id, file_name, source_url, category, processed, chunks_count)
+                SELECT :school_id, f.file_name, f.source_url, :doc_type, FALSE, 0
+                FROM unnest(CAST(:file_names AS TEXT[]), CAST(:source_urls AS TEXT[])) AS f(file_name, source_url)
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM documents d
+                    WHERE d.source_url = f.source_url OR (d.file_name = f.file_name AND d.school_id = :school_id)
+                )
+            """), {
+                "school_id": school_id,
+                "doc_type": doc_type,
+                "file_names": file_names,
+                "source_urls": source_urls
+            })
+            conn.commit()
+        invalidate_document_reads()
         return True
     except Exception as e:
         st.error(f"메타데이터 저장 실패: {str(e)}")
@@ -180,6 +382,7 @@ def add_rss_feed(engine, school_id, rss_url):
             
             new_feed = result.fetchone()
             conn.commit()
+            invalidate_rss_reads()
             
             if new_feed:
                 return new_feed[0]
@@ -206,14 +409,18 @@ def delete_rss_feed(engine, rss_feed_id):
             docs = conn.execute(text("SELECT id FROM documents WHERE source_url = :url AND category = 'rss' AND school_id = :school_id"), {"url": rss_url, "school_id": school_id}).fetchall()
             
             for doc in docs:
-                conn.execute(text("DELETE FROM document_chunks WHERE document_id = :doc_id"), {"doc_id": doc[0]})
+                conn.execute(text("DELETE FROM document_chunks WHERE school_id = :school_id AND document_id = :doc_id"),
+                             {"school_id": school_id, "doc_id": doc[0]})
             
             conn.execute(text("DELETE FROM documents WHERE source_url = :url AND category = 'rss' AND school_id = :school_id"), {"url": rss_url, "school_id": school_id})
             
             conn.execute(text("DELETE FROM rss_feeds WHERE id = :rss_id"), {"rss_id": rss_feed_id})
+            conn.execute(text("DELETE FROM ingest_jobs WHERE school_id = :school_id AND target = :url"),
+                         {"school_id": school_id, "url": rss_url})
             
             conn.commit()
-            return True
+        invalidate_rss_reads()
+        return True
     except Exception as e:
         st.error(f"RSS 피드 삭제 실패: {str(e)}")
         return False
@@ -222,16 +429,28 @@ def delete_document_from_db(engine, document_id):
     """문서와 관련 청크를 DB에서 완전히 삭제합니다."""
     try:
         with engine.connect() as conn:
-            conn.execute(text("DELETE FROM document_chunks WHERE document_id = :document_id"), {"document_id": document_id})
+            # school_id 조건으로 해당 학교 파티션만 스캔합니다.
+            document = conn.execute(text("SELECT school_id, source_url FROM documents WHERE id = :document_id"),
+                                    {"document_id": document_id}).fetchone()
+            if not document: return False
+            school_id, source_url = document
+            conn.execute(text("DELETE FROM document_chunks WHERE school_id = :school_id AND document_id = :document_id"),
+                         {"school_id": school_id, "document_id": document_id})
             conn.execute(text("DELETE FROM documents WHERE id = :document_id"), {"document_id": document_id})
+            # 같은 파일을 다시 올리면 같은 idempotency_key가 되므로, 이전 작업을 지워야 새 작업이 등록됩니다.
+            # 처리 중인 작업은 워커가 리스를 잃은 것으로 보고 수집을 롤백합니다.
+            conn.execute(text("DELETE FROM ingest_jobs WHERE school_id = :school_id AND target = :target"),
+                         {"school_id": school_id, "target": source_url})
             conn.commit()
-            return True
+        invalidate_document_reads()
+        return True
     except Exception as e:
         st.error(f"문서 삭제 실패: {str(e)}")
         return False
 
 # --- 부서 검색 관련 함수 ---
 
+@timed("department_lookup")
 def find_relevant_department(engine, query, school_id):
     """질문 키워드를 분석하여 가장 관련성 높은 부서를 찾습니다."""
     try:
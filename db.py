@@ -0,0 +1,97 @@
+"""
+PostgreSQL 연결 계층.
+
+앱(Streamlit), API 서버, 수집 워커, PGVector, Lambda가 모두 이 모듈의 make_engine으로
+연결 풀을 만듭니다. 풀 크기·pre-ping·재활용 주기·statement_timeout을 한곳에서 정하므로
+프로세스당 최대 연결 수는 pool_size + max_overflow로 고정됩니다.
+
+DB_POOLING_MODE:
+    session      PostgreSQL에 직접 연결 (또는 PgBouncer session 모드). statement_timeout을
+                 연결 시작 옵션으로 지정합니다.
+    transaction  PgBouncer transaction 모드. 연결 시작 옵션과 세션 SET이 다른 클라이언트에
+                 섞이므로, 트랜잭션마다 SET LOCAL로 statement_timeout을 지정합니다.
+                 raw_connection()으로 빌린 psycopg2 연결(Lambda)에는 적용되지 않으므로
+                 PgBouncer의 query_timeout으로 제한합니다.
+
+Lambda 패키지에서도 import할 수 있도록 config는 get_engine 안에서만 불러옵니다.
+"""
+import threading
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL
+
+POOLING_MODES = ("session", "transaction")
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+def build_url(host, port, database, user, password):
+    return URL.create("postgresql+psycopg2", username=user, password=password,
+                      host=host, port=int(port), database=database)
+
+def make_engine(url, pool_size=5, max_overflow=0, pool_timeout=30, pool_recycle=1800,
+                statement_timeout_ms=None, pooling_mode="session", application_name=None):
+    """연결 풀 설정이 적용된 SQLAlchemy 엔진을 생성합니다.
+
+    statement_timeout_ms가 0 또는 None이면 서버 기본값을 사용합니다 (마이그레이션 등).
+    """
+    if pooling_mode not in POOLING_MODES:
+        raise ValueError(f"알 수 없는 DB_POOLING_MODE: {pooling_mode}")
+
+    connect_args = {}
+    if application_name:
+        connect_args["application_name"] = application_name
+    if statement_timeout_ms and pooling_mode == "session":
+        connect_args["options"] = f"-c statement_timeout={int(statement_timeout_ms)}"
+
+    engine = create_engine(
+        url,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        pool_recycle=pool_recycle,
+        pool_pre_ping=True,
+        connect_args=connect_args
+    )
+
+    if statement_timeout_ms and pooling_mode == "transaction":
+        timeout_sql = f"SET LOCAL statement_timeout = {int(statement_timeout_ms)}"
+
+        @event.listens_for(engine, "begin")
+        def set_local_statement_timeout(conn):
+            # AUTOCOMMIT 연결(CREATE INDEX CONCURRENTLY 등)은 트랜잭션이 없으므로 적용하지 않습니다.
+            if conn.get_execution_options().get("isolation_level") != "AUTOCOMMIT":
+                cursor = conn.connection.dbapi_connection.cursor()
+                try:
+                    cursor.execute(timeout_sql)
+                finally:
+                    cursor.close()
+
+    return engine
+
+# 용도별 풀 설정. app은 요청 경로, maintenance는 마이그레이션·인덱스 생성 같은 장시간 작업용입니다.
+def _purpose_options(settings, purpose):
+    if purpose == "maintenance":
+        return {"pool_size": 1, "max_overflow": 0, "statement_timeout_ms": 0}
+    if purpose == "worker":
+        return {"pool_size": 2, "max_overflow": 0, "statement_timeout_ms": settings.DB_WORKER_STATEMENT_TIMEOUT_MS}
+    return {"pool_size": settings.DB_POOL_SIZE, "max_overflow": settings.DB_MAX_OVERFLOW,
+            "statement_timeout_ms": settings.DB_STATEMENT_TIMEOUT_MS}
+
+def get_engine(purpose="app"):
+    """용도별 프로세스 공용 엔진을 반환합니다 (처음 호출 시 생성)."""
+    from config import settings
+
+    with _engines_lock:
+        engine = _engines.get(purpose)
+        if engine is None:
+            engine = make_engine(
+                build_url(settings.DB_HOST, settings.DB_PORT, settings.DB_NAME, settings.DB_USER, settings.DB_PASSWORD),
+                pool_timeout=settings.DB_POOL_TIMEOUT,
+                pool_recycle=settings.DB_POOL_RECYCLE,
+                pooling_mode=settings.DB_POOLING_MODE,
+                application_name=f"classmate-{purpose}",
+                **_purpose_options(settings, purpose)
+            )
+            _engines[purpose] = engine
+        return engine
@@ -0,0 +1,173 @@
+"""
+PostgreSQL 기반 수집(PDF/RSS) 작업 큐.
+
+작업은 ingest_jobs 테이블에 저장되며, 워커(ingest_worker.py)가 FOR UPDATE SKIP LOCKED로
+하나씩 가져가 처리합니다. 같은 idempotency_key로 다시 등록하면 기존 작업이 대기/실행 중일 때는
+그대로 두고, 이미 끝난(성공/실패) 작업이면 retry_job처럼 시도 횟수를 초기화해 다시 대기시킵니다.
+실패한 작업은 지수 백오프 후 재시도하고, max_attempts를 넘으면 failed로 남습니다.
+
+작업의 상태 변경(진행률, 완료, 실패)은 작업을 가져간 워커(locked_by)가 running 상태일 때만
+반영됩니다. heartbeat가 끊겨 회수된 작업을 늦게 끝낸 워커가 다른 워커의 작업을 덮어쓰지 않도록,
+반영되지 않으면 리스를 잃은 것으로 보고 결과를 버립니다.
+"""
+import hashlib
+import random
+import time
+
+from sqlalchemy import text
+
+from config import settings
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+class LeaseLostError(RuntimeError):
+    """처리 중인 작업이 회수되어 더 이상 이 워커의 것이 아닐 때 발생합니다."""
+
+ENQUEUE_SQL = text("""
+    INSERT INTO ingest_jobs (school_id, kind, target, idempotency_key, priority, max_attempts)
+    VALUES (:school_id, :kind, :target, :idempotency_key, :priority, :max_attempts)
+    ON CONFLICT (idempotency_key) DO UPDATE
+    SET status = 'queued', attempts = 0, run_after = NOW(), finished_at = NULL,
+        priority = EXCLUDED.priority, max_attempts = EXCLUDED.max_attempts
+    WHERE ingest_jobs.status IN ('succeeded', 'failed')
+""")
+
+CLAIM_SQL = text("""
+    UPDATE ingest_jobs j
+    SET status = 'running', attempts = j.attempts + 1, locked_by = :worker_id,
+        heartbeat_at = NOW(), started_at = NOW(), finished_at = NULL,
+        progress_done = 0, progress_total = NULL
+    FROM (
+        SELECT id FROM ingest_jobs
+        WHERE status = 'queued' AND run_after <= NOW()
+        ORDER BY priority DESC, run_after, id
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    ) next_job
+    WHERE j.id = next_job.id
+    RETURNING j.id, j.school_id, j.kind, j.target, j.attempts, j.max_attempts
+""")
+
+def pdf_idempotency_key(source_url, content):
+    """같은 경로에 같은 내용의 PDF를 다시 올리면 같은 키가 됩니다."""
+    return f"pdf:{source_url}:{hashlib.sha256(content).hexdigest()[:16]}"
+
+def rss_idempotency_key(school_id, rss_url, window_seconds=300):
+    """같은 피드에 대한 짧은 시간 안의 중복 요청(연속 클릭 등)을 하나로 묶습니다."""
+    return f"rss:{school_id}:{rss_url}:{int(time.time() // window_seconds)}"
+
+def enqueue_jobs(engine, jobs):
+    """작업을 한 번에 등록합니다.
+
+    jobs는 {"school_id", "kind", "target", "idempotency_key", "priority"(선택)} dict의 리스트이며,
+    같은 키의 작업이 대기/실행 중이면 건너뛰고, 끝난 작업이면 다시 대기시킵니다.
+    새로 등록되거나 다시 대기시킨 작업 수를 반환합니다.
+    """
+    if not jobs:
+        return 0
+    params = [{
+        "school_id": job["school_id"],
+        "kind": job["kind"],
+        "target": job["target"],
+        "idempotency_key": job["idempotency_key"],
+        "priority": job.get("priority", 0),
+        "max_attempts": job.get("max_attempts", settings.INGEST_MAX_ATTEMPTS)
+    } for job in jobs]
+    with engine.begin() as conn:
+        return conn.execute(ENQUEUE_SQL, params).rowcount
+
+def enqueue_job(engine, school_id, kind, target, idempotency_key, priority=0):
+    """작업 하나를 등록하고 작업 ID(이미 등록된 경우 기존 작업 ID)를 반환합니다."""
+    enqueue_jobs(engine, [{"school_id": school_id, "kind": kind, "target": target,
+                           "idempotency_key": idempotency_key, "priority": priority}])
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT id FROM ingest_jobs WHERE idempotency_key = :key"),
+                            {"key": idempotency_key}).scalar()
+
+def reclaim_expired(engine, lease_seconds=None):
+    """heartbeat가 끊긴 실행 중 작업(워커 비정상 종료)을 다시 대기 상태로 돌립니다."""
+    lease_seconds = lease_seconds or settings.INGEST_LEASE_SECONDS
+    with engine.begin() as conn:
+        return conn.execute(text("""
+            UPDATE ingest_jobs
+            SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END,
+                locked_by = NULL, run_after = NOW(),
+                finished_at = CASE WHEN attempts >= max_attempts THEN NOW() END,
+                last_error = COALESCE(last_error, '') || '[작업 시간 초과로 회수됨]'
+            WHERE status = 'running' AND heartbeat_at < NOW() - make_interval(secs => :lease)
+        """), {"lease": lease_seconds}).rowcount
+
+def claim_job(engine, worker_id):
+    """실행 가능한 작업 하나를 가져와 running으로 표시합니다. 없으면 None."""
+    with engine.begin() as conn:
+        row = conn.execute(CLAIM_SQL, {"worker_id": worker_id}).fetchone()
+    if not row:
+        return None
+    return {"id": row[0], "school_id": row[1], "kind": row[2], "target": row[3],
+            "attempts": row[4], "max_attempts": row[5], "worker_id": worker_id}
+
+def report_progress(engine, job, done, total):
+    """진행률을 기록하고 heartbeat를 갱신합니다. 리스를 잃었으면 False를 반환합니다."""
+    with engine.begin() as conn:
+        return conn.execute(text("""
+            UPDATE ingest_jobs SET progress_done = :done, progress_total = :total, heartbeat_at = NOW()
+            WHERE id = :id AND locked_by = :worker_id AND status = 'running'
+        """), {"id": job["id"], "worker_id": job["worker_id"], "done": done, "total": total}).rowcount > 0
+
+def heartbeat(engine, job):
+    """진행률은 그대로 두고 heartbeat만 갱신합니다. 리스를 잃었으면 False를 반환합니다."""
+    with engine.begin() as conn:
+        return conn.execute(text("""
+            UPDATE ingest_jobs SET heartbeat_at = NOW()
+            WHERE id = :id AND locked_by = :worker_id AND status = 'running'
+        """), {"id": job["id"], "worker_id": job["worker_id"]}).rowcount > 0
+
+def complete_job(engine, job, result_count):
+    """작업을 완료 처리하고, 새 문서가 반영되도록 해당 학교의 답변 캐시를 같은 트랜잭션에서 비웁니다.
+
+    리스를 잃었으면(회수되어 다른 워커가 가져갔거나 재시도 대기 중) 아무것도 바꾸지 않고 False를 반환합니다.
+    """
+    with engine.begin() as conn:
+        school_id = conn.execute(text("""
+            UPDATE ingest_jobs
+            SET status = 'succeeded', result_count = :result_count, locked_by = NULL,
+                last_error = NULL, finished_at = NOW(), heartbeat_at = NOW()
+            WHERE id = :id AND locked_by = :worker_id AND status = 'running'
+            RETURNING school_id
+        """), {"id": job["id"], "worker_id": job["worker_id"], "result_count": result_count}).scalar()
+        if school_id is None:
+            return False
+        conn.execute(text("DELETE FROM answer_cache WHERE school_id = :school_id"), {"school_id": school_id})
+    return True
+
+def retry_delay(attempts):
+    """지수 백오프(최대 INGEST_RETRY_MAX_SECONDS) + 최대 10% 지터."""
+    delay = min(settings.INGEST_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0), settings.INGEST_RETRY_MAX_SECONDS)
+    return delay * (1 + random.random() * 0.1)
+
+def fail_job(engine, job, error):
+    """실패를 기록합니다. 시도 횟수가 남았으면 백오프 후 다시 대기시키고, 아니면 failed로 둡니다.
+
+    바뀐 상태(QUEUED 또는 FAILED)를 반환하며, 리스를 잃었으면 아무것도 바꾸지 않고 None을 반환합니다.
+    """
+    final = job["attempts"] >= job["max_attempts"]
+    status = FAILED if final else QUEUED
+    with engine.begin() as conn:
+        updated = conn.execute(text("""
+            UPDATE ingest_jobs
+            SET status = :status, last_error = :error, locked_by = NULL,
+                run_after = NOW() + make_interval(secs => :delay),
+                finished_at = CASE WHEN :final THEN NOW() END
+            WHERE id = :id AND locked_by = :worker_id AND status = 'running'
+        """), {"id": job["id"], "worker_id": job["worker_id"], "status": status, "error": str(error)[:2000],
+               "delay": 0 if final else retry_delay(job["attempts"]), "final": final}).rowcount
+    return status if updated else None
+
+def retry_job(engine, job_id):
+    """실패한 작업을 즉시 다시 대기시킵니다 (시도 횟수 초기화)."""
+    with engine.begin() as conn:
+        return conn.execute(text("""
+            UPDATE ingest_jobs
+            SET status = 'queued', attempts = 0, run_after = NOW(), finished_at = NULL
+            WHERE id = :id AND status = 'failed'
+        """), {"id": job_id}).rowcount > 0
@@ -0,0 +1,183 @@
+"""
+수집 작업 워커.
+
+ingest_jobs 큐에서 작업을 가져와 PDF/RSS를 처리합니다. 워커 프로세스마다 DB 연결과
+AWS 클라이언트를 따로 만들며, 여러 프로세스(또는 여러 서버)가 동시에 실행되어도
+SKIP LOCKED로 같은 작업을 중복 처리하지 않습니다.
+
+사용 예:
+    python ingest_worker.py --workers 4
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+from config import settings
+from db import get_engine
+import ingest_queue
+
+logger = logging.getLogger(__name__)
+
+# 진행률 기록 간격 (초). 청크마다 UPDATE하지 않도록 묶어서 기록합니다.
+PROGRESS_INTERVAL = 1.0
+
+class JobLease:
+    """작업을 처리하는 동안 별도 스레드에서 heartbeat와 진행률을 기록합니다.
+
+    다운로드·PDF 분할처럼 진행률이 없는 단계에서도 리스가 유지됩니다. 리스를 잃으면
+    (회수되어 다른 워커가 가져간 경우) 다음 on_progress 호출이 LeaseLostError를 올려
+    커밋 전의 수집 트랜잭션이 롤백되게 합니다.
+    """
+
+    def __init__(self, engine, job):
+        self.engine = engine
+        self.job = job
+        self.lost = False
+        self._progress = None
+        self._reported = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"lease-{job['id']}", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def on_progress(self, done, total):
+        if self.lost:
+            raise ingest_queue.LeaseLostError(f"작업 {self.job['id']}의 리스가 만료되어 처리를 중단합니다.")
+        self._progress = (done, total)
+
+    def _beat(self):
+        progress = self._progress
+        try:
+            if progress is not None and progress != self._reported:
+                alive = ingest_queue.report_progress(self.engine, self.job, *progress)
+                self._reported = progress
+            else:
+                alive = ingest_queue.heartbeat(self.engine, self.job)
+        except Exception as e:
+            # 일시적인 DB 오류는 다음 주기에 다시 시도합니다 (리스 만료 전까지 여유가 있음).
+            logger.warning("작업 %d heartbeat 실패: %s", self.job["id"], e)
+            return
+        if not alive:
+            self.lost = True
+
+    def _run(self):
+        heartbeat_interval = settings.INGEST_LEASE_SECONDS / 4
+        last_beat = time.monotonic()
+        while not self._stop.wait(PROGRESS_INTERVAL) and not self.lost:
+            if self._progress != self._reported or time.monotonic() - last_beat >= heartbeat_interval:
+                self._beat()
+                last_beat = time.monotonic()
+
+def run_job(job, engine, s3_client, embeddings):
+    """작업 하나를 처리하고 결과 청크 수를 반환합니다. 처리하는 내내 리스를 유지합니다."""
+    from aws_utils import ingest_pdf, ingest_rss
+
+    with JobLease(engine, job) as lease:
+        if job["kind"] == "pdf":
+            key = job["target"].replace(f"s3://{settings.S3_BUCKET_NAME}/", "")
+            return ingest_pdf(s3_client, key, engine, job["school_id"], embeddings, on_progress=lease.on_progress)
+        if job["kind"] == "rss":
+            chunks_processed, _ = ingest_rss(engine, job["target"], job["school_id"], embeddings,
+                                             on_progress=lease.on_progress)
+            return chunks_processed
+        raise ValueError(f"알 수 없는 작업 종류: {job['kind']}")
+
+def worker_loop(worker_index, stop_event, poll_interval):
+    from aws_utils import init_aws_clients
+
+    # Ctrl+C는 부모 프로세스가 받아 stop_event로 전달하므로 진행 중인 작업은 끝까지 처리합니다.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{worker_index}"
+    # 작업 처리 연결 1개 + heartbeat·진행률 기록 연결 1개 (db.py의 worker 풀)
+    engine = get_engine("worker")
+    _, embeddings, s3_client = init_aws_clients()
+    if not s3_client:
+        logger.error("워커 %s 초기화 실패", worker_id)
+        return
+
+    logger.info("워커 %s 시작", worker_id)
+    while not stop_event.is_set():
+        try:
+            job = ingest_queue.claim_job(engine, worker_id)
+        except Exception as e:
+            logger.warning("작업 가져오기 실패: %s", e)
+            job = None
+        if not job:
+            stop_event.wait(poll_interval)
+            continue
+
+        logger.info("작업 %d 시작 (%s %s, 시도 %d/%d)", job["id"], job["kind"], job["target"],
+                    job["attempts"], job["max_attempts"])
+        try:
+            result_count = run_job(job, engine, s3_client, embeddings)
+            if ingest_queue.complete_job(engine, job, result_count):
+                logger.info("작업 %d 완료 (%d 청크)", job["id"], result_count)
+            else:
+                logger.warning("작업 %d 리스 만료: 회수된 작업이므로 완료를 기록하지 않습니다 (%d 청크)",
+                               job["id"], result_count)
+        except Exception as e:
+            status = ingest_queue.fail_job(engine, job, e)
+            if status is None:
+                logger.warning("작업 %d 리스 만료: 회수된 작업이므로 실패를 기록하지 않습니다: %s", job["id"], e)
+            else:
+                logger.warning("작업 %d 실패%s: %s", job["id"],
+                               " (재시도 없음)" if status == ingest_queue.FAILED else "", e)
+    engine.dispose()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="수집 작업 워커")
+    parser.add_argument("--workers", type=int, default=settings.INGEST_WORKERS)
+    parser.add_argument("--poll-interval", type=float, default=settings.INGEST_POLL_INTERVAL)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(processName)s %(message)s")
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith("streamlit"):
+            logging.getLogger(name).setLevel(logging.ERROR)
+
+    stop_event = multiprocessing.Event()
+    processes = [
+        multiprocessing.Process(target=worker_loop, args=(index, stop_event, args.poll_interval),
+                                name=f"ingest-worker-{index}")
+        for index in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+
+    def shutdown(signum, frame):
+        logger.info("종료 요청 수신, 진행 중인 작업이 끝나면 종료합니다.")
+        stop_event.set()
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+
+    # 비정상 종료된 워커의 작업은 heartbeat가 끊기므로 주기적으로 회수합니다.
+    engine = get_engine("maintenance")
+    while any(process.is_alive() for process in processes):
+        try:
+            reclaimed = ingest_queue.reclaim_expired(engine)
+            if reclaimed:
+                logger.warning("시간 초과 작업 %d개 회수", reclaimed)
+        except Exception as e:
+            logger.warning("작업 회수 실패: %s", e)
+        stop_event.wait(settings.INGEST_LEASE_SECONDS / 4)
+        if stop_event.is_set():
+            break
+    for process in processes:
+        process.join()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
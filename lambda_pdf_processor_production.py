@@ -2,28 +2,52 @@ import os
 import json
 import tempfile
 import boto3
-import psycopg2
 import psycopg2.extras
 from langchain_aws import BedrockEmbeddings
 from langchain_text_splitters import CharacterTextSplitter
 from langchain_community.document_loaders import PyPDFLoader
 from urllib.parse import unquote_plus
 
+# 앱과 같은 연결 계층(db.py, bedrock.py, metrics.py)을 Lambda 패키지에 함께 포함합니다.
+from bedrock import make_bedrock_client
+from db import build_url, make_engine
+
 s3_client = boto3.client('s3')
-bedrock_client = boto3.client(service_name='bedrock-runtime', region_name='us-west-1')
+# 앱 업로드 표시 (aws_utils.QUEUE_INGEST_METADATA와 같아야 합니다)
+QUEUE_INGEST_METADATA = {'classmate-ingest': 'queue'}
+# 리전은 Lambda 실행 리전(AWS_REGION)을 기본으로, BEDROCK_REGION으로 바꿀 수 있습니다.
+bedrock_client = make_bedrock_client(
+    os.environ.get('BEDROCK_REGION') or os.environ['AWS_REGION'],
+    max_pool_connections=int(os.environ.get('BEDROCK_MAX_POOL_CONNECTIONS', '10'))
+)
 
 # Titan 임베딩 모델 사용 (올바른 모델 ID)
 embeddings = BedrockEmbeddings(
     client=bedrock_client, 
-    model_id="amazon.titan-embed-text-v2:0"
+    model_id=os.environ.get('EMBEDDING_MODEL_ID', "amazon.titan-embed-text-v2:0")
 )
 
+# 웜 컨테이너에서는 엔진(연결 1개짜리 풀)을 재사용해 호출마다 새로 연결하지 않습니다.
+# 동시 실행 수 = 최대 DB 연결 수이므로 reserved concurrency로 상한을 두세요.
+_engine = None
+
+def get_db_engine():
+    global _engine
+    if _engine is None:
+        _engine = make_engine(
+            build_url(os.environ['DB_HOST'], os.environ.get('DB_PORT', '5432'), os.environ['DB_NAME'],
+                      os.environ['DB_USER'], os.environ['DB_PASSWORD']),
+            pool_size=1,
+            max_overflow=0,
+            statement_timeout_ms=int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', '300000')),
+            pooling_mode=os.environ.get('DB_POOLING_MODE', 'session'),
+            application_name="classmate-lambda"
+        )
+    return _engine
+
 def lambda_handler(event, context):
     # 환경 변수
     DB_HOST = os.environ['DB_HOST']
-    DB_NAME = os.environ['DB_NAME']
-    DB_USER = os.environ['DB_USER']
-    DB_PASSWORD = os.environ['DB_PASSWORD']
     
     bucket_name = event['Records'][0]['s3']['bucket']['name']
     file_key = unquote_plus(event['Records'][0]['s3']['object']['key'])  # URL 디코딩
@@ -42,13 +66,15 @@ def lambda_handler(event, context):
             print(f"documents 폴더 외부 파일: {file_key}")
             return {'statusCode': 200, 'body': 'Skipped file outside documents folder'}
         
-        # PostgreSQL 연결
-        conn = psycopg2.connect(
-            host=DB_HOST,
-            database=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD
-        )
+        # 앱에서 업로드한 파일은 수집 작업 큐(ingest_worker.py)가 처리하므로 건너뜀.
+        # 작업 등록보다 이 이벤트가 먼저 올 수 있으므로 큐 상태가 아닌 객체 메타데이터로 판단합니다.
+        metadata = s3_client.head_object(Bucket=bucket_name, Key=file_key).get('Metadata', {})
+        if all(metadata.get(k) == v for k, v in QUEUE_INGEST_METADATA.items()):
+            print(f"수집 작업 큐가 처리하는 파일: {file_key}")
+            return {'statusCode': 200, 'body': 'Skipped file handled by ingest queue'}
+        
+        # PostgreSQL 연결 (풀에서 psycopg2 연결을 빌리며, close()하면 풀로 반환됨)
+        conn = get_db_engine().raw_connection()
         cursor = conn.cursor()
         
         print(f"데이터베이스 연결 완료")
@@ -62,6 +88,10 @@ def lambda_handler(event, context):
         
         print(f"문서 ID: {document_id}")
         
+        # 청크 테이블은 school_id로 파티션되어 있으므로 학교 ID를 함께 사용
+        cursor.execute("SELECT school_id FROM documents WHERE id = %s", (document_id,))
+        school_id = cursor.fetchone()[0]
+        
         # 처리 시작 상태로 업데이트
         cursor.execute("""
             UPDATE documents 
@@ -89,7 +119,7 @@ def lambda_handler(event, context):
         print(f"PDF 분할 완료 - 총 청크 개수: {len(chunks)}")
         
         # 기존 청크 삭제 (재처리인 경우)
-        cursor.execute("DELETE FROM document_chunks WHERE document_id = %s", (document_id,))
+        cursor.execute("DELETE FROM document_chunks WHERE school_id = %s AND document_id = %s", (school_id, document_id))
         
         successful_chunks = 0
         
@@ -115,10 +145,13 @@ def lambda_handler(event, context):
                     embedding_vector = [0.0] * 1536
                 
                 # document_chunks 테이블에 저장 (우리 DB 구조)
+                # minhash/lsh_bands를 저장하지 않으므로 유사 중복 비교에서 제외됩니다 (near_dedup backfill도 영벡터는 건너뜀).
+                # 재처리로 삭제된 청크에 연결돼 있던 유사 중복 청크는 DB 트리거가 다시 연결합니다.
                 cursor.execute("""
-                    INSERT INTO document_chunks (document_id, chunk_text, embedding)
-                    VALUES (%s, %s, %s)
+                    INSERT INTO document_chunks (school_id, document_id, chunk_text, embedding)
+                    VALUES (%s, %s, %s, %s)
                 """, (
+                    school_id,
                     document_id,
                     cleaned_content,
                     embedding_vector
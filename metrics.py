@@ -0,0 +1,176 @@
+import bisect
+import contextvars
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# --- 지연 시간 히스토그램 ---
+
+def _make_bucket_bounds(start_ms=0.1, factor=1.25, max_ms=300_000):
+    """0.1ms부터 300초까지 25%씩 증가하는 버킷 상한값(ms) 목록을 생성합니다."""
+    bounds = []
+    bound = start_ms
+    while bound < max_ms:
+        bounds.append(bound)
+        bound *= factor
+    bounds.append(max_ms)
+    return bounds
+
+BUCKET_BOUNDS_MS = _make_bucket_bounds()
+
+class LatencyHistogram:
+    """고정 로그 스케일 버킷 히스토그램. 메모리 사용량은 샘플 수와 무관합니다."""
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, value_ms):
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS_MS, value_ms)] += 1
+        self.count += 1
+        self.total_ms += value_ms
+        self.max_ms = max(self.max_ms, value_ms)
+
+    def percentile(self, q):
+        """q 백분위수를 해당 버킷 상한값으로 근사합니다 (오차 최대 25%)."""
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                bound = BUCKET_BOUNDS_MS[index] if index < len(BUCKET_BOUNDS_MS) else self.max_ms
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+# --- 메트릭 저장소 ---
+
+class MetricsRegistry:
+    """단계별 지연 시간, 캐시 적중률, 수집 처리량, 카운터를 메모리에 집계하는 스레드 안전 저장소."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._histograms = defaultdict(LatencyHistogram)
+            self._cache = defaultdict(lambda: {"hits": 0, "misses": 0})
+            self._ingest = defaultdict(lambda: {"runs": 0, "items": 0, "seconds": 0.0})
+            self._counters = defaultdict(int)
+            self._started_at = time.time()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            self._histograms[stage].add(seconds * 1000)
+        current = _current_trace.get()
+        if current is not None:
+            current.stages[stage] = current.stages.get(stage, 0.0) + seconds * 1000
+
+    def record_cache(self, name, hit):
+        with self._lock:
+            self._cache[name]["hits" if hit else "misses"] += 1
+        current = _current_trace.get()
+        if current is not None:
+            current.cache[name] = hit
+
+    def record_ingest(self, source, items, seconds):
+        with self._lock:
+            stats = self._ingest[source]
+            stats["runs"] += 1
+            stats["items"] += items
+            stats["seconds"] += seconds
+
+    def increment(self, name, count=1):
+        with self._lock:
+            self._counters[name] += count
+
+    def stage_summary(self):
+        """단계별 호출 수와 p50/p95/평균/최대 지연(ms) 목록을 반환합니다."""
+        with self._lock:
+            return [
+                {
+                    "stage": stage,
+                    "count": h.count,
+                    "p50_ms": h.percentile(50),
+                    "p95_ms": h.percentile(95),
+                    "mean_ms": h.total_ms / h.count if h.count else None,
+                    "max_ms": h.max_ms
+                }
+                for stage, h in sorted(self._histograms.items())
+            ]
+
+    def cache_summary(self):
+        with self._lock:
+            return [
+                {
+                    "cache": name,
+                    "hits": c["hits"],
+                    "misses": c["misses"],
+                    "hit_rate": c["hits"] / (c["hits"] + c["misses"]) if c["hits"] + c["misses"] else None
+                }
+                for name, c in sorted(self._cache.items())
+            ]
+
+    def ingest_summary(self):
+        with self._lock:
+            return [
+                {
+                    "source": source,
+                    "runs": s["runs"],
+                    "chunks": s["items"],
+                    "seconds": s["seconds"],
+                    "chunks_per_s": s["items"] / s["seconds"] if s["seconds"] else None
+                }
+                for source, s in sorted(self._ingest.items())
+            ]
+
+    def counter_summary(self):
+        with self._lock:
+            return [{"counter": name, "count": count} for name, count in sorted(self._counters.items())]
+
+    @property
+    def started_at(self):
+        return self._started_at
+
+# --- 요청 단위 추적 ---
+
+class Trace:
+    """한 요청 동안 기록된 단계별 소요 시간(ms)과 캐시 적중 여부."""
+
+    def __init__(self):
+        self.stages = {}
+        self.cache = {}
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+
+@contextmanager
+def trace():
+    """with 블록 안에서 기록되는 메트릭을 전역 집계와 별도로 Trace 객체에도 모읍니다."""
+    current = Trace()
+    token = _current_trace.set(current)
+    try:
+        yield current
+    finally:
+        _current_trace.reset(token)
+
+# 프로세스 전역 저장소. Streamlit 서버의 모든 세션이 공유합니다.
+metrics = MetricsRegistry()
+
+@contextmanager
+def timed(stage):
+    """with 블록(또는 데코레이터로 감싼 함수)의 실행 시간을 stage 이름으로 기록합니다."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.record(stage, time.perf_counter() - started)
@@ -0,0 +1,118 @@
+"""
+버전 관리되는 스키마 마이그레이션.
+
+migrations/ 폴더의 NNNN_이름.sql 파일을 버전 순서대로 한 번씩 적용하고, 적용 기록을
+schema_migrations 테이블에 남깁니다. 앱은 시작할 때 DDL을 실행하지 않으므로 배포 시
+이 명령을 먼저 실행해야 합니다.
+
+사용 예:
+    python migrate.py status    # 적용/미적용 마이그레이션 목록
+    python migrate.py up        # 미적용 마이그레이션 모두 적용
+    python migrate.py up --target 1
+"""
+import argparse
+import hashlib
+import os
+import re
+import sys
+
+from sqlalchemy import text
+
+from db import get_engine
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+FILENAME_PATTERN = re.compile(r"^(\d{4})_(\w+)\.sql$")
+# 여러 인스턴스가 동시에 배포될 때 마이그레이션이 한 번만 실행되도록 잡는 advisory lock 키
+LOCK_KEY = 7_362_001
+
+def load_migrations():
+    """(버전, 이름, SQL, 체크섬) 목록을 버전 순으로 반환합니다."""
+    migrations = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = FILENAME_PATTERN.match(filename)
+        if not match:
+            continue
+        with open(os.path.join(MIGRATIONS_DIR, filename), encoding="utf-8") as f:
+            sql = f.read()
+        checksum = hashlib.sha256(sql.encode("utf-8")).hexdigest()
+        migrations.append((int(match.group(1)), match.group(2), sql, checksum))
+    return migrations
+
+def ensure_migrations_table(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            checksum TEXT NOT NULL,
+            applied_at TIMESTAMPTZ DEFAULT NOW()
+        )
+    """))
+
+def applied_versions(conn):
+    """적용된 {버전: 체크섬}. schema_migrations 테이블이 없으면 빈 dict를 반환합니다."""
+    if not conn.execute(text("SELECT to_regclass('schema_migrations')")).scalar():
+        return {}
+    rows = conn.execute(text("SELECT version, checksum FROM schema_migrations")).fetchall()
+    return {row[0]: row[1] for row in rows}
+
+def pending_migrations(conn):
+    """아직 적용되지 않은 (버전, 이름) 목록 (DDL 없이 조회만 수행)."""
+    applied = applied_versions(conn)
+    return [(version, name) for version, name, _, _ in load_migrations() if version not in applied]
+
+def migrate(engine, target=None):
+    """미적용 마이그레이션을 순서대로 적용하고, 적용한 (버전, 이름) 목록을 반환합니다.
+
+    마이그레이션마다 별도 트랜잭션으로 실행하므로 실패하면 해당 마이그레이션만 롤백되고
+    이전까지의 적용 기록은 남습니다. PgBouncer transaction 모드에서도 동작하도록
+    잠금은 트랜잭션 단위(pg_advisory_xact_lock)로 잡고, 잠금을 얻은 뒤 적용 여부를 다시 확인합니다.
+    """
+    applied_now = []
+    with engine.begin() as conn:
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": LOCK_KEY})
+        ensure_migrations_table(conn)
+    for version, name, sql, checksum in load_migrations():
+        if target is not None and version > target:
+            break
+        with engine.begin() as conn:
+            conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": LOCK_KEY})
+            applied = applied_versions(conn)
+            if version in applied:
+                if applied[version] != checksum:
+                    print(f"경고: 이미 적용된 마이그레이션 {version:04d}_{name}의 내용이 변경되었습니다.",
+                          file=sys.stderr)
+                continue
+            conn.exec_driver_sql(sql)
+            conn.execute(text("""
+                INSERT INTO schema_migrations (version, name, checksum) VALUES (:version, :name, :checksum)
+            """), {"version": version, "name": name, "checksum": checksum})
+        applied_now.append((version, name))
+    return applied_now
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="스키마 마이그레이션")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="적용/미적용 마이그레이션 목록")
+    up = sub.add_parser("up", help="미적용 마이그레이션 적용")
+    up.add_argument("--target", type=int, default=None, help="이 버전까지만 적용")
+    args = parser.parse_args(argv)
+
+    engine = get_engine("maintenance")
+    if args.command == "up":
+        for version, name in migrate(engine, target=args.target):
+            print(f"적용: {version:04d}_{name}")
+
+    with engine.connect() as conn:
+        applied = applied_versions(conn)
+    for version, name, _, checksum in load_migrations():
+        if version not in applied:
+            state = "미적용"
+        elif applied[version] != checksum:
+            state = "적용됨 (내용 변경됨)"
+        else:
+            state = "적용됨"
+        print(f"{version:04d}_{name}: {state}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+-- 애플리케이션 코드가 사용하는 기본 스키마
+-- 기존 DB에도 적용할 수 있도록 IF NOT EXISTS로 작성합니다.
+CREATE EXTENSION IF NOT EXISTS vector;
+
+CREATE TABLE IF NOT EXISTS schools (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    code VARCHAR(20) NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS documents (
+    id SERIAL PRIMARY KEY,
+    school_id INTEGER NOT NULL REFERENCES schools(id),
+    file_name VARCHAR(255),
+    source_url TEXT,
+    category VARCHAR(50),
+    processed BOOLEAN DEFAULT FALSE,
+    chunks_count INTEGER DEFAULT 0,
+    created_at TIMESTAMP DEFAULT NOW(),
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+-- 이전에는 앱 시작 시마다 실행되던 컬럼 추가
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS processed BOOLEAN DEFAULT FALSE;
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS chunks_count INTEGER DEFAULT 0;
+
+-- 학교별 LIST 파티션 (새 DB 기준, 기존 단일 테이블은 partitions.py convert로 변환)
+-- 임베딩 차원은 settings.EMBEDDING_DIM 기본값과 같아야 합니다.
+CREATE TABLE IF NOT EXISTS document_chunks (
+    id BIGSERIAL,
+    school_id INTEGER NOT NULL,
+    document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    chunk_text TEXT NOT NULL,
+    embedding vector(1536),
+    PRIMARY KEY (school_id, id)
+) PARTITION BY LIST (school_id);
+
+-- 기존 DB의 단일 document_chunks 테이블(school_id 없음)에는 school_id를 추가해 documents에서 채웁니다.
+-- 이후 마이그레이션의 인덱스와 애플리케이션 쿼리가 모두 school_id를 사용하므로 0002보다 먼저 실행되어야 합니다.
+-- 파티션 테이블로의 변환은 마이그레이션을 모두 적용한 뒤 partitions.py convert로 합니다.
+DO $$
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = to_regclass('document_chunks')) = 'p' THEN
+        CREATE TABLE IF NOT EXISTS document_chunks_default PARTITION OF document_chunks DEFAULT;
+    ELSE
+        ALTER TABLE document_chunks ADD COLUMN IF NOT EXISTS school_id INTEGER;
+        UPDATE document_chunks c SET school_id = d.school_id
+        FROM documents d
+        WHERE d.id = c.document_id AND c.school_id IS NULL;
+        ALTER TABLE document_chunks ALTER COLUMN school_id SET NOT NULL;
+    END IF;
+END $$;
+
+CREATE TABLE IF NOT EXISTS rss_feeds (
+    id SERIAL PRIMARY KEY,
+    school_id INTEGER NOT NULL REFERENCES schools(id),
+    url TEXT NOT NULL,
+    title TEXT,
+    status VARCHAR(20) DEFAULT 'active',
+    last_processed TIMESTAMP,
+    processed_count INTEGER DEFAULT 0,
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS departments (
+    id SERIAL PRIMARY KEY,
+    school_id INTEGER NOT NULL REFERENCES schools(id),
+    name VARCHAR(100) NOT NULL,
+    description TEXT,
+    main_phone VARCHAR(30)
+);
+
+CREATE TABLE IF NOT EXISTS business_keywords (
+    id SERIAL PRIMARY KEY,
+    department_id INTEGER NOT NULL REFERENCES departments(id) ON DELETE CASCADE,
+    keyword VARCHAR(100) NOT NULL,
+    weight INTEGER DEFAULT 1
+);
+
+CREATE TABLE IF NOT EXISTS staff_members (
+    id SERIAL PRIMARY KEY,
+    department_id INTEGER NOT NULL REFERENCES departments(id) ON DELETE CASCADE,
+    name VARCHAR(100),
+    position VARCHAR(100),
+    phone VARCHAR(30),
+    email VARCHAR(100),
+    responsibilities TEXT,
+    is_head BOOLEAN DEFAULT FALSE
+);
+
+CREATE TABLE IF NOT EXISTS query_log (
+    id BIGSERIAL PRIMARY KEY,
+    school_id INTEGER,
+    query TEXT NOT NULL,
+    normalized_query TEXT NOT NULL,
+    result_count INTEGER DEFAULT 0,
+    cache_hit BOOLEAN DEFAULT FALSE,
+    department_fallback BOOLEAN DEFAULT FALSE,
+    total_ms DOUBLE PRECISION,
+    stage_timings JSONB,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS answer_cache (
+    school_id INTEGER NOT NULL,
+    normalized_query TEXT NOT NULL,
+    query TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    sources JSONB,
+    prewarmed BOOLEAN DEFAULT FALSE,
+    hit_count INTEGER DEFAULT 0,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    expires_at TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (school_id, normalized_query)
+);
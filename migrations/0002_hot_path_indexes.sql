@@ -0,0 +1,20 @@
+-- 실제 조회 경로에 맞춘 인덱스
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- 문서 목록 (학교별, 최신순)
+CREATE INDEX IF NOT EXISTS idx_documents_school_created ON documents (school_id, created_at DESC);
+-- Lambda/인제스트의 S3 경로로 문서 찾기
+CREATE INDEX IF NOT EXISTS idx_documents_source_url ON documents (source_url);
+
+-- 문서 단위 청크 삭제/재처리 (파티션 테이블이면 모든 파티션에 생성)
+CREATE INDEX IF NOT EXISTS idx_document_chunks_document ON document_chunks (school_id, document_id);
+-- documents 삭제 시 ON DELETE CASCADE 검사는 school_id 없이 document_id로만 찾습니다.
+CREATE INDEX IF NOT EXISTS idx_document_chunks_document_id ON document_chunks (document_id);
+-- 키워드 검색 (ILIKE)
+CREATE INDEX IF NOT EXISTS idx_document_chunks_text_trgm ON document_chunks USING gin (chunk_text gin_trgm_ops);
+
+-- RSS 피드 등록 (ON CONFLICT (school_id, url))
+CREATE UNIQUE INDEX IF NOT EXISTS idx_rss_feeds_school_url ON rss_feeds (school_id, url);
+
+-- 쿼리 분석 탭 (학교별, 기간 조회)
+CREATE INDEX IF NOT EXISTS idx_query_log_school_created ON query_log (school_id, created_at);
@@ -0,0 +1,30 @@
+-- 수집(PDF/RSS) 작업 큐
+-- 상태: queued → running → succeeded | failed (재시도 대기는 queued + run_after)
+CREATE TABLE IF NOT EXISTS ingest_jobs (
+    id BIGSERIAL PRIMARY KEY,
+    school_id INTEGER NOT NULL REFERENCES schools(id),
+    kind VARCHAR(10) NOT NULL,               -- 'pdf' | 'rss'
+    target TEXT NOT NULL,                    -- PDF: s3:// source_url, RSS: 피드 URL
+    idempotency_key TEXT NOT NULL UNIQUE,
+    priority INTEGER NOT NULL DEFAULT 0,     -- 클수록 먼저 처리
+    status VARCHAR(10) NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    run_after TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    locked_by TEXT,
+    heartbeat_at TIMESTAMPTZ,
+    progress_done INTEGER NOT NULL DEFAULT 0,
+    progress_total INTEGER,
+    result_count INTEGER,
+    last_error TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    started_at TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ
+);
+
+-- 작업 가져오기 (대기 중인 작업만, 우선순위 → 실행 가능 시각 순)
+CREATE INDEX IF NOT EXISTS idx_ingest_jobs_claim ON ingest_jobs (priority DESC, run_after, id) WHERE status = 'queued';
+-- 만료된 실행 중 작업 회수
+CREATE INDEX IF NOT EXISTS idx_ingest_jobs_running ON ingest_jobs (heartbeat_at) WHERE status = 'running';
+-- 파일/피드 목록의 최신 작업 상태 조회
+CREATE INDEX IF NOT EXISTS idx_ingest_jobs_target ON ingest_jobs (school_id, target, id DESC);
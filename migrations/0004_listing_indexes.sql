@@ -0,0 +1,8 @@
+-- 문서/피드 목록 키셋 페이지네이션: (created_at, id) 내림차순
+CREATE INDEX IF NOT EXISTS idx_documents_school_created_id ON documents (school_id, created_at DESC, id DESC);
+DROP INDEX IF EXISTS idx_documents_school_created;
+CREATE INDEX IF NOT EXISTS idx_rss_feeds_school_created_id ON rss_feeds (school_id, created_at DESC, id DESC);
+
+-- 이름 검색 (ILIKE 부분 일치)
+CREATE INDEX IF NOT EXISTS idx_documents_file_name_trgm ON documents USING gin (file_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_rss_feeds_title_trgm ON rss_feeds USING gin (title gin_trgm_ops);
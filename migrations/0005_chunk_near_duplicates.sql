@@ -0,0 +1,10 @@
+-- 유사 중복 청크 탐지 (near_dedup.py)
+ALTER TABLE document_chunks ADD COLUMN IF NOT EXISTS minhash BIGINT[];
+ALTER TABLE document_chunks ADD COLUMN IF NOT EXISTS lsh_bands BIGINT[];
+-- 유사 중복으로 연결된 청크의 원본 청크 ID (같은 학교). 검색에서는 원본만 사용합니다.
+ALTER TABLE document_chunks ADD COLUMN IF NOT EXISTS duplicate_of BIGINT;
+
+-- LSH 밴드 겹침(&&) 후보 조회
+CREATE INDEX IF NOT EXISTS idx_document_chunks_lsh ON document_chunks USING gin (lsh_bands);
+-- 원본 삭제 시 연결된 청크 찾기
+CREATE INDEX IF NOT EXISTS idx_document_chunks_duplicate_of ON document_chunks (school_id, duplicate_of) WHERE duplicate_of IS NOT NULL;
@@ -0,0 +1,27 @@
+-- 유사 중복 원본 청크가 삭제되면, 연결된 청크 중 가장 작은 id 하나를 원본으로 승격하고
+-- 나머지는 그 청크를 가리키게 합니다. 앱·워커·Lambda·documents CASCADE 등 모든 삭제 경로에 적용됩니다.
+-- AFTER 행 트리거는 문장이 끝난 뒤 실행되므로, 같은 문장에서 함께 삭제된 청크는 승격 대상이 아닙니다.
+CREATE OR REPLACE FUNCTION promote_duplicate_heir() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    heir_id BIGINT;
+BEGIN
+    -- 파티션 이동(add-school의 DELETE ... RETURNING 후 INSERT)처럼 같은 행이 다시 들어간 경우는 삭제가 아닙니다.
+    IF EXISTS (SELECT 1 FROM document_chunks WHERE school_id = OLD.school_id AND id = OLD.id) THEN
+        RETURN NULL;
+    END IF;
+    SELECT MIN(id) INTO heir_id FROM document_chunks
+    WHERE school_id = OLD.school_id AND duplicate_of = OLD.id;
+    IF heir_id IS NOT NULL THEN
+        UPDATE document_chunks SET duplicate_of = NULLIF(heir_id, id)
+        WHERE school_id = OLD.school_id AND duplicate_of = OLD.id;
+    END IF;
+    RETURN NULL;
+END $$;
+
+-- 파티션 테이블이면 모든 파티션(이후 추가·ATTACH되는 파티션 포함)에 적용됩니다.
+DROP TRIGGER IF EXISTS trg_document_chunks_promote_duplicates ON document_chunks;
+CREATE TRIGGER trg_document_chunks_promote_duplicates
+    AFTER DELETE ON document_chunks
+    FOR EACH ROW WHEN (OLD.duplicate_of IS NULL)
+    EXECUTE FUNCTION promote_duplicate_heir();
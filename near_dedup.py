@@ -0,0 +1,153 @@
+"""
+MinHash/LSH 기반 유사 중복 청크 탐지.
+
+청크마다 문자 5-gram 집합의 MinHash 서명(128개)과 LSH 밴드 해시(16밴드 × 8행)를 계산해
+document_chunks.minhash / lsh_bands에 저장합니다. 수집 시 같은 학교에서 밴드 해시가
+하나라도 겹치는 청크를 GIN 인덱스로 찾고, 서명으로 추정한 Jaccard 유사도가
+NEAR_DUP_THRESHOLD 이상이면 유사 중복으로 판단합니다.
+
+NEAR_DUP_MODE:
+    skip  중복 청크를 저장하지 않음
+    link  원본 청크의 임베딩을 복사하고 duplicate_of로 연결 (임베딩 호출 없음, 검색에서 제외)
+    off   탐지하지 않음
+
+사용 예:
+    python near_dedup.py backfill --school-id 1   # 기존 청크의 서명 계산
+"""
+import argparse
+import hashlib
+import re
+import sys
+import zlib
+
+import numpy as np
+from sqlalchemy import text
+
+from config import settings
+from metrics import metrics, timed
+
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 5
+# 후보 청크가 많을 때 유사도를 계산할 최대 개수
+MAX_CANDIDATES = 50
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+# 프로세스/서버가 달라도 같은 서명이 나오도록 고정 시드를 사용합니다.
+_rng = np.random.RandomState(20240601)
+_PERM_A = _rng.randint(1, 1 << 31, size=NUM_PERM).astype(np.uint64)
+_PERM_B = _rng.randint(0, 1 << 31, size=NUM_PERM).astype(np.uint64)
+
+WHITESPACE = re.compile(r"\s+")
+
+def shingles(chunk_text):
+    normalized = WHITESPACE.sub(" ", chunk_text.lower()).strip()
+    if len(normalized) <= SHINGLE_SIZE:
+        return {normalized}
+    return {normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)}
+
+def minhash_signature(chunk_text):
+    """MinHash 서명 (NUM_PERM개의 0 이상 2^61 미만 정수)."""
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles(chunk_text)), dtype=np.uint64)
+    values = (_PERM_A[:, None] * hashes[None, :] + _PERM_B[:, None]) % MERSENNE_PRIME
+    return values.min(axis=1).astype(np.int64)
+
+def lsh_bands(signature):
+    """밴드별 해시 (밴드 번호 포함, BIGINT 범위의 부호 있는 정수)."""
+    bands = []
+    for band in range(BANDS):
+        digest = hashlib.blake2b(signature[band * ROWS:(band + 1) * ROWS].tobytes(),
+                                 digest_size=8, person=band.to_bytes(2, "big")).digest()
+        bands.append(int.from_bytes(digest, "big", signed=True))
+    return bands
+
+def estimate_similarity(signature, other):
+    return float(np.mean(signature == np.asarray(other, dtype=np.int64)))
+
+class ChunkDeduplicator:
+    """한 학교의 수집 트랜잭션 안에서 청크의 유사 중복 여부를 판단합니다.
+
+    같은 연결로 조회하므로 같은 트랜잭션에서 방금 저장한 청크(같은 문서의 반복 페이지)도
+    후보에 포함됩니다.
+    """
+
+    def __init__(self, conn, school_id, mode=None, threshold=None):
+        self.conn = conn
+        self.school_id = school_id
+        self.mode = mode or settings.NEAR_DUP_MODE
+        self.threshold = threshold or settings.NEAR_DUP_THRESHOLD
+
+    @property
+    def enabled(self):
+        return self.mode in ("skip", "link")
+
+    def check(self, chunk_text):
+        """(서명, 밴드 해시, 중복 원본 청크 ID 또는 None)을 반환합니다."""
+        signature = minhash_signature(chunk_text)
+        bands = lsh_bands(signature)
+        if not self.enabled:
+            return signature, bands, None
+
+        with timed("ingest.near_dup_lookup"):
+            candidates = self.conn.execute(text("""
+                SELECT id, minhash FROM document_chunks
+                WHERE school_id = :school_id AND lsh_bands && CAST(:bands AS BIGINT[]) AND duplicate_of IS NULL
+                LIMIT :limit
+            """), {"school_id": self.school_id, "bands": bands, "limit": MAX_CANDIDATES}).fetchall()
+        best_id, best_similarity = None, 0.0
+        for chunk_id, other in candidates:
+            similarity = estimate_similarity(signature, other)
+            if similarity > best_similarity:
+                best_id, best_similarity = chunk_id, similarity
+        duplicate_id = best_id if best_similarity >= self.threshold else None
+        metrics.increment("near_duplicate.checked")
+        if duplicate_id is not None:
+            metrics.increment("near_duplicate.found")
+        return signature, bands, duplicate_id
+
+def backfill_signatures(engine, school_id, batch_size=500):
+    """서명이 없는 기존 청크의 MinHash/LSH 값을 계산합니다 (중복 연결은 하지 않음).
+
+    Lambda가 저장한 영벡터 청크는 건너뜁니다. 원본 후보가 되면 유사 청크가 영벡터를 복사해
+    벡터 검색에서 빠지기 때문입니다.
+    """
+    updated = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(text("""
+                SELECT id, chunk_text FROM document_chunks
+                WHERE school_id = :school_id AND minhash IS NULL
+                  AND (embedding IS NULL OR vector_norm(embedding) > 0)
+                LIMIT :limit
+            """), {"school_id": school_id, "limit": batch_size}).fetchall()
+            if not rows:
+                return updated
+            params = []
+            for chunk_id, chunk_text in rows:
+                signature = minhash_signature(chunk_text)
+                params.append({"school_id": school_id, "id": chunk_id,
+                               "minhash": signature.tolist(), "bands": lsh_bands(signature)})
+            conn.execute(text("""
+                UPDATE document_chunks SET minhash = CAST(:minhash AS BIGINT[]), lsh_bands = CAST(:bands AS BIGINT[])
+                WHERE school_id = :school_id AND id = :id
+            """), params)
+            updated += len(rows)
+
+def main(argv=None):
+    from db import get_engine
+
+    parser = argparse.ArgumentParser(description="유사 중복 청크 서명 관리")
+    sub = parser.add_subparsers(dest="command", required=True)
+    backfill = sub.add_parser("backfill", help="기존 청크의 MinHash/LSH 서명 계산")
+    backfill.add_argument("--school-id", type=int, required=True)
+    args = parser.parse_args(argv)
+
+    # 인덱스 생성·백필은 오래 걸리므로 statement_timeout이 없는 관리용 엔진을 사용합니다.
+    engine = get_engine("maintenance")
+    if args.command == "backfill":
+        print(f"서명 계산 완료: {backfill_signatures(engine, args.school_id)}개 청크")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
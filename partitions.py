@@ -0,0 +1,210 @@
+"""
+document_chunks 학교별 파티션 관리.
+
+document_chunks는 school_id로 LIST 파티셔닝되며, 학교마다 document_chunks_s{school_id}
+파티션을 갖습니다. 파티션이 없는 학교의 청크는 document_chunks_default에 저장됩니다.
+인덱스는 부모 테이블에 정의되어 각 파티션에 자동으로 생성되므로, 학교 추가는 다른 학교의
+인덱스에 영향을 주지 않고 학교 삭제는 파티션 DROP으로 끝납니다.
+
+사용 예:
+    python partitions.py convert             # 기존 단일 테이블을 파티션 테이블로 변환
+    python partitions.py add-school --school-id 3
+    python partitions.py drop-school --school-id 3 --yes
+    python partitions.py list
+"""
+import argparse
+import json
+import sys
+
+from sqlalchemy import text
+
+from config import settings
+
+PARENT_TABLE = "document_chunks"
+DEFAULT_PARTITION = "document_chunks_default"
+
+def partition_name(school_id):
+    return f"document_chunks_s{int(school_id)}"
+
+def is_partitioned(conn):
+    relkind = conn.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:name)"),
+                           {"name": PARENT_TABLE}).scalar()
+    return relkind == "p"
+
+def list_partitions(conn):
+    """(파티션 이름, 파티션 범위 식, 행 수 추정치, 크기) 목록을 반환합니다."""
+    return conn.execute(text("""
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::BIGINT,
+               pg_total_relation_size(c.oid)
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(:parent)
+        ORDER BY c.relname
+    """), {"parent": PARENT_TABLE}).fetchall()
+
+# --- 변환 ---
+
+def convert_to_partitioned(engine):
+    """기존 단일 document_chunks 테이블을 school_id 파티션 테이블로 변환합니다.
+
+    한 트랜잭션에서 실행되며, 변환 중에는 document_chunks에 대한 쓰기가 대기합니다.
+    migrate.py up으로 마이그레이션을 모두 적용한 뒤 실행해야 합니다.
+    """
+    with engine.begin() as conn:
+        if is_partitioned(conn):
+            return False
+
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        sequence = conn.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"),
+                                {"table": PARENT_TABLE}).scalar()
+        conn.execute(text("LOCK TABLE document_chunks IN ACCESS EXCLUSIVE MODE"))
+        # 0005 마이그레이션 이전 테이블에도 복사할 수 있도록 유사 중복 컬럼을 맞춥니다.
+        conn.execute(text("""
+            ALTER TABLE document_chunks
+                ADD COLUMN IF NOT EXISTS minhash BIGINT[],
+                ADD COLUMN IF NOT EXISTS lsh_bands BIGINT[],
+                ADD COLUMN IF NOT EXISTS duplicate_of BIGINT
+        """))
+        conn.execute(text("ALTER TABLE document_chunks RENAME TO document_chunks_unpartitioned"))
+        if sequence:
+            conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY NONE"))
+        else:
+            sequence = "document_chunks_id_seq"
+            conn.execute(text(f"CREATE SEQUENCE IF NOT EXISTS {sequence}"))
+            conn.execute(text(f"SELECT setval('{sequence}', COALESCE((SELECT MAX(id) FROM document_chunks_unpartitioned), 0) + 1, false)"))
+
+        conn.execute(text(f"""
+            CREATE TABLE document_chunks (
+                id BIGINT NOT NULL DEFAULT nextval('{sequence}'),
+                school_id INTEGER NOT NULL,
+                document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+                chunk_text TEXT NOT NULL,
+                embedding vector({settings.EMBEDDING_DIM}),
+                minhash BIGINT[],
+                lsh_bands BIGINT[],
+                duplicate_of BIGINT,
+                PRIMARY KEY (school_id, id)
+            ) PARTITION BY LIST (school_id)
+        """))
+        conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY document_chunks.id"))
+        conn.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF document_chunks DEFAULT"))
+        for (school_id,) in conn.execute(text("SELECT id FROM schools ORDER BY id")).fetchall():
+            conn.execute(text(
+                f"CREATE TABLE {partition_name(school_id)} PARTITION OF document_chunks FOR VALUES IN ({int(school_id)})"
+            ))
+
+        # 인덱스는 데이터를 옮긴 뒤 한 번에 생성하는 편이 빠릅니다.
+        conn.execute(text("""
+            INSERT INTO document_chunks (id, school_id, document_id, chunk_text, embedding, minhash, lsh_bands, duplicate_of)
+            SELECT c.id, d.school_id, c.document_id, c.chunk_text, c.embedding, c.minhash, c.lsh_bands, c.duplicate_of
+            FROM document_chunks_unpartitioned c
+            JOIN documents d ON d.id = c.document_id
+        """))
+        conn.execute(text("DROP TABLE document_chunks_unpartitioned"))
+        create_parent_indexes(conn)
+        create_parent_triggers(conn)
+    return True
+
+def create_parent_indexes(conn):
+    """부모 테이블 인덱스를 정의합니다. 모든 파티션(이후 추가될 파티션 포함)에 적용됩니다."""
+    conn.execute(text("CREATE INDEX IF NOT EXISTS idx_document_chunks_document ON document_chunks (school_id, document_id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS idx_document_chunks_document_id ON document_chunks (document_id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS idx_document_chunks_text_trgm ON document_chunks USING gin (chunk_text gin_trgm_ops)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS idx_document_chunks_lsh ON document_chunks USING gin (lsh_bands)"))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS idx_document_chunks_duplicate_of ON document_chunks (school_id, duplicate_of) WHERE duplicate_of IS NOT NULL"
+    ))
+
+def create_parent_triggers(conn):
+    """부모 테이블 트리거를 정의합니다. 트리거 함수는 0006 마이그레이션이 만들며, 아직 없으면
+    (마이그레이션 전에 변환한 경우) 이후 migrate.py up이 트리거까지 만듭니다."""
+    if not conn.execute(text("SELECT to_regprocedure('promote_duplicate_heir()')")).scalar():
+        return
+    conn.execute(text("""
+        CREATE TRIGGER trg_document_chunks_promote_duplicates
+            AFTER DELETE ON document_chunks
+            FOR EACH ROW WHEN (OLD.duplicate_of IS NULL)
+            EXECUTE FUNCTION promote_duplicate_heir()
+    """))
+
+# --- 학교 추가/삭제 ---
+
+def add_school_partition(engine, school_id):
+    """학교 전용 파티션을 만들고, 기본 파티션에 쌓인 해당 학교 청크를 옮깁니다."""
+    name = partition_name(school_id)
+    with engine.begin() as conn:
+        if conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar():
+            return False
+        # 기본 파티션에 해당 학교 행이 있으면 새 파티션을 붙일 수 없으므로 먼저 떼어 옮깁니다.
+        conn.execute(text(f"ALTER TABLE document_chunks DETACH PARTITION {DEFAULT_PARTITION}"))
+        conn.execute(text(
+            f"CREATE TABLE {name} PARTITION OF document_chunks FOR VALUES IN ({int(school_id)})"
+        ))
+        conn.execute(text(f"""
+            WITH moved AS (
+                DELETE FROM {DEFAULT_PARTITION} WHERE school_id = :school_id RETURNING *
+            )
+            INSERT INTO document_chunks (id, school_id, document_id, chunk_text, embedding, minhash, lsh_bands, duplicate_of)
+            SELECT id, school_id, document_id, chunk_text, embedding, minhash, lsh_bands, duplicate_of FROM moved
+        """), {"school_id": school_id})
+        conn.execute(text(f"ALTER TABLE document_chunks ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+    return True
+
+def drop_school(engine, school_id):
+    """학교의 청크 파티션을 DROP하고 해당 학교의 나머지 데이터를 삭제합니다."""
+    name = partition_name(school_id)
+    with engine.begin() as conn:
+        if conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar():
+            conn.execute(text(f"DROP TABLE {name}"))
+        else:
+            conn.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE school_id = :school_id"),
+                         {"school_id": school_id})
+        params = {"school_id": school_id}
+        conn.execute(text("DELETE FROM documents WHERE school_id = :school_id"), params)
+        conn.execute(text("DELETE FROM rss_feeds WHERE school_id = :school_id"), params)
+        conn.execute(text("""
+            DELETE FROM business_keywords WHERE department_id IN (SELECT id FROM departments WHERE school_id = :school_id)
+        """), params)
+        conn.execute(text("""
+            DELETE FROM staff_members WHERE department_id IN (SELECT id FROM departments WHERE school_id = :school_id)
+        """), params)
+        conn.execute(text("DELETE FROM departments WHERE school_id = :school_id"), params)
+        conn.execute(text("DELETE FROM query_log WHERE school_id = :school_id"), params)
+        conn.execute(text("DELETE FROM answer_cache WHERE school_id = :school_id"), params)
+        conn.execute(text("DELETE FROM ingest_jobs WHERE school_id = :school_id"), params)
+        conn.execute(text("DELETE FROM schools WHERE id = :school_id"), params)
+
+def main(argv=None):
+    from db import get_engine
+
+    parser = argparse.ArgumentParser(description="document_chunks 학교별 파티션 관리")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("convert", help="단일 테이블을 파티션 테이블로 변환")
+    sub.add_parser("list", help="파티션 목록")
+    add = sub.add_parser("add-school", help="학교 파티션 추가")
+    add.add_argument("--school-id", type=int, required=True)
+    drop = sub.add_parser("drop-school", help="학교와 청크 파티션 삭제")
+    drop.add_argument("--school-id", type=int, required=True)
+    drop.add_argument("--yes", action="store_true", help="삭제 확인")
+    args = parser.parse_args(argv)
+
+    # 파티션 변환·삭제는 오래 걸릴 수 있으므로 statement_timeout이 없는 관리용 엔진을 사용합니다.
+    engine = get_engine("maintenance")
+    if args.command == "convert":
+        print("변환 완료" if convert_to_partitioned(engine) else "이미 파티션 테이블입니다.")
+    elif args.command == "add-school":
+        print("파티션 추가 완료" if add_school_partition(engine, args.school_id) else "이미 존재하는 파티션입니다.")
+    elif args.command == "drop-school":
+        if not args.yes:
+            print("학교의 모든 문서와 청크가 삭제됩니다. 계속하려면 --yes를 지정하세요.", file=sys.stderr)
+            return 1
+        drop_school(engine, args.school_id)
+        print("삭제 완료")
+    with engine.connect() as conn:
+        rows = [{"partition": r[0], "bound": r[1], "rows_estimate": r[2], "bytes": r[3]}
+                for r in list_partitions(conn)]
+    print(json.dumps(rows, ensure_ascii=False, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
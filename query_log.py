@@ -0,0 +1,105 @@
+import atexit
+import json
+import logging
+import queue
+import threading
+import time
+
+import streamlit as st
+from sqlalchemy import text
+
+from chatbot_logic import normalize_query
+
+logger = logging.getLogger(__name__)
+
+INSERT_QUERY_LOG_SQL = text("""
+    INSERT INTO query_log (school_id, query, normalized_query, result_count, cache_hit,
+                           department_fallback, total_ms, stage_timings, created_at)
+    VALUES (:school_id, :query, :normalized_query, :result_count, :cache_hit,
+            :department_fallback, :total_ms, CAST(:stage_timings AS JSONB), to_timestamp(:created_at))
+""")
+
+class QueryLogWriter:
+    """질의 로그를 백그라운드 스레드에서 배치로 저장하는 비동기 기록기.
+
+    log()는 큐에 넣기만 하므로 요청 경로를 막지 않습니다. 큐가 가득 차면 항목을 버리고
+    dropped 카운터만 증가시킵니다.
+    """
+
+    def __init__(self, engine, batch_size=100, flush_interval=2.0, max_queue=10000):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.written = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="query-log-writer", daemon=True)
+        self._thread.start()
+
+    def log(self, school_id, query, result_count, total_ms, stage_timings=None,
+            cache_hit=False, department_fallback=False):
+        entry = {
+            "school_id": school_id,
+            "query": query,
+            "normalized_query": normalize_query(query),
+            "result_count": result_count,
+            "cache_hit": cache_hit,
+            "department_fallback": department_fallback,
+            "total_ms": total_ms,
+            "stage_timings": json.dumps(stage_timings or {}),
+            "created_at": time.time()
+        }
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+    def _drain(self, first):
+        """첫 항목 이후 batch_size개가 모이거나 flush_interval이 지날 때까지 항목을 모읍니다."""
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size and not self._stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _flush(self, batch):
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(INSERT_QUERY_LOG_SQL, batch)
+            self.written += len(batch)
+        except Exception as e:
+            # 로그 저장 실패가 서비스에 영향을 주지 않도록 기록만 남기고 버립니다.
+            self.dropped += len(batch)
+            logger.warning("질의 로그 저장 실패 (%d건): %s", len(batch), e)
+
+    def _run(self):
+        while not self._stop.is_set() or not self._queue.empty():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            self._flush(self._drain(first))
+
+    def close(self, timeout=5.0):
+        """남은 항목을 저장하고 기록 스레드를 종료합니다."""
+        self._stop.set()
+        self._thread.join(timeout)
+
+@st.cache_resource
+def init_query_log_writer(_engine):
+    """프로세스 전역 질의 로그 기록기를 생성합니다."""
+    writer = QueryLogWriter(_engine)
+    atexit.register(writer.close)
+    return writer
@@ -0,0 +1,122 @@
+import threading
+
+from metrics import metrics
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """같은 키로 동시에 들어온 호출을 한 번의 실행으로 합칩니다.
+
+    먼저 들어온 호출(리더)만 함수를 실행하고, 실행 중에 같은 키로 들어온 호출은
+    리더의 결과(또는 예외)를 그대로 받습니다. 실행이 끝나면 키는 즉시 해제되므로
+    결과를 캐시하지는 않습니다.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            # 캐시 적중이 아니므로 record_cache(요청 trace의 cache_hit에 반영됨)가 아닌 카운터로 셉니다.
+            metrics.increment(f"coalesce.{self.name}")
+
+        if leader:
+            try:
+                call.result = fn(*args, **kwargs)
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.event.set()
+        else:
+            call.event.wait()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+class SharedStream:
+    """생산자 하나의 출력 조각을 여러 구독자가 처음부터 순서대로 읽을 수 있게 보관합니다."""
+
+    def __init__(self):
+        self._chunks = []
+        self._done = False
+        self._error = None
+        self._condition = threading.Condition()
+
+    def publish(self, chunk):
+        with self._condition:
+            self._chunks.append(chunk)
+            self._condition.notify_all()
+
+    def finish(self, error=None):
+        with self._condition:
+            self._done = True
+            self._error = error
+            self._condition.notify_all()
+
+    def subscribe(self):
+        index = 0
+        while True:
+            with self._condition:
+                while index >= len(self._chunks) and not self._done:
+                    self._condition.wait()
+                if index < len(self._chunks):
+                    chunk = self._chunks[index]
+                    index += 1
+                elif self._error is not None:
+                    raise self._error
+                else:
+                    return
+            yield chunk
+
+class StreamFlight:
+    """같은 키의 동시 스트리밍 요청이 하나의 생성기 출력을 공유하게 합니다.
+
+    생성기는 별도 스레드에서 끝까지 소비되므로, 처음 요청한 구독자가 연결을 끊어도
+    나머지 구독자는 계속 답변을 받습니다.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._streams = {}
+
+    def _produce(self, key, stream, factory):
+        error = None
+        try:
+            for chunk in factory():
+                stream.publish(chunk)
+        except BaseException as e:
+            error = e
+        finally:
+            with self._lock:
+                self._streams.pop(key, None)
+            stream.finish(error)
+
+    def stream(self, key, factory):
+        """factory()가 반환하는 생성기의 출력을 구독하는 생성기를 반환합니다."""
+        with self._lock:
+            stream = self._streams.get(key)
+            leader = stream is None
+            if leader:
+                stream = self._streams[key] = SharedStream()
+        if not leader:
+            metrics.increment(f"coalesce.{self.name}")
+
+        if leader:
+            threading.Thread(target=self._produce, args=(key, stream, factory),
+                             name=f"stream-{self.name}", daemon=True).start()
+        return stream.subscribe()
@@ -0,0 +1,308 @@
+"""
+학교 단위 인덱스 스냅샷 내보내기/가져오기.
+
+학교의 문서·청크·임베딩을 Parquet와 NumPy(.npy) 파일로 내보내고, 다른 DB에 COPY로
+한 번에 적재합니다. 임베딩을 다시 계산하지 않으므로 새 환경이나 부하 테스트용 DB를
+Bedrock 호출 없이 몇 분 안에 채울 수 있습니다.
+
+스냅샷 디렉터리 구성:
+    manifest.json      학교 정보, 임베딩 차원, 스키마 버전, 행 수
+    documents.parquet  documents 행 (id는 원본 DB 기준)
+    rss_feeds.parquet  등록된 RSS 피드
+    chunks.parquet     document_chunks 행 (임베딩 제외)
+    embeddings.npy     float32 (청크 수, EMBEDDING_DIM) 행렬. chunks.parquet와 행 순서가 같으며
+                       np.load(..., mmap_mode="r")로 메모리에 올리지 않고 읽을 수 있습니다.
+
+가져올 때는 새 ID를 발급해 문서/청크/중복 연결 ID를 다시 매핑하고, 청크는 인덱스가 없는
+별도 테이블에 COPY한 뒤 학교 파티션으로 ATTACH합니다 (부모 인덱스가 이때 한 번에 생성됨).
+
+사용 예:
+    python snapshot.py export --school-id 1 --output snapshots/ysu
+    python snapshot.py import --input snapshots/ysu            # 같은 code의 학교로 (없으면 생성)
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import text
+
+from config import settings
+import partitions
+
+FORMAT_VERSION = 1
+BATCH_SIZE = 5000
+
+DOCUMENT_COLUMNS = ("id", "file_name", "source_url", "category", "processed", "chunks_count",
+                    "created_at", "updated_at")
+RSS_COLUMNS = ("url", "title", "status", "last_processed", "processed_count", "created_at")
+
+DOCUMENTS_SCHEMA = pa.schema([
+    ("id", pa.int32()), ("file_name", pa.string()), ("source_url", pa.string()), ("category", pa.string()),
+    ("processed", pa.bool_()), ("chunks_count", pa.int32()),
+    ("created_at", pa.timestamp("us")), ("updated_at", pa.timestamp("us"))
+])
+RSS_SCHEMA = pa.schema([
+    ("url", pa.string()), ("title", pa.string()), ("status", pa.string()),
+    ("last_processed", pa.timestamp("us")), ("processed_count", pa.int32()), ("created_at", pa.timestamp("us"))
+])
+CHUNKS_SCHEMA = pa.schema([
+    ("id", pa.int64()), ("document_id", pa.int32()), ("chunk_text", pa.string()),
+    ("has_embedding", pa.bool_()), ("minhash", pa.list_(pa.int64())), ("lsh_bands", pa.list_(pa.int64())),
+    ("duplicate_of", pa.int64())
+])
+
+def _rows_to_table(rows, columns, schema):
+    return pa.Table.from_pydict({name: [row[i] for row in rows] for i, name in enumerate(columns)}, schema=schema)
+
+def _parse_vectors(values):
+    """pgvector 텍스트 표현 목록을 (n, EMBEDDING_DIM) float32 행렬로 변환합니다. NULL은 NaN 행."""
+    matrix = np.full((len(values), settings.EMBEDDING_DIM), np.nan, dtype=np.float32)
+    for i, value in enumerate(values):
+        if value is not None:
+            matrix[i] = np.array(value[1:-1].split(","), dtype=np.float32)
+    return matrix
+
+# --- 내보내기 ---
+
+def export_school(engine, school_id, output_dir):
+    """학교 하나의 스냅샷을 output_dir에 기록하고 manifest dict를 반환합니다.
+
+    REPEATABLE READ 트랜잭션 하나에서 읽으므로 내보내는 동안 수집이 진행되어도
+    문서·청크·임베딩이 같은 시점 기준으로 맞춰집니다.
+    """
+    from migrate import applied_versions
+
+    os.makedirs(output_dir, exist_ok=True)
+    params = {"school_id": school_id}
+    with engine.connect().execution_options(isolation_level="REPEATABLE READ") as conn, conn.begin():
+        school = conn.execute(text("SELECT id, name, code FROM schools WHERE id = :school_id"), params).fetchone()
+        if not school:
+            raise ValueError(f"학교를 찾을 수 없습니다: {school_id}")
+
+        documents = conn.execute(text(f"""
+            SELECT {", ".join(DOCUMENT_COLUMNS)} FROM documents WHERE school_id = :school_id ORDER BY id
+        """), params).fetchall()
+        pq.write_table(_rows_to_table(documents, DOCUMENT_COLUMNS, DOCUMENTS_SCHEMA),
+                       os.path.join(output_dir, "documents.parquet"), compression="zstd")
+
+        feeds = conn.execute(text(f"""
+            SELECT {", ".join(RSS_COLUMNS)} FROM rss_feeds WHERE school_id = :school_id ORDER BY id
+        """), params).fetchall()
+        pq.write_table(_rows_to_table(feeds, RSS_COLUMNS, RSS_SCHEMA),
+                       os.path.join(output_dir, "rss_feeds.parquet"), compression="zstd")
+
+        chunk_count = conn.execute(text("SELECT COUNT(*) FROM document_chunks WHERE school_id = :school_id"),
+                                   params).scalar()
+        vectors = np.lib.format.open_memmap(os.path.join(output_dir, "embeddings.npy"), mode="w+",
+                                            dtype=np.float32, shape=(chunk_count, settings.EMBEDDING_DIM))
+        result = conn.execution_options(stream_results=True).execute(text("""
+            SELECT id, document_id, chunk_text, embedding::text, minhash, lsh_bands, duplicate_of
+            FROM document_chunks WHERE school_id = :school_id ORDER BY id
+        """), params)
+        offset = 0
+        with pq.ParquetWriter(os.path.join(output_dir, "chunks.parquet"), CHUNKS_SCHEMA, compression="zstd") as writer:
+            for rows in result.partitions(BATCH_SIZE):
+                vectors[offset:offset + len(rows)] = _parse_vectors([row[3] for row in rows])
+                offset += len(rows)
+                writer.write_table(pa.Table.from_pydict({
+                    "id": [row[0] for row in rows],
+                    "document_id": [row[1] for row in rows],
+                    "chunk_text": [row[2] for row in rows],
+                    "has_embedding": [row[3] is not None for row in rows],
+                    "minhash": [row[4] for row in rows],
+                    "lsh_bands": [row[5] for row in rows],
+                    "duplicate_of": [row[6] for row in rows]
+                }, schema=CHUNKS_SCHEMA))
+        vectors.flush()
+        del vectors
+        schema_version = max(applied_versions(conn), default=0)
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "exported_at": datetime.now(timezone.utc).isoformat(),
+        "school": {"id": school[0], "name": school[1], "code": school[2]},
+        "schema_version": schema_version,
+        "embedding_dim": settings.EMBEDDING_DIM,
+        "counts": {"documents": len(documents), "rss_feeds": len(feeds), "chunks": offset}
+    }
+    with open(os.path.join(output_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+# --- 가져오기 ---
+
+def _copy_value(value):
+    """COPY 텍스트 형식의 필드 값."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (list, np.ndarray)):
+        return "{" + ",".join(str(int(v)) for v in value) + "}"
+    return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+def _copy_rows(cursor, table, columns, rows):
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(_copy_value(v) for v in row))
+        buffer.write("\n")
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+
+def _allocate_ids(conn, table, count):
+    """테이블 id 시퀀스에서 새 ID count개를 발급합니다."""
+    if not count:
+        return np.empty(0, dtype=np.int64)
+    rows = conn.execute(text("""
+        SELECT nextval(pg_get_serial_sequence(:table, 'id')) FROM generate_series(1, :count)
+    """), {"table": table, "count": count}).fetchall()
+    return np.array([row[0] for row in rows], dtype=np.int64)
+
+def _remap(sorted_old, sorted_new, values):
+    """정렬된 old → new ID 매핑을 values에 적용합니다 (None이거나 매핑이 없으면 None)."""
+    if not len(sorted_old):
+        return [None] * len(values)
+    lookup = np.array([-1 if value is None else value for value in values], dtype=np.int64)
+    positions = np.minimum(np.searchsorted(sorted_old, lookup), len(sorted_old) - 1)
+    found = (lookup >= 0) & (sorted_old[positions] == lookup)
+    return [int(new_id) if hit else None for new_id, hit in zip(sorted_new[positions], found)]
+
+def _resolve_school(conn, manifest, school_id):
+    """가져올 학교 ID를 정합니다. 지정하지 않으면 같은 code의 학교를 쓰거나 새로 만듭니다."""
+    if school_id is None:
+        school = manifest["school"]
+        school_id = conn.execute(text("SELECT id FROM schools WHERE code = :code"), {"code": school["code"]}).scalar()
+        if school_id is None:
+            school_id = conn.execute(text("INSERT INTO schools (name, code) VALUES (:name, :code) RETURNING id"),
+                                     {"name": school["name"], "code": school["code"]}).scalar()
+    elif not conn.execute(text("SELECT 1 FROM schools WHERE id = :school_id"), {"school_id": school_id}).scalar():
+        raise ValueError(f"학교를 찾을 수 없습니다: {school_id}")
+    if conn.execute(text("SELECT 1 FROM documents WHERE school_id = :school_id LIMIT 1"),
+                    {"school_id": school_id}).scalar():
+        raise ValueError(f"학교 {school_id}에 이미 문서가 있습니다. partitions.py drop-school로 비운 뒤 가져오세요.")
+    return school_id
+
+def _load_chunks(conn, cursor, input_dir, school_id, document_map):
+    """청크를 COPY로 적재하고 적재한 행 수를 반환합니다."""
+    chunks_file = pq.ParquetFile(os.path.join(input_dir, "chunks.parquet"))
+    vectors = np.load(os.path.join(input_dir, "embeddings.npy"), mmap_mode="r")
+    old_ids = chunks_file.read(columns=["id"]).column("id").to_numpy()
+    if len(old_ids) != len(vectors):
+        raise ValueError("chunks.parquet와 embeddings.npy의 행 수가 다릅니다.")
+    new_ids = _allocate_ids(conn, "document_chunks", len(old_ids))
+    order = np.argsort(old_ids)
+    sorted_old, sorted_new = old_ids[order], new_ids[order]
+
+    # 파티션 테이블이면 인덱스 없는 테이블에 적재한 뒤 학교 파티션으로 붙입니다.
+    attach = partitions.is_partitioned(conn)
+    target = partitions.partition_name(school_id) if attach else "document_chunks"
+    if attach:
+        if conn.execute(text("SELECT to_regclass(:name)"), {"name": target}).scalar():
+            # 문서가 없는 학교이므로 (FK) 파티션도 비어 있습니다.
+            conn.execute(text(f"DROP TABLE {target}"))
+        conn.execute(text(f"CREATE TABLE {target} (LIKE document_chunks INCLUDING DEFAULTS)"))
+
+    columns = ("id", "school_id", "document_id", "chunk_text", "embedding", "minhash", "lsh_bands", "duplicate_of")
+    row_format = "[" + ",".join(["%.9g"] * settings.EMBEDDING_DIM) + "]"
+    offset = 0
+    for batch in chunks_file.iter_batches(batch_size=BATCH_SIZE):
+        data = batch.to_pydict()
+        count = len(data["id"])
+        batch_vectors = vectors[offset:offset + count]
+        duplicate_of = _remap(sorted_old, sorted_new, data["duplicate_of"])
+        document_ids = [document_map[document_id] for document_id in data["document_id"]]
+        _copy_rows(cursor, target, columns, (
+            (int(new_ids[offset + i]), school_id, document_ids[i], data["chunk_text"][i],
+             row_format % tuple(batch_vectors[i].tolist()) if data["has_embedding"][i] else None,
+             data["minhash"][i], data["lsh_bands"][i], duplicate_of[i])
+            for i in range(count)
+        ))
+        offset += count
+
+    if attach:
+        # 부모 테이블의 인덱스(HNSW·GIN 포함)가 여기서 파티션에 한 번에 생성됩니다.
+        conn.execute(text(f"ALTER TABLE document_chunks ATTACH PARTITION {target} FOR VALUES IN ({int(school_id)})"))
+    conn.execute(text(f"ANALYZE {target}"))
+    return offset
+
+def import_school(engine, input_dir, school_id=None):
+    """스냅샷을 한 트랜잭션으로 적재하고 {"school_id", 행 수...}를 반환합니다.
+
+    실패하면 학교 생성을 포함해 전부 롤백됩니다.
+    """
+    from migrate import pending_migrations
+
+    with open(os.path.join(input_dir, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"지원하지 않는 스냅샷 형식입니다: {manifest.get('format_version')}")
+    if manifest["embedding_dim"] != settings.EMBEDDING_DIM:
+        raise ValueError(f"임베딩 차원이 다릅니다: 스냅샷 {manifest['embedding_dim']}, 설정 {settings.EMBEDDING_DIM}")
+
+    with engine.begin() as conn:
+        pending = pending_migrations(conn)
+        if pending:
+            raise ValueError("적용되지 않은 마이그레이션이 있습니다. python migrate.py up을 먼저 실행하세요.")
+        school_id = _resolve_school(conn, manifest, school_id)
+        cursor = conn.connection.dbapi_connection.cursor()
+
+        documents = pq.read_table(os.path.join(input_dir, "documents.parquet")).to_pydict()
+        old_document_ids = np.array(documents["id"], dtype=np.int64)
+        new_document_ids = _allocate_ids(conn, "documents", len(old_document_ids))
+        document_map = dict(zip(old_document_ids.tolist(), new_document_ids.tolist()))
+        _copy_rows(cursor, "documents", ("school_id",) + DOCUMENT_COLUMNS, (
+            (school_id, document_map[row_id], *(documents[name][i] for name in DOCUMENT_COLUMNS[1:]))
+            for i, row_id in enumerate(documents["id"])
+        ))
+
+        feeds = pq.read_table(os.path.join(input_dir, "rss_feeds.parquet")).to_pylist()
+        if feeds:
+            conn.execute(text(f"""
+                INSERT INTO rss_feeds (school_id, {", ".join(RSS_COLUMNS)})
+                VALUES (:school_id, {", ".join(":" + name for name in RSS_COLUMNS)})
+                ON CONFLICT (school_id, url) DO NOTHING
+            """), [{"school_id": school_id, **feed} for feed in feeds])
+
+        chunk_count = _load_chunks(conn, cursor, input_dir, school_id, document_map)
+        cursor.close()
+        conn.execute(text("ANALYZE documents"))
+    return {"school_id": school_id, "documents": len(document_map), "rss_feeds": len(feeds), "chunks": chunk_count}
+
+def main(argv=None):
+    from db import get_engine
+
+    parser = argparse.ArgumentParser(description="학교 인덱스 스냅샷 내보내기/가져오기")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="학교 스냅샷 내보내기")
+    export.add_argument("--school-id", type=int, required=True)
+    export.add_argument("--output", required=True, help="스냅샷 디렉터리")
+    load = sub.add_parser("import", help="스냅샷 가져오기 (COPY 적재 후 인덱스 생성)")
+    load.add_argument("--input", required=True, help="스냅샷 디렉터리")
+    load.add_argument("--school-id", type=int, help="가져올 학교 ID (기본: 스냅샷과 같은 code의 학교, 없으면 생성)")
+    args = parser.parse_args(argv)
+
+    # 대량 적재와 인덱스 생성은 오래 걸리므로 statement_timeout이 없는 관리용 엔진을 사용합니다.
+    engine = get_engine("maintenance")
+    started = time.perf_counter()
+    try:
+        if args.command == "export":
+            result = export_school(engine, args.school_id, args.output)
+        else:
+            result = import_school(engine, args.input, args.school_id)
+    except ValueError as e:
+        print(f"오류: {e}", file=sys.stderr)
+        return 1
+    result["elapsed_seconds"] = round(time.perf_counter() - started, 1)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""
+document_chunks 임베딩의 압축 인덱스(halfvec / 이진 양자화)와 재순위화 검색.
+
+원본 float 벡터는 그대로 두고, 압축 표현에 대한 표현식 HNSW 인덱스로 후보를 고른 뒤
+원본 벡터로 정확한 거리를 다시 계산해 상위 k개를 반환합니다.
+
+사용 예:
+    python vector_index.py create --mode half
+    python vector_index.py evaluate --school-id 1 --sample 200 --k 5
+"""
+import argparse
+import json
+import random
+import sys
+import time
+
+from sqlalchemy import text
+
+from config import settings
+
+DIM = settings.EMBEDDING_DIM
+
+# 모드별 후보 검색 거리 식과 인덱스 정의 (인덱스 식과 정확히 같아야 인덱스가 사용됩니다)
+COMPACT_MODES = {
+    "half": {
+        "index_name": "idx_document_chunks_embedding_half",
+        "index_sql": f"USING hnsw ((embedding::halfvec({DIM})) halfvec_cosine_ops)",
+        "distance_sql": f"dc.embedding::halfvec({DIM}) <=> CAST(:query_vector AS halfvec({DIM}))"
+    },
+    "binary": {
+        "index_name": "idx_document_chunks_embedding_bit",
+        "index_sql": f"USING hnsw ((binary_quantize(embedding)::bit({DIM})) bit_hamming_ops)",
+        "distance_sql": f"binary_quantize(dc.embedding)::bit({DIM}) <~> binary_quantize(CAST(:query_vector AS vector({DIM})))"
+    },
+    "full": {
+        "index_name": "idx_document_chunks_embedding_full",
+        "index_sql": "USING hnsw (embedding vector_cosine_ops)",
+        "distance_sql": f"dc.embedding <=> CAST(:query_vector AS vector({DIM}))"
+    }
+}
+
+SEARCH_MODES = ("exact",) + tuple(COMPACT_MODES)
+
+def vector_literal(vector):
+    return "[" + ",".join(repr(float(v)) for v in vector) + "]"
+
+# --- 인덱스 관리 ---
+
+def _partitions(conn):
+    return [row[0] for row in conn.execute(text("""
+        SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass('document_chunks') ORDER BY c.relname
+    """)).fetchall()]
+
+def create_compact_index(engine, mode):
+    """압축 인덱스를 CONCURRENTLY로 생성합니다 (쓰기를 막지 않음).
+
+    document_chunks가 학교별 파티션 테이블이면 부모에 ON ONLY 인덱스를 정의한 뒤
+    파티션마다 CONCURRENTLY로 만들어 연결합니다.
+    """
+    spec = COMPACT_MODES[mode]
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        partitions = _partitions(conn)
+        if not partitions:
+            conn.execute(text(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {spec['index_name']} ON document_chunks {spec['index_sql']}"
+            ))
+            return
+
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {spec['index_name']} ON ONLY document_chunks {spec['index_sql']}"))
+        for partition in partitions:
+            child_index = f"{partition}_{mode}_embedding_idx"
+            conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {child_index} ON {partition} {spec['index_sql']}"))
+            attached = conn.execute(text("""
+                SELECT 1 FROM pg_inherits WHERE inhrelid = to_regclass(:child) AND inhparent = to_regclass(:parent)
+            """), {"child": child_index, "parent": spec["index_name"]}).scalar()
+            if not attached:
+                conn.execute(text(f"ALTER INDEX {spec['index_name']} ATTACH PARTITION {child_index}"))
+
+def drop_compact_index(engine, mode):
+    spec = COMPACT_MODES[mode]
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        # 파티션 테이블의 인덱스는 CONCURRENTLY로 삭제할 수 없습니다.
+        concurrently = "" if _partitions(conn) else "CONCURRENTLY "
+        conn.execute(text(f"DROP INDEX {concurrently}IF EXISTS {spec['index_name']}"))
+
+def measure_storage(engine):
+    """document_chunks 테이블과 벡터 인덱스의 디스크 크기(바이트, 모든 파티션 합계)를 조회합니다."""
+    size_sql = "SELECT SUM({fn}(relid)) FROM pg_partition_tree(to_regclass(:name))"
+    with engine.connect() as conn:
+        table_bytes = conn.execute(text(size_sql.format(fn="pg_table_size")),
+                                   {"name": "document_chunks"}).scalar()
+        indexes = {}
+        for mode, spec in COMPACT_MODES.items():
+            size = conn.execute(text(size_sql.format(fn="pg_relation_size")),
+                                {"name": spec["index_name"]}).scalar()
+            if size is not None:
+                indexes[mode] = int(size)
+    return {"table_bytes": int(table_bytes or 0), "index_bytes": indexes}
+
+# --- 검색 ---
+
+def search_similar_chunks(conn, school_id, query_embedding, k=5, mode="half", candidates=None):
+    """압축 인덱스로 후보를 고르고 원본 벡터로 재순위화한 상위 k개 청크를 반환합니다.
+
+    mode가 "exact"이면 인덱스 없이 원본 벡터로 전체를 정확히 비교합니다.
+    영벡터(Lambda가 임베딩 없이 저장한 청크)는 코사인 거리가 NaN이므로 제외합니다.
+    반환 행: (chunk_id, chunk_text, source_url, file_name, category, created_at, distance)
+    """
+    params = {"school_id": school_id, "query_vector": vector_literal(query_embedding), "k": k}
+    exact_distance = f"dc.embedding <=> CAST(:query_vector AS vector({DIM}))"
+
+    if mode == "exact":
+        return conn.execute(text(f"""
+            SELECT dc.id, dc.chunk_text, d.source_url, d.file_name, d.category, d.created_at,
+                   {exact_distance} AS distance
+            FROM document_chunks dc
+            JOIN documents d ON dc.document_id = d.id
+            WHERE dc.school_id = :school_id AND dc.duplicate_of IS NULL AND dc.embedding IS NOT NULL
+              AND vector_norm(dc.embedding) > 0
+            ORDER BY distance
+            LIMIT :k
+        """), params).fetchall()
+
+    candidates = max(candidates or settings.VECTOR_RERANK_CANDIDATES, k)
+    params["candidates"] = candidates
+    # HNSW 탐색 폭이 후보 수보다 작으면 후보가 덜 채워지므로 트랜잭션 범위에서 늘립니다.
+    conn.execute(text("SELECT set_config('hnsw.ef_search', :ef, true)"), {"ef": str(max(candidates, 40))})
+    return conn.execute(text(f"""
+        WITH candidates AS (
+            SELECT dc.id, dc.document_id, dc.chunk_text, dc.embedding
+            FROM document_chunks dc
+            WHERE dc.school_id = :school_id AND dc.duplicate_of IS NULL AND dc.embedding IS NOT NULL
+              AND vector_norm(dc.embedding) > 0
+            ORDER BY {COMPACT_MODES[mode]['distance_sql']}
+            LIMIT :candidates
+        )
+        SELECT c.id, c.chunk_text, d.source_url, d.file_name, d.category, d.created_at,
+               c.embedding <=> CAST(:query_vector AS vector({DIM})) AS distance
+        FROM candidates c
+        JOIN documents d ON c.document_id = d.id
+        ORDER BY distance
+        LIMIT :k
+    """), params).fetchall()
+
+# --- 평가 ---
+
+def evaluate(engine, school_id, sample=200, k=5, candidates=None, seed=42):
+    """저장된 청크 벡터를 질의로 사용해 모드별 recall@k와 지연 시간을 측정합니다."""
+    with engine.connect() as conn:
+        rows = conn.execute(text("""
+            SELECT dc.embedding::text
+            FROM document_chunks dc
+            WHERE dc.school_id = :school_id AND dc.duplicate_of IS NULL AND dc.embedding IS NOT NULL AND vector_norm(dc.embedding) > 0
+        """), {"school_id": school_id}).fetchall()
+    rng = random.Random(seed)
+    queries = [json.loads(r[0]) for r in rng.sample(rows, min(sample, len(rows)))]
+    if not queries:
+        return {"error": "평가할 임베딩이 없습니다."}
+
+    def run(mode):
+        ids, latencies = [], []
+        with engine.connect() as conn:
+            for query in queries:
+                started = time.perf_counter()
+                with conn.begin():
+                    result = search_similar_chunks(conn, school_id, query, k=k, mode=mode, candidates=candidates)
+                latencies.append((time.perf_counter() - started) * 1000)
+                ids.append({row[0] for row in result})
+        latencies.sort()
+        return ids, {"p50_ms": latencies[len(latencies) // 2],
+                     "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]}
+
+    exact_ids, exact_latency = run("exact")
+    report = {"school_id": school_id, "queries": len(queries), "k": k,
+              "candidates": candidates or settings.VECTOR_RERANK_CANDIDATES,
+              "storage": measure_storage(engine), "modes": {"exact": {"recall": 1.0, **exact_latency}}}
+    for mode, index_bytes in report["storage"]["index_bytes"].items():
+        mode_ids, latency = run(mode)
+        recall = sum(len(a & b) / max(len(b), 1) for a, b in zip(mode_ids, exact_ids)) / len(queries)
+        report["modes"][mode] = {"recall": round(recall, 4), "index_bytes": index_bytes, **latency}
+
+    full_bytes = report["storage"]["index_bytes"].get("full")
+    if full_bytes:
+        for mode in ("half", "binary"):
+            if mode in report["modes"]:
+                report["modes"][mode]["saving_vs_full"] = round(1 - report["modes"][mode]["index_bytes"] / full_bytes, 4)
+    return report
+
+def main(argv=None):
+    from db import get_engine
+
+    parser = argparse.ArgumentParser(description="압축 임베딩 인덱스 관리 및 평가")
+    sub = parser.add_subparsers(dest="command", required=True)
+    create = sub.add_parser("create", help="압축 인덱스 생성")
+    create.add_argument("--mode", choices=list(COMPACT_MODES), required=True)
+    drop = sub.add_parser("drop", help="압축 인덱스 삭제")
+    drop.add_argument("--mode", choices=list(COMPACT_MODES), required=True)
+    sub.add_parser("sizes", help="테이블/인덱스 크기 조회")
+    ev = sub.add_parser("evaluate", help="모드별 recall@k, 지연 시간, 인덱스 크기 측정")
+    ev.add_argument("--school-id", type=int, required=True)
+    ev.add_argument("--sample", type=int, default=200)
+    ev.add_argument("--k", type=int, default=5)
+    ev.add_argument("--candidates", type=int)
+    args = parser.parse_args(argv)
+
+    # 인덱스 생성·백필은 오래 걸리므로 statement_timeout이 없는 관리용 엔진을 사용합니다.
+    engine = get_engine("maintenance")
+    if args.command == "create":
+        create_compact_index(engine, args.mode)
+        result = measure_storage(engine)
+    elif args.command == "drop":
+        drop_compact_index(engine, args.mode)
+        result = measure_storage(engine)
+    elif args.command == "sizes":
+        result = measure_storage(engine)
+    else:
+        result = evaluate(engine, args.school_id, args.sample, args.k, args.candidates)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())